@@ -0,0 +1,134 @@
+"""Latencia del autocompletado para consultas de 1, 2 y 5 caracteres.
+
+Mide `NameIndex.search` (trie de /item), `CatalogIndex.search` (índice en
+memoria del catálogo, autocompletado de /search) e `ItemStore.search` (catálogo
+SQLite, complemento de /item) con el catálogo de ítems local. Si la base
+está vacía se genera un catálogo sintético del tamaño indicado en un fichero
+temporal, así el resultado no depende de haber sincronizado los ítems.
+
+    python bench/autocomplete.py                    # data/items.sqlite3 o sintético
+    python bench/autocomplete.py --synthetic 70000  # fuerza catálogo sintético
+    python bench/autocomplete.py --repeat 2000
+
+Para ItemStore se mide la primera consulta (sin la caché de consultas cortas) y
+las repeticiones por separado. También se comprueba que CatalogIndex devuelve
+los nombres de ItemStore en el mismo orden.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.item_store import ITEM_DB_FILE, ItemStore  # noqa: E402
+from utils.name_index import CatalogIndex, NameIndex  # noqa: E402
+
+QUERIES = {
+    1: ["e", "m", "g", "s", "á"],
+    2: ["ec", "my", "gl", "sa", "pi"],
+    5: ["ectop", "mysti", "glob ", "sabid", "piece"],
+}
+
+_WORDS_EN = ["glob", "ectoplasm", "mystic", "coin", "piece", "rare", "gear", "shard", "glory", "memory",
+             "battle", "pile", "dust", "lucent", "bloodstone", "elder", "wood", "log", "orichalcum", "ore",
+             "ascended", "recipe", "inscription", "insignia", "berserker", "viper", "rune", "sigil", "of", "the"]
+_WORDS_ES = ["glóbulo", "ectoplasma", "moneda", "mística", "pieza", "equipo", "esquirla", "gloria", "sabiduría",
+             "montón", "polvo", "piedra", "madera", "mineral", "receta", "inscripción", "runa", "sello", "de", "la"]
+
+
+def synthetic_items(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for item_id in range(1, count + 1):
+        yield {
+            "id": item_id,
+            "name_en": " ".join(rng.choice(_WORDS_EN) for _ in range(rng.randint(1, 4))).title(),
+            "name_es": " ".join(rng.choice(_WORDS_ES) for _ in range(rng.randint(1, 4))).capitalize(),
+            "rarity": rng.choice(["Basic", "Fine", "Masterwork", "Rare", "Exotic", "Ascended"]),
+        }
+
+
+def open_store(args) -> tuple[ItemStore, str]:
+    if not args.synthetic:
+        store = ItemStore(args.db)
+        if store.count():
+            return store, args.db
+        store.close()
+        args.synthetic = 70000
+    args.tmpdir = tempfile.mkdtemp(prefix="qaliz-bench-")
+    path = os.path.join(args.tmpdir, "items.sqlite3")
+    store = ItemStore(path)
+    store.upsert_items(synthetic_items(args.synthetic))
+    return store, f"sintético ({args.synthetic} ítems)"
+
+
+def timed(func, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[max(0, int(len(samples) * 0.99) - 1)]
+    print(f"  {label:<24} mediana {statistics.median(samples):8.3f} ms   p99 {p99:8.3f} ms   máx {samples[-1]:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=ITEM_DB_FILE)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--skip-trie", action="store_true", help="no construir NameIndex (lento con el catálogo entero)")
+    args = parser.parse_args()
+    args.tmpdir = None
+
+    store, source = open_store(args)
+    names = store.names()
+    start = time.perf_counter()
+    catalog = CatalogIndex().build(names)
+    print(f"Catálogo: {source}; CatalogIndex construido en {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({len(catalog)} nombres)")
+    index = None
+    if not args.skip_trie:
+        start = time.perf_counter()
+        index = NameIndex()
+        for name_en, name_es in names:
+            index.add(name_en or name_es, [name_en, name_es])
+        index.build()
+        print(f"NameIndex construido en {(time.perf_counter() - start) * 1000:.0f} ms ({len(index)} nombres)")
+
+    mismatches = 0
+    for length, queries in QUERIES.items():
+        print(f"{length} carácter(es): {', '.join(repr(q) for q in queries)}")
+        if index is not None:
+            report("NameIndex.search", [s for q in queries for s in timed(lambda: index.search(q, 25), args.repeat)])
+        report("CatalogIndex.search", [s for q in queries for s in timed(lambda: catalog.search(q, 25), args.repeat)])
+        first = []
+        for q in queries:
+            store._short_query_cache.clear()
+            first += timed(lambda: store.search(q, 25), 1)
+        report("ItemStore.search (1.ª)", first)
+        report("ItemStore.search", [s for q in queries for s in timed(lambda: store.search(q, 25), args.repeat)])
+        for q in queries:
+            expected = list(dict.fromkeys(item["name_en"] or item["name_es"] for item in store.search(q, 25)))
+            # ItemStore limita por ítem (con nombres repetidos); CatalogIndex, por nombre distinto
+            mismatches += catalog.search(q, 25)[:len(expected)] != expected
+    print(f"CatalogIndex vs ItemStore: {mismatches} consultas con resultados distintos")
+    store.close()
+    if args.tmpdir:
+        shutil.rmtree(args.tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
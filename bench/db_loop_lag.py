@@ -0,0 +1,105 @@
+"""Retraso del event loop durante N llamadas concurrentes a `getApiKey`.
+
+Un ticker se despierta cada `--tick-ms` y anota cuánto tarde llega; si alguna
+llamada a la base de datos bloquease el loop, el retraso crecería con la
+latencia de cada lectura. Se compara con el modo `--blocking`, que hace la
+misma lectura directamente en el hilo del loop (como antes del pool dedicado).
+
+    python bench/db_loop_lag.py                          # memoria, 5 ms por lectura
+    python bench/db_loop_lag.py --calls 500 --latency-ms 20
+    python bench/db_loop_lag.py --blocking               # referencia: lecturas en el loop
+
+Con `--backend firestore` y FIRESTORE_EMULATOR_HOST apuntando al emulador se
+mide contra Firestore real (las credenciales del .env siguen siendo necesarias
+para inicializar firebase_admin). En los backends locales `--latency-ms` simula
+el tiempo de ida y vuelta de la red dentro de cada lectura.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# El singleton `dbManager` se crea al importar: sin credenciales, que use memoria
+os.environ.setdefault('DB_BACKEND', 'memory')
+
+from utils import storage  # noqa: E402
+from utils.database import DatabaseManager  # noqa: E402
+
+
+def add_latency(latency: float) -> None:
+    """Hace que cada lectura local tarde `latency` segundos, como una petición de red."""
+    if latency <= 0:
+        return
+    original = storage.DocumentReference.get
+
+    def get(self):
+        time.sleep(latency)
+        return original(self)
+
+    storage.DocumentReference.get = get
+
+
+async def measure_lag(stop: asyncio.Event, tick: float, samples: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        samples.append(time.perf_counter() - start - tick)
+
+
+async def blocking_get_api_key(db: DatabaseManager, user_id: int):
+    # Lectura síncrona en el hilo del loop: lo que hacía DatabaseManager antes
+    doc = db.apiKeys.document(str(user_id)).get()
+    keys = doc.to_dict().get('keys', []) if doc.exists else []
+    return next((k.get('api_key') for k in keys if k.get('active')), None)
+
+
+async def run(args) -> None:
+    db = DatabaseManager(args.backend)
+    users = list(range(1, args.users + 1))
+    for uid in users:
+        db.apiKeys.document(str(uid)).set({'keys': [{'api_key': f'KEY-{uid}', 'active': True}]})
+    add_latency(args.latency_ms / 1000)
+
+    get = (lambda uid: blocking_get_api_key(db, uid)) if args.blocking else db.getApiKey
+    samples: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop, args.tick_ms / 1000, samples))
+    await asyncio.sleep(args.tick_ms / 1000 * 3)  # referencia sin carga
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(get(users[i % len(users)]) for i in range(args.calls)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    db.close()
+
+    assert all(results), "alguna llamada no devolvió la API key"
+    samples.sort()
+    lag_ms = [s * 1000 for s in samples]
+    print(f"backend={args.backend} modo={'bloqueante' if args.blocking else 'pool'} "
+          f"llamadas={args.calls} latencia={args.latency_ms:g}ms")
+    print(f"  total:      {elapsed * 1000:8.1f} ms ({args.calls / elapsed:,.0f} llamadas/s)")
+    print(f"  lag loop:   mediana {statistics.median(lag_ms):6.2f} ms  "
+          f"p99 {lag_ms[int(len(lag_ms) * 0.99) - 1]:6.2f} ms  máx {lag_ms[-1]:6.2f} ms  "
+          f"({len(lag_ms)} ticks)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', default=os.environ['DB_BACKEND'])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--tick-ms', type=float, default=5.0)
+    parser.add_argument('--blocking', action='store_true')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
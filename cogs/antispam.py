@@ -2,67 +2,177 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 import asyncio
-from collections import defaultdict
+import time
+from collections import OrderedDict, deque
 import logging
+from typing import Union
+from utils.database import dbManager
 
 logger = logging.getLogger(__name__)
 
+# Límites de memoria: usuarios seguidos a la vez (por servidor) y mensajes guardados por usuario
+MAX_TRACKED_USERS = 10000
+MAX_MESSAGES_PER_USER = 50
+
+DEFAULT_CONFIG = {
+    'enabled': True,
+    'time_window': 20,  # Ventana de tiempo en segundos
+    'max_messages': 3,  # Máximo de mensajes con imágenes en la ventana
+    'max_channels': 2,  # Máximo de canales diferentes en la ventana
+    'delete_messages': True,  # Eliminar mensajes spam
+    'timeout_duration': 86400,  # Duración del timeout en segundos (24 horas)
+    'timeout_enabled': True,  # Aplicar timeout automático
+    'exempt_roles': [],  # Roles exentos de la protección
+    'exempt_channels': []  # Canales exentos de la protección
+}
+
+
+class MessageWindow:
+    """Mensajes con adjuntos de un usuario dentro de la ventana de tiempo.
+
+    Mantiene el conteo por canal al agregar y expirar, así que el número de
+    canales distintos se obtiene sin recorrer la ventana.
+    """
+
+    __slots__ = ("messages", "channel_counts")
+
+    def __init__(self):
+        self.messages = deque()  # (timestamp monotónico, channel_id, message_id)
+        self.channel_counts = {}
+
+    def __len__(self):
+        return len(self.messages)
+
+    @property
+    def unique_channels(self):
+        return len(self.channel_counts)
+
+    @property
+    def last_seen(self):
+        return self.messages[-1][0] if self.messages else 0.0
+
+    def add(self, ts, channel_id, message_id):
+        self.messages.append((ts, channel_id, message_id))
+        self.channel_counts[channel_id] = self.channel_counts.get(channel_id, 0) + 1
+        while len(self.messages) > MAX_MESSAGES_PER_USER:
+            self._pop_oldest()
+
+    def expire(self, now, time_window):
+        while self.messages and now - self.messages[0][0] > time_window:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        _, channel_id, _ = self.messages.popleft()
+        count = self.channel_counts[channel_id] - 1
+        if count:
+            self.channel_counts[channel_id] = count
+        else:
+            del self.channel_counts[channel_id]
+
+
+class EvaluationRate:
+    """Mensajes evaluados por segundo (media de los últimos `window` segundos)."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.total = 0
+        self.buckets = deque(maxlen=window)  # [segundo, conteo]
+
+    def hit(self):
+        self.total += 1
+        second = int(time.monotonic())
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([second, 1])
+
+    def per_second(self):
+        now = int(time.monotonic())
+        return sum(count for second, count in self.buckets if now - second < self.window) / self.window
+
+
+class GuildSpamState:
+    """Config y ventanas de actividad de un servidor."""
+
+    __slots__ = ("config", "windows")
+
+    def __init__(self, config):
+        self.config = config
+        # user_id -> MessageWindow, en orden de última actividad
+        self.windows = OrderedDict()
+
+    def get_window(self, user_id):
+        window = self.windows.get(user_id)
+        if window is None:
+            window = self.windows[user_id] = MessageWindow()
+            # Si hay demasiados usuarios seguidos, se descarta el inactivo más antiguo
+            if len(self.windows) > MAX_TRACKED_USERS:
+                self.windows.popitem(last=False)
+        else:
+            self.windows.move_to_end(user_id)
+        return window
+
+    def cleanup(self, now):
+        # Los usuarios están ordenados por última actividad: se corta en el primero aún activo
+        max_age = self.config['time_window'] + 10  # Buffer de 10s
+        while self.windows:
+            user_id, window = next(iter(self.windows.items()))
+            if now - window.last_seen <= max_age:
+                break
+            del self.windows[user_id]
+
+
 class AntiSpam(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.user_messages = defaultdict(list)
-        self.guild_configs = defaultdict(lambda: {
-            'enabled': True,
-            'time_window': 20,  # Ventana de tiempo en segundos
-            'max_messages': 3,  # Máximo de mensajes con imágenes en la ventana
-            'max_channels': 2,  # Máximo de canales diferentes en la ventana
-            'delete_messages': True,  # Eliminar mensajes spam
-            'timeout_duration': 86400,  # Duración del timeout en segundos (24 horas)
-            'timeout_enabled': True,  # Aplicar timeout automático
-            'exempt_roles': [],  # Roles exentos de la protección
-            'exempt_channels': []  # Canales exentos de la protección
-        })
+        # guild_id -> GuildSpamState; la config se lee de Firestore la primera vez
+        self.guilds = {}
+        self._loading = {}
+        self.evaluations = EvaluationRate()
         # Limpiar mensajes antiguos cada minuto
         self.bot.loop.create_task(self._cleanup_old_messages())
 
+    async def get_guild_state(self, guild_id):
+        state = self.guilds.get(guild_id)
+        if state is not None:
+            return state
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.create_task(self._load_guild_state(guild_id))
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def _load_guild_state(self, guild_id):
+        stored = await dbManager.getAntispamConfig(guild_id)
+        config = dict(DEFAULT_CONFIG)
+        config.update({key: value for key, value in (stored or {}).items() if key in DEFAULT_CONFIG})
+        state = GuildSpamState(config)
+        # Si Firestore falló se usan los valores por defecto y se reintenta en el próximo mensaje
+        if stored is not None:
+            self.guilds[guild_id] = state
+        return state
+
+    async def update_config(self, guild_id, **changes):
+        state = await self.get_guild_state(guild_id)
+        state.config.update(changes)
+        return await dbManager.setAntispamConfig(guild_id, changes)
+
     async def _cleanup_old_messages(self):
         """Limpia mensajes antiguos del registro cada minuto"""
         while True:
             try:
                 await asyncio.sleep(60)  # Esperar 1 minuto
-                current_time = datetime.now()
-                
-                # Obtener el tiempo máximo de ventana de todas las configuraciones
-                max_time_window = 60  # Default máximo
-                for config in self.guild_configs.values():
-                    if config['time_window'] > max_time_window:
-                        max_time_window = config['time_window']
-                
-                # Limpiar mensajes más antiguos que el máximo de ventana
-                for user_id in list(self.user_messages.keys()):
-                    self.user_messages[user_id] = [
-                        (ts, ch, msg_id) for ts, ch, msg_id in self.user_messages[user_id]
-                        if (current_time - ts).total_seconds() <= max_time_window + 10  # Buffer de 10s
-                    ]
-                    
-                    # Eliminar usuarios sin mensajes
-                    if not self.user_messages[user_id]:
-                        del self.user_messages[user_id]
+                current_time = time.monotonic()
+                for state in self.guilds.values():
+                    state.cleanup(current_time)
             except Exception as e:
                 logger.error(f"Error en limpieza de mensajes: {e}")
 
-    def _has_attachments(self, message: discord.Message) -> bool:
-        """Verifica si el mensaje tiene archivos adjuntos (imágenes u otros)"""
-        return len(message.attachments) > 0 or len(message.embeds) > 0
-
-    def _is_exempt(self, member: discord.Member, channel: discord.TextChannel) -> bool:
+    def _is_exempt(self, member: discord.Member, channel: discord.TextChannel, config: dict) -> bool:
         """Verifica si el usuario o canal está exento de la protección"""
         if not member or not member.guild:
             return False
         
-        guild_id = member.guild.id
-        config = self.guild_configs[guild_id]
-        
         if channel.id in config['exempt_channels']:
             return True
         
@@ -76,47 +186,42 @@ class AntiSpam(commands.Cog):
         
         return False
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    async def cog_load(self):
+        # Solo interesan los mensajes de servidores con adjuntos o embeds
+        self.bot.router.register("antispam", self.handle_message, guild_only=True, attachments=True)
+
+    async def cog_unload(self):
+        self.bot.router.unregister("antispam")
+
+    async def handle_message(self, ctx):
         """Detecta y maneja mensajes spam"""
-        if message.author.bot:
-            return
-        
-        if not message.guild:
-            return
-        
-        guild_id = message.guild.id
-        config = self.guild_configs[guild_id]
+        message = ctx.message
+        guild_id = ctx.guild_id
+        state = self.guilds.get(guild_id) or await self.get_guild_state(guild_id)
+        config = state.config
+        self.evaluations.hit()
         
         if not config['enabled']:
             logger.debug(f"Protección desactivada para servidor {guild_id}")
             return
         
-        if self._is_exempt(message.author, message.channel):
+        if self._is_exempt(message.author, message.channel, config):
             logger.debug(f"Usuario {message.author} o canal {message.channel.name} está exento")
             return
         
-        has_attachments = self._has_attachments(message)
-        if not has_attachments:
-            return
-        
         logger.debug(f"Procesando mensaje con attachments de {message.author} en {message.channel.name}")
         
         user_id = message.author.id
-        current_time = datetime.now()
+        current_time = time.monotonic()
         channel_id = message.channel.id
         
-        self.user_messages[user_id].append((current_time, channel_id, message.id))
-        
         time_window = config['time_window']
-        recent_messages = [
-            (ts, ch, msg_id) for ts, ch, msg_id in self.user_messages[user_id]
-            if (current_time - ts).total_seconds() <= time_window
-        ]
-        self.user_messages[user_id] = recent_messages
+        window = state.get_window(user_id)
+        window.add(current_time, channel_id, message.id)
+        window.expire(current_time, time_window)
         
-        message_count = len(recent_messages)
-        unique_channels = len(set(ch for _, ch, _ in recent_messages))
+        message_count = len(window)
+        unique_channels = window.unique_channels
         
         logger.info(f"Usuario {message.author} ({user_id}): {message_count} mensajes en {unique_channels} canales (máx: {config['max_messages']} mensajes, {config['max_channels']} canales)")
         
@@ -137,7 +242,7 @@ class AntiSpam(commands.Cog):
             if config['delete_messages']:
                 deleted_count = 0
                 
-                for ts, ch_id, msg_id in recent_messages:
+                for ts, ch_id, msg_id in list(window.messages):
                     try:
                         channel_obj = message.guild.get_channel(ch_id)
                         if not channel_obj:
@@ -180,8 +285,69 @@ class AntiSpam(commands.Cog):
                 except Exception as e:
                     logger.error(f"Error aplicando timeout: {e}")
             
-            if user_id in self.user_messages:
-                del self.user_messages[user_id]
+            state.windows.pop(user_id, None)
+
+    @commands.group(name='antispam', invoke_without_command=True)
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def antispam(self, ctx):
+        """Muestra la configuración anti-spam del servidor (.antispam)"""
+        config = (await self.get_guild_state(ctx.guild.id)).config
+        embed = discord.Embed(title="🛡️ Configuración Anti-Spam", color=discord.Color.blue(), timestamp=datetime.now())
+        for key, value in config.items():
+            if key == 'exempt_roles':
+                value = ", ".join(f"<@&{role_id}>" for role_id in value) or "Ninguno"
+            elif key == 'exempt_channels':
+                value = ", ".join(f"<#{channel_id}>" for channel_id in value) or "Ninguno"
+            embed.add_field(name=key, value=str(value), inline=True)
+        embed.set_footer(
+            text=f"{self.evaluations.per_second():.2f} evaluaciones/s (último minuto) · {self.evaluations.total} en total"
+        )
+        await ctx.send(embed=embed)
+
+    @antispam.command(name='set')
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def antispam_set(self, ctx, clave: str, valor: str):
+        """Cambia un valor de la configuración (.antispam set max_messages 5)"""
+        default = DEFAULT_CONFIG.get(clave)
+        if default is None or isinstance(default, list):
+            claves = ", ".join(k for k, v in DEFAULT_CONFIG.items() if not isinstance(v, list))
+            await ctx.send(f"❌ Clave inválida. Usa una de estas: {claves}")
+            return
+        if isinstance(default, bool):
+            if valor.lower() not in ('on', 'off', 'true', 'false', 'si', 'sí', 'no'):
+                await ctx.send("❌ Usa on/off para esta opción")
+                return
+            parsed = valor.lower() in ('on', 'true', 'si', 'sí')
+        else:
+            if not valor.isdigit() or int(valor) <= 0:
+                await ctx.send("❌ El valor debe ser un número entero positivo")
+                return
+            parsed = int(valor)
+
+        if await self.update_config(ctx.guild.id, **{clave: parsed}):
+            await ctx.send(f"✅ `{clave}` establecido a `{parsed}`")
+        else:
+            await ctx.send("❌ Se aplicó el cambio, pero no se pudo guardar en la base de datos")
+
+    @antispam.command(name='exempt')
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def antispam_exempt(self, ctx, objetivo: Union[discord.Role, discord.TextChannel]):
+        """Agrega o quita un rol o canal de las exenciones (.antispam exempt #canal)"""
+        key = 'exempt_roles' if isinstance(objetivo, discord.Role) else 'exempt_channels'
+        current = list((await self.get_guild_state(ctx.guild.id)).config[key])
+        if objetivo.id in current:
+            current.remove(objetivo.id)
+            action = "ya no está exento"
+        else:
+            current.append(objetivo.id)
+            action = "ahora está exento"
+        if await self.update_config(ctx.guild.id, **{key: current}):
+            await ctx.send(f"✅ {objetivo.mention} {action}")
+        else:
+            await ctx.send("❌ Se aplicó el cambio, pero no se pudo guardar en la base de datos")
 
 async def setup(bot):
     await bot.add_cog(AntiSpam(bot))
@@ -56,31 +56,24 @@ class Blacklist(commands.Cog):
         else:
             await ctx.send(f"✅ El usuario {user.mention} **no está** en la lista negra.")
 
-    # Listener para borrar mensajes que mencionen a usuarios bloqueados
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
+    async def cog_load(self):
+        # Solo interesan los mensajes con menciones
+        self.bot.router.register("blacklist", self.handle_message, mentions=True)
+
+    async def cog_unload(self):
+        self.bot.router.unregister("blacklist")
+
+    # Handler para borrar mensajes que mencionen a usuarios bloqueados
+    async def handle_message(self, ctx):
+        message = ctx.message
 
         # 1. Comprobar si el autor está en la lista negra
         if await self.bot.db.isBlacklisted(message.author.id):
             return
 
-        # 2. EXCEPCIÓN: Si es un comando para gestionar la lista negra, NO borrar
-        content = message.content.lower().strip()
-        # Verificar si empieza con algún prefijo del bot
-        prefixes = tuple(self.bot.command_prefix) if isinstance(self.bot.command_prefix, list) else (self.bot.command_prefix,)
-        
-        if content.startswith(prefixes):
-            # Limpiar el prefijo para analizar el comando
-            for p in prefixes:
-                if content.startswith(p):
-                    clean_content = content[len(p):].strip()
-                    break
-            
-            # Si el comando empieza con "blacklist", permitimos la mención para gestionarlo
-            if clean_content.startswith("blacklist") or clean_content.startswith("bl"):
-                return
+        # 2. EXCEPCIÓN: Si es un comando para gestionar la lista negra ("blacklist" / "bl"), NO borrar
+        if ctx.command and ctx.command.startswith("bl"):
+            return
 
         # 3. Comprobar si menciona a alguien en la lista negra (para otros casos)
         for user in message.mentions:
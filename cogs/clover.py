@@ -1,7 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import requests
+import asyncio
+from utils.gw2api import gw2api
 
 # Configuración de emojis
 EMOJIS = {
@@ -29,18 +30,18 @@ class CloverCalculator:
 
     @staticmethod
     async def fetch_price(item_id):
-        url = f"https://api.guildwars2.com/v2/commerce/prices/{item_id}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
+        price = await gw2api.get_price(item_id)
+        if price is None:
             raise ValueError("Error fetching price from GW2 API")
+        return price
 
     @staticmethod
     async def calculate_materials(num_clovers):
         try:
-            ecto_price = await CloverCalculator.fetch_price(ITEMS["ECTOPLASM"])
-            coin_price = await CloverCalculator.fetch_price(ITEMS["MYSTIC_COIN"])
+            ecto_price, coin_price = await asyncio.gather(
+                CloverCalculator.fetch_price(ITEMS["ECTOPLASM"]),
+                CloverCalculator.fetch_price(ITEMS["MYSTIC_COIN"]),
+            )
 
             if "sells" not in ecto_price or "sells" not in coin_price:
                 raise ValueError("Incomplete price data")
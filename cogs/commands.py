@@ -1,9 +1,22 @@
 from typing import Optional, Dict, Any, List, Set
 from datetime import datetime
+import asyncio
+import re
+import time
 import discord
 from discord.ext import commands
 from discord.ui import Button, View
 
+# Servidores que se precargan a la vez tras on_ready
+WARMUP_CONCURRENCY = 4
+# Solo se precargan los servidores con algún comando personalizado usado en estos días
+WARMUP_ACTIVE_DAYS = 14
+# Como mucho una escritura de actividad por servidor en este intervalo (segundos)
+ACTIVITY_WRITE_INTERVAL = 3600
+# Espera antes de reintentar la carga de un servidor que falló; se duplica en cada fallo seguido
+LOAD_RETRY_SECONDS = 30
+LOAD_RETRY_MAX_SECONDS = 600
+
 class GuildConfig:
     def __init__(self, guild_id: int, admin_roles: List[int] = None, mod_roles: List[int] = None, custom_prefixes: List[str] = None):
         self.guild_id = guild_id
@@ -117,6 +130,34 @@ class CommandPaginator(View):
         self.next_button.disabled = True
         # No necesitamos actualizar el mensaje aquí ya que la vista se eliminará automáticamente
 
+class CommandMatcher:
+    """Prefijos, comandos y alias de un servidor compilados para el despacho de mensajes.
+
+    Se reconstruye solo cuando cambian los prefijos, los comandos o los alias.
+    Un mensaje cuyo primer carácter no puede iniciar ningún prefijo se descarta
+    sin crear objetos; si no, una sola regex separa prefijo y nombre y un solo
+    diccionario resuelve comando o alias.
+    """
+
+    def __init__(self, prefixes: List[str], commands: Dict[str, CustomCommand], aliases: Dict[str, str]):
+        self.first_chars = frozenset(prefix[0] for prefix in prefixes if prefix)
+        # Prefijos más largos primero para que "!!" gane a "!"
+        ordered = sorted({prefix for prefix in prefixes if prefix}, key=len, reverse=True)
+        self.pattern = re.compile(r"(?:%s)(\S+)" % "|".join(map(re.escape, ordered)))
+        self.lookup: Dict[str, CustomCommand] = dict(commands)
+        for alias, command_name in aliases.items():
+            command = commands.get(command_name)
+            if command is not None:
+                self.lookup.setdefault(alias, command)
+
+    def match(self, content: str) -> Optional[CustomCommand]:
+        if not content or content[0] not in self.first_chars:
+            return None
+        match = self.pattern.match(content)
+        if match is None:
+            return None
+        return self.lookup.get(match.group(1).lower())
+
 class CommandManager(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -124,44 +165,124 @@ class CommandManager(commands.Cog):
         # Colecciones de Firestore
         self.commands_collection = self.db.collection('commands')
         self.guild_configs_collection = self.db.collection('guild_configs')
+        # {guild_id: {'guild_id', 'last_used'}}: servidores que usan comandos, para la precarga
+        self.activity_collection = self.db.collection('command_activity')
         # Cache en memoria
         self.guild_commands = {}  # {guild_id: {command_name: Command}}
         self.guild_aliases = {}   # {guild_id: {alias: command_name}}
         self.guild_configs = {}   # {guild_id: GuildConfig}
-        # Cargar datos al iniciar
-        self._load_data()
-    
-    def _load_data(self):
-        """Carga comandos y configuraciones desde Firestore"""
+        self.matchers = {}        # {guild_id: CommandMatcher}, se construyen al primer mensaje
+        # Los datos se cargan por servidor al primer uso (ver ensure_guild_loaded)
+        self.loaded_guilds: Set[int] = set()
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._load_failures: Dict[int, tuple] = {}  # {guild_id: (fallos seguidos, reintentar desde)}
+        self._activity_written: Dict[int, float] = {}
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def _can_load(self, guild_id: int) -> bool:
+        """False mientras el servidor esté en espera tras un fallo de carga"""
+        failure = self._load_failures.get(guild_id)
+        return failure is None or time.monotonic() >= failure[1]
+
+    async def ensure_guild_loaded(self, guild_id: int):
+        """Carga comandos, alias y configuración del servidor si aún no están en memoria"""
+        if guild_id in self.loaded_guilds:
+            return
+        if not self._can_load(guild_id):
+            raise RuntimeError(f"Carga de comandos del servidor {guild_id} en espera tras un fallo")
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.create_task(self._load_guild(guild_id))
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        await asyncio.shield(task)
+
+    async def _load_guild(self, guild_id: int):
+        """Carga desde Firestore solo los documentos de un servidor"""
         try:
-            # Cargar configuraciones de servidor
-            configs = self.guild_configs_collection.stream()
-            for config_doc in configs:
-                config_data = config_doc.to_dict()
-                config = GuildConfig.from_dict(config_data)
-                self.guild_configs[config.guild_id] = config
-            
-            # Cargar comandos y alias
-            commands = self.commands_collection.stream()
-            for cmd_doc in commands:
-                cmd_data = cmd_doc.to_dict()
-                command = CustomCommand.from_dict(cmd_data)
-                guild_id = command.guild_id
-                
-                # Inicializar diccionarios si no existen
-                if guild_id not in self.guild_commands:
-                    self.guild_commands[guild_id] = {}
-                if guild_id not in self.guild_aliases:
-                    self.guild_aliases[guild_id] = {}
-                
-                # Agregar comando y sus alias
-                self.guild_commands[guild_id][command.name] = command
-                for alias in command.aliases:
-                    self.guild_aliases[guild_id][alias] = command.name
-                    
-            print("✅ Comandos y configuraciones cargados exitosamente")
+            config_doc, cmd_docs = await asyncio.gather(
+                self.bot.db.run(self.guild_configs_collection.document(str(guild_id)).get),
+                self.bot.db.run(lambda: list(self.commands_collection.where('guild_id', '==', guild_id).stream()))
+            )
+        except Exception as e:
+            # Sin marcar como cargado: se reintenta en el próximo uso pasada la espera
+            failures = self._load_failures.get(guild_id, (0, 0))[0] + 1
+            delay = min(LOAD_RETRY_SECONDS * 2 ** (failures - 1), LOAD_RETRY_MAX_SECONDS)
+            self._load_failures[guild_id] = (failures, time.monotonic() + delay)
+            print(f"❌ Error cargando comandos del servidor {guild_id} (reintento en {delay}s): {e}")
+            raise
+
+        if config_doc.exists:
+            self.guild_configs[guild_id] = GuildConfig.from_dict(config_doc.to_dict())
+
+        guild_commands = self.guild_commands.setdefault(guild_id, {})
+        guild_aliases = self.guild_aliases.setdefault(guild_id, {})
+        for cmd_doc in cmd_docs:
+            command = CustomCommand.from_dict(cmd_doc.to_dict())
+            guild_commands[command.name] = command
+            for alias in command.aliases:
+                guild_aliases[alias] = command.name
+
+        self.loaded_guilds.add(guild_id)
+        self._load_failures.pop(guild_id, None)
+        self.invalidate_matcher(guild_id)
+
+    async def mark_active(self, guild_id: int):
+        """Registra que el servidor usa comandos personalizados (para la precarga del próximo arranque)"""
+        now = time.time()
+        if now - self._activity_written.get(guild_id, 0) < ACTIVITY_WRITE_INTERVAL:
+            return
+        self._activity_written[guild_id] = now
+        try:
+            await self.bot.db.run(
+                self.activity_collection.document(str(guild_id)).set, {'guild_id': guild_id, 'last_used': now}
+            )
         except Exception as e:
-            print(f"❌ Error cargando datos: {e}")
+            print(f"Error guardando actividad del servidor {guild_id}: {e}")
+
+    async def _warm_up(self):
+        """Precarga en segundo plano los servidores activos; el resto se carga al primer uso"""
+        await self.bot.wait_until_ready()
+        since = time.time() - WARMUP_ACTIVE_DAYS * 86400
+        try:
+            docs = await self.bot.db.run(
+                lambda: list(self.activity_collection.where('last_used', '>=', since).stream())
+            )
+        except Exception as e:
+            print(f"❌ Error leyendo servidores activos para la precarga: {e}")
+            return
+        guild_ids = {guild.id for guild in self.bot.guilds}
+        active = [doc.to_dict()['guild_id'] for doc in docs if doc.to_dict().get('guild_id') in guild_ids]
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+        async def load(guild_id):
+            async with semaphore:
+                try:
+                    await self.ensure_guild_loaded(guild_id)
+                except Exception:
+                    pass  # Ya registrado en _load_guild; se reintenta al primer uso
+
+        await asyncio.gather(*(load(guild_id) for guild_id in active))
+        print(f"✅ Comandos personalizados precargados para {len(self.loaded_guilds)} de {len(active)} servidores activos")
+
+    async def cog_before_invoke(self, ctx):
+        if ctx.guild is not None:
+            await self.ensure_guild_loaded(ctx.guild.id)
+
+    def get_matcher(self, guild_id: int) -> Optional[CommandMatcher]:
+        """Devuelve el matcher del servidor, construyéndolo si hace falta"""
+        matcher = self.matchers.get(guild_id)
+        if matcher is None and self.guild_commands.get(guild_id):
+            config = self.guild_configs.get(guild_id)
+            matcher = self.matchers[guild_id] = CommandMatcher(
+                config.custom_prefixes if config else ['.', '!', '?'],
+                self.guild_commands[guild_id],
+                self.guild_aliases.get(guild_id, {})
+            )
+        return matcher
+
+    def invalidate_matcher(self, guild_id: int):
+        """Descarta el matcher del servidor tras cambiar prefijos, comandos o alias"""
+        self.matchers.pop(guild_id, None)
 
     def has_permission(self, member: discord.Member) -> bool:
         """Verifica si el miembro tiene rol de admin o mod en su servidor"""
@@ -206,7 +327,7 @@ class CommandManager(commands.Cog):
         
         # Guardar en Firestore
         try:
-            self.guild_configs_collection.document(str(guild_id)).set(config.to_dict())
+            await self.bot.db.run(self.guild_configs_collection.document(str(guild_id)).set, config.to_dict())
             roles_str = ", ".join(f"<@&{role_id}>" for role_id in role_ids)
             await ctx.send(f"✅ Roles de {role_type_str} actualizados: {roles_str}")
         except Exception as e:
@@ -258,10 +379,12 @@ class CommandManager(commands.Cog):
             
             # Guardar en memoria
             self.guild_commands[guild_id][name] = command
+            self.invalidate_matcher(guild_id)
             
             # Guardar en Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{name}")
-            cmd_doc_ref.set(command.to_dict())
+            await self.bot.db.run(cmd_doc_ref.set, command.to_dict())
+            await self.mark_active(guild_id)
             
             await ctx.send(f"✅ Comando `.{name}` creado exitosamente en la categoría '{category}'.")
         except Exception as e:
@@ -290,7 +413,7 @@ class CommandManager(commands.Cog):
 
             # Actualizar en Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{name}")
-            cmd_doc_ref.update({
+            await self.bot.db.run(cmd_doc_ref.update, {
                 "response": new_response,
                 "last_modified": command.last_modified.isoformat()
             })
@@ -323,7 +446,7 @@ class CommandManager(commands.Cog):
 
             # Actualizar en Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{name}")
-            cmd_doc_ref.update({
+            await self.bot.db.run(cmd_doc_ref.update, {
                 "category": category,
                 "last_modified": command.last_modified.isoformat()
             })
@@ -350,7 +473,7 @@ class CommandManager(commands.Cog):
         try:
             # Eliminar de Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{name}")
-            cmd_doc_ref.delete()
+            await self.bot.db.run(cmd_doc_ref.delete)
 
             # Eliminar de memoria
             command = self.guild_commands[guild_id].pop(name)
@@ -360,6 +483,7 @@ class CommandManager(commands.Cog):
                 for alias, cmd_name in self.guild_aliases[guild_id].items() 
                 if cmd_name != name
             }
+            self.invalidate_matcher(guild_id)
 
             await ctx.send(f"✅ Comando `.{name}` eliminado exitosamente.")
         except Exception as e:
@@ -401,10 +525,11 @@ class CommandManager(commands.Cog):
             if guild_id not in self.guild_aliases:
                 self.guild_aliases[guild_id] = {}
             self.guild_aliases[guild_id][alias] = command_name
+            self.invalidate_matcher(guild_id)
 
             # Actualizar en Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{command_name}")
-            cmd_doc_ref.update({
+            await self.bot.db.run(cmd_doc_ref.update, {
                 "aliases": list(command.aliases),
                 "last_modified": command.last_modified.isoformat()
             })
@@ -436,11 +561,12 @@ class CommandManager(commands.Cog):
             # Eliminar alias
             command.aliases.remove(alias)
             del self.guild_aliases[guild_id][alias]
+            self.invalidate_matcher(guild_id)
             command.last_modified = datetime.now()
 
             # Actualizar en Firestore
             cmd_doc_ref = self.commands_collection.document(f"{guild_id}_{command_name}")
-            cmd_doc_ref.update({
+            await self.bot.db.run(cmd_doc_ref.update, {
                 "aliases": list(command.aliases),
                 "last_modified": command.last_modified.isoformat()
             })
@@ -764,10 +890,11 @@ class CommandManager(commands.Cog):
         
         # Agregar prefijo
         config.custom_prefixes.append(prefix)
+        self.invalidate_matcher(guild_id)
         
         # Guardar en Firestore
         try:
-            self.guild_configs_collection.document(str(guild_id)).set(config.to_dict())
+            await self.bot.db.run(self.guild_configs_collection.document(str(guild_id)).set, config.to_dict())
             await ctx.send(f"✅ Prefijo `{prefix}` agregado exitosamente. Prefijos actuales: {', '.join(f'`{p}`' for p in config.custom_prefixes)}")
         except Exception as e:
             await ctx.send("❌ Error al guardar la configuración.")
@@ -796,10 +923,11 @@ class CommandManager(commands.Cog):
         
         # Eliminar prefijo
         config.custom_prefixes.remove(prefix)
+        self.invalidate_matcher(guild_id)
         
         # Guardar en Firestore
         try:
-            self.guild_configs_collection.document(str(guild_id)).set(config.to_dict())
+            await self.bot.db.run(self.guild_configs_collection.document(str(guild_id)).set, config.to_dict())
             await ctx.send(f"✅ Prefijo `{prefix}` eliminado exitosamente. Prefijos actuales: {', '.join(f'`{p}`' for p in config.custom_prefixes)}")
         except Exception as e:
             await ctx.send("❌ Error al guardar la configuración.")
@@ -818,10 +946,11 @@ class CommandManager(commands.Cog):
         config = self.guild_configs[guild_id]
         old_prefixes = config.custom_prefixes.copy()
         config.custom_prefixes = ['.', '!', '?']
+        self.invalidate_matcher(guild_id)
         
         # Guardar en Firestore
         try:
-            self.guild_configs_collection.document(str(guild_id)).set(config.to_dict())
+            await self.bot.db.run(self.guild_configs_collection.document(str(guild_id)).set, config.to_dict())
             await ctx.send(f"✅ Prefijos restablecidos a los valores por defecto.\n**Antes:** {', '.join(f'`{p}`' for p in old_prefixes)}\n**Ahora:** {', '.join(f'`{p}`' for p in config.custom_prefixes)}")
         except Exception as e:
             await ctx.send("❌ Error al guardar la configuración.")
@@ -837,46 +966,46 @@ class CommandManager(commands.Cog):
         latency = (end - start) * 1000
         await msg.edit(content=f'🏓 Pong! Latencia: `{int(latency)} ms`')
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Detecta y ejecuta comandos personalizados"""
-        if message.author.bot:
-            return
+    @commands.command(name='handlerstats')
+    @commands.is_owner()
+    async def handler_stats(self, ctx):
+        """Muestra el tiempo que tarda cada handler del despacho de mensajes."""
+        embed = discord.Embed(title="⏱️ Message handlers", color=0x00C8FB)
+        for handler in self.bot.router.handlers.values():
+            stats = handler.stats
+            embed.add_field(
+                name=handler.name,
+                value=f"{stats.calls} calls • avg {stats.avg_ms:.1f} ms • max {stats.max_ms:.0f} ms • {stats.errors} errors",
+                inline=False
+            )
+        await ctx.send(embed=embed)
 
-        guild_id = message.guild.id
-        
-        # Obtener prefijos personalizados del servidor o usar los por defecto
-        if guild_id in self.guild_configs:
-            prefixes = self.guild_configs[guild_id].custom_prefixes
-        else:
-            prefixes = ['.', '!', '?']
-        
-        # Verificar si el mensaje comienza con alguno de los prefijos configurados
-        used_prefix = None
-        for prefix in prefixes:
-            if message.content.startswith(prefix):
-                used_prefix = prefix
-                break
-        
-        if not used_prefix:
-            return
+    async def cog_load(self):
+        # El filtro descarta en el propio despacho todo mensaje que no sea un comando personalizado
+        self.bot.router.register("custom_commands", self.handle_message, guild_only=True, predicate=self._wants_message)
+        self._warmup_task = asyncio.create_task(self._warm_up())
 
-        if guild_id not in self.guild_commands:
-            return
+    async def cog_unload(self):
+        self.bot.router.unregister("custom_commands")
+        if self._warmup_task:
+            self._warmup_task.cancel()
 
-        command_name = self._normalize_name(message.content.split()[0], guild_id)
-        
-        # Buscar comando directo o alias
-        if command_name in self.guild_commands[guild_id]:
-            await message.channel.send(self.guild_commands[guild_id][command_name].response)
-            return  # No procesar más, evitar error visual
-        elif command_name in self.guild_aliases[guild_id]:
-            original_name = self.guild_aliases[guild_id][command_name]
-            await message.channel.send(self.guild_commands[guild_id][original_name].response)
-            return  # No procesar más, evitar error visual
+    def _wants_message(self, ctx) -> bool:
+        # Servidor sin cargar: el handler lo carga y vuelve a comprobar (salvo en espera tras un fallo)
+        if ctx.guild_id not in self.loaded_guilds:
+            return self._can_load(ctx.guild_id)
+        matcher = self.get_matcher(ctx.guild_id)
+        return matcher is not None and matcher.match(ctx.content) is not None
 
-        # Si no es un comando personalizado, permitir que el bot procese comandos normales
-        # No llamar a process_commands manualmente para evitar duplicación
+    async def handle_message(self, ctx):
+        """Detecta y ejecuta comandos personalizados"""
+        await self.ensure_guild_loaded(ctx.guild_id)
+        matcher = self.get_matcher(ctx.guild_id)
+        command = matcher.match(ctx.content) if matcher else None
+        if command is not None:
+            await ctx.message.channel.send(command.response)
+            await self.mark_active(ctx.guild_id)
+        # Si no es un comando personalizado, el bot procesa los comandos normales en CustomBot.on_message
 
 async def setup(bot):
     await bot.add_cog(CommandManager(bot))
\ No newline at end of file
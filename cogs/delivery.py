@@ -2,13 +2,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime
-import aiohttp
 from typing import Dict, List, Optional
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.database import dbManager
+from utils.http_session import get_session
 
 class Delivery(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -58,34 +58,34 @@ class Delivery(commands.Cog):
     
     async def get_delivery_details(self, api_key: str) -> Dict:
         """Obtiene los detalles de entrega del Trading Post"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                    'https://api.guildwars2.com/v2/commerce/delivery',
-                    headers={'Authorization': f'Bearer {api_key}'}
-                ) as response:
-                    if response.status == 401:
-                        raise Exception('Invalid API key')
-                    if response.status != 200:
-                        raise Exception(f"API returned status {response.status}")
-                    return await response.json()
-            except Exception as error:
-                print(f'Error fetching delivery details: {error}')
-                raise
+        session = get_session()
+        try:
+            async with session.get(
+                'https://api.guildwars2.com/v2/commerce/delivery',
+                headers={'Authorization': f'Bearer {api_key}'}
+            ) as response:
+                if response.status == 401:
+                    raise Exception('Invalid API key')
+                if response.status != 200:
+                    raise Exception(f"API returned status {response.status}")
+                return await response.json()
+        except Exception as error:
+            print(f'Error fetching delivery details: {error}')
+            raise
     
     async def get_item_details(self, item_id: int) -> Dict:
         """Obtiene los detalles de un item específico"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                    f'https://api.guildwars2.com/v2/items/{item_id}?lang=en'
-                ) as response:
-                    if response.status != 200:
-                        raise Exception(f"API returned status {response.status}")
-                    return await response.json()
-            except Exception as error:
-                print(f'Error fetching item {item_id}: {error}')
-                raise
+        session = get_session()
+        try:
+            async with session.get(
+                f'https://api.guildwars2.com/v2/items/{item_id}?lang=en'
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"API returned status {response.status}")
+                return await response.json()
+        except Exception as error:
+            print(f'Error fetching item {item_id}: {error}')
+            raise
     
     def get_rarity_emoji(self, rarity: str) -> str:
         """Retorna el emoji correspondiente a la rareza del item"""
@@ -2,12 +2,23 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime
+import asyncio
+import os
 import pytz
 import re
+import time
+import uuid
 from typing import Optional
 from utils.database import dbManager
+from utils.message_cache import message_cache
 
 TZ_CEST = pytz.timezone('Europe/Madrid')  # CEST / CET
+# Las inscripciones se guardan en Firestore en lotes cada N segundos
+EVENT_FLUSH_SECONDS = float(os.getenv("EVENT_FLUSH_SECONDS", 2))
+# Como mucho una edición del mensaje de cada evento cada N segundos (límite de Discord por canal)
+EVENT_EDIT_INTERVAL = float(os.getenv("EVENT_EDIT_INTERVAL", 5))
+# Lotes seguidos que puede fallar un evento antes de descartar sus cambios pendientes
+EVENT_FLUSH_MAX_RETRIES = int(os.getenv("EVENT_FLUSH_MAX_RETRIES", 5))
 
 # ─────────────────────────────────────────────────────────
 #  Plantillas de composición GW2
@@ -192,7 +203,7 @@ class RegisterNameModal(discord.ui.Modal, title="📝 Registrarse en el evento")
         account_name = self.nombre.value.strip()
         user_id = interaction.user.id
 
-        event = await dbManager.getEvent(self.doc_id)
+        event = await event_registry.get(self.doc_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -220,13 +231,9 @@ class RegisterNameModal(discord.ui.Modal, title="📝 Registrarse en el evento")
                     already_in = role["name"]
                     break
 
-        target.setdefault("participants", []).append(
-            {"name": account_name, "discord_id": user_id}
-        )
-
-        await dbManager.updateEventRoles(self.doc_id, roles)
-        event["roles"] = roles
-        await _refresh_event_message(event, interaction.guild)
+        participant = {"name": account_name, "discord_id": user_id, "key": _signup_key(user_id), "ts": time.time()}
+        target.setdefault("participants", []).append(participant)
+        event_registry.signup_changed(event, target["id"], participant, interaction.guild)
 
         if already_in:
             await interaction.followup.send(
@@ -313,7 +320,7 @@ class RegisterButton(discord.ui.Button):
         self.event_doc_id = doc_id
 
     async def callback(self, interaction: discord.Interaction) -> None:
-        event = await dbManager.getEvent(self.event_doc_id)
+        event = await event_registry.get(self.event_doc_id)
         if not event:
             await interaction.response.send_message("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -354,7 +361,7 @@ class UnregisterButton(discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
         user_id = interaction.user.id
 
-        event = await dbManager.getEvent(self.event_doc_id)
+        event = await event_registry.get(self.event_doc_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -372,6 +379,7 @@ class UnregisterButton(discord.ui.Button):
                     role["participants"].remove(p)
                     removed = p.get("name", str(user_id))
                     removed_role = role["name"]
+                    event_registry.signup_removed(event, p["key"], interaction.guild)
                     break
             if removed:
                 break
@@ -382,9 +390,6 @@ class UnregisterButton(discord.ui.Button):
             )
             return
 
-        await dbManager.updateEventRoles(self.event_doc_id, roles)
-        event["roles"] = roles
-        await _refresh_event_message(event, interaction.guild)
         await interaction.followup.send(
             f"✅ Te has retirado del rol **{removed_role}** (`{removed}`).", ephemeral=True
         )
@@ -442,14 +447,265 @@ async def _refresh_event_message(event: dict, guild: Optional[discord.Guild]) ->
         channel = guild.get_channel(int(event.get("channel_id", 0)))
         if not channel:
             return
-        msg = await channel.fetch_message(int(event.get("message_id", 0)))
         embed = build_event_embed(event, guild)
         view = EventMainView(event)
-        await msg.edit(embed=embed, view=view)
+        # Edición directa sobre el handle, sin leer antes el mensaje
+        msg = await message_cache.edit(channel, int(event.get("message_id", 0)), embed=embed, view=view)
+        if msg is None:
+            print(f"⚠️ El mensaje del evento {event.get('doc_id')} ya no existe")
     except Exception as e:
         print(f"⚠️ Error refrescando mensaje del evento: {e}")
 
 
+def _signup_key(discord_id: Optional[int]) -> str:
+    """Clave de la inscripción en el mapa `signups`: el id de Discord, o una aleatoria
+    para nombres apuntados a mano sin usuario. Empieza por letra para poder usarla en
+    rutas de campo de Firestore (`signups.u123...`) sin comillas."""
+    return f"u{discord_id}" if discord_id else f"m{uuid.uuid4().hex[:12]}"
+
+
+def _signup_doc(role_id: str, participant: dict) -> dict:
+    return {
+        "role_id":    role_id,
+        "name":       participant.get("name", ""),
+        "discord_id": participant.get("discord_id"),
+        "ts":         participant.get("ts", 0),
+    }
+
+
+def _hydrate_signups(event: dict) -> bool:
+    """Reparte el mapa `signups` del documento entre los `participants` de cada rol.
+    Devuelve True si el evento es del formato antiguo (participantes dentro de `roles`)."""
+    roles = event.setdefault("roles", [])
+    signups = event.pop("signups", None)
+    if signups is None:
+        for role in roles:
+            for i, p in enumerate(role.setdefault("participants", [])):
+                p.setdefault("key", _signup_key(p.get("discord_id")))
+                p.setdefault("ts", i)
+        return True
+
+    by_id = {role["id"]: role for role in roles}
+    for role in roles:
+        role["participants"] = []
+    for key, signup in sorted(signups.items(), key=lambda item: item[1].get("ts", 0)):
+        role = by_id.get(signup.get("role_id"))
+        if role is None:
+            continue  # Rol eliminado de la plantilla
+        role["participants"].append({
+            "name":       signup.get("name", ""),
+            "discord_id": signup.get("discord_id"),
+            "key":        key,
+            "ts":         signup.get("ts", 0),
+        })
+    return False
+
+
+class EventRegistry:
+    """Eventos en memoria: las inscripciones se aplican aquí, se guardan en
+    Firestore en lotes y el mensaje de cada evento se reedita como mucho una vez
+    cada EVENT_EDIT_INTERVAL segundos, siempre con el último estado.
+
+    Cada inscripción es un campo propio del documento (`signups.<clave>`): dos
+    usuarios que se apuntan a la vez escriben campos distintos y no se pisan, y
+    cada escritura ocupa lo mismo sea cual sea el tamaño del evento.
+
+    Solo los eventos abiertos se quedan en memoria: uno cerrado o cancelado se
+    olvida en cuanto no tiene escrituras ni ediciones pendientes, y si vuelve a
+    usarse se lee otra vez de Firestore."""
+
+    def __init__(self):
+        self.events: dict[str, dict] = {}  # doc_id -> evento
+        self._loading: dict[str, asyncio.Task] = {}
+        self._signups: dict[str, dict] = {}  # doc_id -> {clave: inscripción o None si se borró}
+        self._roles_dirty: set[str] = set()  # definición de roles cambiada (nombre, plazas...)
+        self._migrations: set[str] = set()  # eventos antiguos por pasar al mapa `signups`
+        self._failures: dict[str, int] = {}  # doc_id -> lotes seguidos en los que falló
+        self._flush_task: Optional[asyncio.Task] = None
+        self._render_tasks: dict[str, asyncio.Task] = {}  # edición aún no empezada, por evento
+        self._running: set[asyncio.Task] = set()
+        self._last_render: dict[str, float] = {}
+
+    def add(self, event: dict) -> dict:
+        doc_id = str(event["doc_id"])
+        if _hydrate_signups(event):
+            self._migrations.add(doc_id)
+            self._schedule_flush()
+        self.events[doc_id] = event
+        return event
+
+    async def get(self, doc_id) -> Optional[dict]:
+        """Evento en memoria; si no está, se lee una vez de Firestore (las lecturas simultáneas se comparten)."""
+        doc_id = str(doc_id)
+        event = self.events.get(doc_id)
+        if event is not None:
+            return event
+        task = self._loading.get(doc_id)
+        if task is None:
+            task = self._loading[doc_id] = asyncio.create_task(dbManager.getEvent(doc_id))
+            task.add_done_callback(lambda _: self._loading.pop(doc_id, None))
+        event = await asyncio.shield(task)
+        if event is None:
+            return None
+        if doc_id in self.events:
+            return self.events[doc_id]
+        event = self.add(event)
+        # Cerrado y sin cambios: se devuelve sin quedarse en memoria
+        self._evict_if_idle(doc_id)
+        return event
+
+    def _track(self, event: dict) -> str:
+        """Vuelve a registrar un evento olvidado que recibe cambios."""
+        doc_id = str(event["doc_id"])
+        self.events.setdefault(doc_id, event)
+        return doc_id
+
+    def signup_changed(self, event: dict, role_id: str, participant: dict, guild: Optional[discord.Guild]) -> None:
+        """Guarda (en el próximo lote) la inscripción del participante en el rol indicado."""
+        self._signups.setdefault(self._track(event), {})[participant["key"]] = _signup_doc(role_id, participant)
+        self._schedule_flush()
+        self.schedule_render(event, guild)
+
+    def signup_removed(self, event: dict, key: str, guild: Optional[discord.Guild]) -> None:
+        self._signups.setdefault(self._track(event), {})[key] = None
+        self._schedule_flush()
+        self.schedule_render(event, guild)
+
+    def roles_changed(self, event: dict, guild: Optional[discord.Guild]) -> None:
+        """Marca la definición de roles del evento para el próximo lote y programa la edición del mensaje."""
+        self._roles_dirty.add(self._track(event))
+        self._schedule_flush()
+        self.schedule_render(event, guild)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        while self._signups or self._roles_dirty or self._migrations:
+            await asyncio.sleep(EVENT_FLUSH_SECONDS)
+            await self.flush()
+
+    def _role_definitions(self, event: dict) -> list:
+        return [{k: v for k, v in role.items() if k != "participants"} for role in event.get("roles", [])]
+
+    def _signups_map(self, event: dict) -> dict:
+        return {
+            p["key"]: _signup_doc(role["id"], p)
+            for role in event.get("roles", [])
+            for p in role.get("participants", [])
+        }
+
+    async def flush(self) -> None:
+        signups, self._signups = self._signups, {}
+        roles_dirty, self._roles_dirty = self._roles_dirty, set()
+        migrations, self._migrations = self._migrations, set()
+
+        # Los valores se construyen aquí: el hilo de Firestore no debe ver cambios a medias
+        updates: dict[str, dict] = {}
+        for doc_id in signups.keys() | roles_dirty | migrations:
+            event = self.events.get(doc_id)
+            if event is None:
+                continue
+            fields = {}
+            if doc_id in roles_dirty or doc_id in migrations:
+                fields["roles"] = self._role_definitions(event)
+            if doc_id in migrations:
+                fields["signups"] = self._signups_map(event)
+            else:
+                for key, signup in signups.get(doc_id, {}).items():
+                    fields[f"signups.{key}"] = dbManager.ops.DELETE_FIELD if signup is None else signup
+            updates[doc_id] = fields
+
+        if not updates:
+            return
+        failed = await dbManager.updateEvents(updates)
+        for doc_id in updates:
+            if doc_id not in failed:
+                self._failures.pop(doc_id, None)
+
+        for doc_id, reason in failed.items():
+            if reason == "missing":
+                # Documento borrado: sus cambios ya no tienen dónde guardarse
+                print(f"⚠️ El evento {doc_id} ya no existe en la base de datos; se descartan sus cambios")
+                self.forget(doc_id)
+                continue
+            attempts = self._failures[doc_id] = self._failures.get(doc_id, 0) + 1
+            if attempts >= EVENT_FLUSH_MAX_RETRIES:
+                print(f"❌ Evento {doc_id}: {attempts} lotes fallidos seguidos, se descartan los cambios "
+                      f"pendientes: {updates[doc_id]}")
+                self._failures.pop(doc_id, None)
+                continue
+            # Reintentar en el próximo lote sin pisar lo que haya cambiado mientras tanto
+            print(f"⚠️ Evento {doc_id}: no se pudo guardar (intento {attempts}/{EVENT_FLUSH_MAX_RETRIES})")
+            if doc_id in roles_dirty:
+                self._roles_dirty.add(doc_id)
+            if doc_id in migrations:
+                self._migrations.add(doc_id)
+            if doc_id in signups:
+                self._signups[doc_id] = {**signups[doc_id], **self._signups.get(doc_id, {})}
+
+        for doc_id in updates:
+            self._evict_if_idle(doc_id)
+
+    def _evict_if_idle(self, doc_id: str) -> None:
+        """Olvida el evento si ya no está abierto y no le queda nada por guardar ni por editar."""
+        event = self.events.get(doc_id)
+        if event is None or event.get("status", "open") == "open":
+            return
+        if (
+            doc_id in self._signups or doc_id in self._roles_dirty or doc_id in self._migrations
+            or doc_id in self._failures or doc_id in self._render_tasks
+        ):
+            return
+        self.forget(doc_id)
+
+    def forget(self, doc_id: str) -> None:
+        """Descarta el evento y sus cambios pendientes de la memoria."""
+        doc_id = str(doc_id)
+        event = self.events.pop(doc_id, None)
+        if event is not None:
+            message_cache.discard(int(event.get("channel_id", 0)), int(event.get("message_id", 0)))
+        self._signups.pop(doc_id, None)
+        self._roles_dirty.discard(doc_id)
+        self._migrations.discard(doc_id)
+        self._failures.pop(doc_id, None)
+        self._last_render.pop(doc_id, None)
+
+    def schedule_render(self, event: dict, guild: Optional[discord.Guild]) -> None:
+        doc_id = self._track(event)
+        # Ya hay una edición pendiente: mostrará el estado más reciente
+        if doc_id in self._render_tasks:
+            return
+        delay = self._last_render.get(doc_id, 0.0) + EVENT_EDIT_INTERVAL - time.monotonic()
+        task = self._render_tasks[doc_id] = asyncio.create_task(self._render(doc_id, guild, max(0.0, delay)))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _render(self, doc_id: str, guild: Optional[discord.Guild], delay: float) -> None:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Los cambios que lleguen desde aquí programan la siguiente edición
+        self._render_tasks.pop(doc_id, None)
+        self._last_render[doc_id] = time.monotonic()
+        event = self.events.get(doc_id)
+        if event is not None:
+            await _refresh_event_message(event, guild)
+            self._evict_if_idle(doc_id)
+
+    async def close(self) -> None:
+        """Escribe lo pendiente y cancela las ediciones programadas."""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        self._render_tasks.clear()
+        await self.flush()
+
+
+event_registry = EventRegistry()
+
+
 # ─────────────────────────────────────────────────────────
 #  Modals
 # ─────────────────────────────────────────────────────────
@@ -515,6 +771,7 @@ class EventCreateModal(discord.ui.Modal, title="📅 Crear Evento"):
             "end_ts":     end_ts,
             "status":     "open",
             "roles":      roles,
+            "signups":    {},
             "created_at": datetime.now(),
         }
 
@@ -530,6 +787,8 @@ class EventCreateModal(discord.ui.Modal, title="📅 Crear Evento"):
             await msg.delete()
             await interaction.followup.send("❌ Error al guardar el evento en la base de datos.", ephemeral=True)
             return
+        # Solo eventos con documento: el registro nunca encola cambios para uno inexistente
+        event_registry.add(event_data)
 
         embed = build_event_embed(event_data, interaction.guild)
         view  = EventMainView(event_data)
@@ -581,7 +840,7 @@ class EventAddRoleModal(discord.ui.Modal, title="➕ Añadir Rol al Evento"):
             await interaction.followup.send("❌ Número de slots inválido (1–50).", ephemeral=True)
             return
 
-        event = await dbManager.getEvent(self.doc_id)
+        event = await event_registry.get(self.doc_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -613,9 +872,8 @@ class EventAddRoleModal(discord.ui.Modal, title="➕ Añadir Rol al Evento"):
             "participants": [],
         })
 
-        await dbManager.updateEventRoles(self.doc_id, roles)
         event["roles"] = roles
-        await _refresh_event_message(event, interaction.guild)
+        event_registry.roles_changed(event, interaction.guild)
         await interaction.followup.send(f"✅ Rol **{role_name}** añadido al evento.", ephemeral=True)
 
 
@@ -632,12 +890,16 @@ class Events(commands.Cog):
         try:
             events = await dbManager.getOpenEvents()
             for event in events:
+                event_registry.add(event)
                 view = EventMainView(event)
                 self.bot.add_view(view, message_id=int(event.get("message_id", 0)))
             print(f"✅ {len(events)} evento(s) restaurado(s)")
         except Exception as e:
             print(f"⚠️ Error restaurando eventos: {e}")
 
+    async def cog_unload(self) -> None:
+        await event_registry.close()
+
     # ── Grupo de comandos /raid ────────────────────────────
 
     raid = app_commands.Group(name="raid", description="Gestión de raids/eventos con inscripción de roles")
@@ -654,7 +916,7 @@ class Events(commands.Cog):
     @raid.command(name="addrol", description="Añade un rol personalizado a un evento existente")
     @app_commands.describe(mensaje_id="ID del mensaje del evento (clic derecho → Copiar ID)")
     async def addrol(self, interaction: discord.Interaction, mensaje_id: str) -> None:
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.response.send_message("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -672,7 +934,7 @@ class Events(commands.Cog):
     @app_commands.describe(mensaje_id="ID del mensaje del evento")
     async def cerrar(self, interaction: discord.Interaction, mensaje_id: str) -> None:
         await interaction.response.defer(ephemeral=True)
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -685,14 +947,14 @@ class Events(commands.Cog):
 
         await dbManager.updateEventStatus(mensaje_id, "closed")
         event["status"] = "closed"
-        await _refresh_event_message(event, interaction.guild)
+        event_registry.schedule_render(event, interaction.guild)
         await interaction.followup.send("✅ Inscripciones cerradas.", ephemeral=True)
 
     @raid.command(name="abrir", description="Vuelve a abrir las inscripciones de un evento")
     @app_commands.describe(mensaje_id="ID del mensaje del evento")
     async def abrir(self, interaction: discord.Interaction, mensaje_id: str) -> None:
         await interaction.response.defer(ephemeral=True)
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -707,7 +969,7 @@ class Events(commands.Cog):
         event["status"] = "open"
         view = EventMainView(event)
         self.bot.add_view(view, message_id=int(event.get("message_id", 0)))
-        await _refresh_event_message(event, interaction.guild)
+        event_registry.schedule_render(event, interaction.guild)
         await interaction.followup.send("✅ Inscripciones abiertas de nuevo.", ephemeral=True)
 
     @raid.command(name="sign", description="Registra manualmente a alguien en un rol del evento")
@@ -726,7 +988,7 @@ class Events(commands.Cog):
         usuario: Optional[discord.Member] = None,
     ) -> None:
         await interaction.response.defer(ephemeral=True)
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -762,12 +1024,9 @@ class Events(commands.Cog):
                         role["participants"].remove(p)
                         break
 
-        target.setdefault("participants", []).append(
-            {"name": nombre.strip(), "discord_id": discord_id}
-        )
-        await dbManager.updateEventRoles(mensaje_id, roles)
-        event["roles"] = roles
-        await _refresh_event_message(event, interaction.guild)
+        participant = {"name": nombre.strip(), "discord_id": discord_id, "key": _signup_key(discord_id), "ts": time.time()}
+        target.setdefault("participants", []).append(participant)
+        event_registry.signup_changed(event, target["id"], participant, interaction.guild)
         mention = usuario.mention if usuario else f"`{nombre}`"
         await interaction.followup.send(
             f"✅ {mention} registrado en **{target['name']}** como `{nombre}`.", ephemeral=True
@@ -780,7 +1039,7 @@ class Events(commands.Cog):
     )
     async def unsign(self, interaction: discord.Interaction, mensaje_id: str, nombre: str) -> None:
         await interaction.response.defer(ephemeral=True)
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -802,6 +1061,7 @@ class Events(commands.Cog):
                     role["participants"].remove(p)
                     removed = p["name"]
                     removed_role = role["name"]
+                    event_registry.signup_removed(event, p["key"], interaction.guild)
                     break
             if removed:
                 break
@@ -812,9 +1072,6 @@ class Events(commands.Cog):
             )
             return
 
-        await dbManager.updateEventRoles(mensaje_id, roles)
-        event["roles"] = roles
-        await _refresh_event_message(event, interaction.guild)
         await interaction.followup.send(
             f"✅ `{removed}` eliminado del rol **{removed_role}**.", ephemeral=True
         )
@@ -823,7 +1080,7 @@ class Events(commands.Cog):
     @app_commands.describe(mensaje_id="ID del mensaje del evento")
     async def cancelar(self, interaction: discord.Interaction, mensaje_id: str) -> None:
         await interaction.response.defer(ephemeral=True)
-        event = await dbManager.getEvent(mensaje_id)
+        event = await event_registry.get(mensaje_id)
         if not event:
             await interaction.followup.send("❌ Evento no encontrado.", ephemeral=True)
             return
@@ -836,7 +1093,7 @@ class Events(commands.Cog):
 
         await dbManager.updateEventStatus(mensaje_id, "cancelled")
         event["status"] = "cancelled"
-        await _refresh_event_message(event, interaction.guild)
+        event_registry.schedule_render(event, interaction.guild)
         await interaction.followup.send("✅ Evento cancelado.", ephemeral=True)
 
     @raid.command(name="lista", description="Muestra los eventos del servidor")
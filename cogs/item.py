@@ -2,6 +2,11 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import aiohttp
+from utils.http_session import get_session
+from utils.gw2api import gw2api
+from utils.item_store import item_store, normalize_name
+from utils.name_index import NameIndex
+import difflib
 import math
 import asyncio
 from typing import Dict, List, Set, Tuple, Optional
@@ -300,28 +305,45 @@ ITEMS_MAP = {
     84731: {"mainName": "Piece of Unidentified Gear", "altNames": ["Green", "Pieza de equipo sin identificar"]},
 }
 
+# Índice de autocompletado sobre mainName y altNames (EN/ES), sin acentos
+ITEMS_NAME_INDEX = NameIndex()
+# Nombre normalizado (mainName o altName) -> id; ante nombres repetidos gana el primero del mapa
+ITEMS_BY_NAME: Dict[str, int] = {}
+_MAIN_NAME_IDS: Dict[str, int] = {}
+for _id, _item in ITEMS_MAP.items():
+    _names = [_item["mainName"], *_item.get("altNames", [])]
+    ITEMS_NAME_INDEX.add(_item["mainName"], _names)
+    _MAIN_NAME_IDS.setdefault(_item["mainName"], _id)
+    for _name in _names:
+        ITEMS_BY_NAME.setdefault(normalize_name(_name), _id)
+ITEMS_NAME_INDEX.build()
+
+
+def fuzzy_item_suggestions(name: str, limit: int = 5) -> List[Tuple[int, str]]:
+    """Objetos del mapa con nombre parecido (errores de escritura), como (id, mainName)"""
+    similares = []
+    for key in difflib.get_close_matches(normalize_name(name), ITEMS_BY_NAME.keys(), n=limit * 3, cutoff=0.7):
+        id_ = ITEMS_BY_NAME[key]
+        if all(id_ != otro for otro, _ in similares):
+            similares.append((id_, ITEMS_MAP[id_]["mainName"]))
+        if len(similares) >= limit:
+            break
+    return similares
+
+
 def find_object_id_by_name(name: str):
     if not name:
         return None, []
-    name_lower = name.lower().strip()
-    exact_match = None
-    similares = []
-    # Búsqueda exacta
-    for id_, item in ITEMS_MAP.items():
-        main_name = item["mainName"].lower()
-        if main_name == name_lower:
-            exact_match = id_
-            break
-        if "altNames" in item and any(alt_name.lower() == name_lower for alt_name in item["altNames"]):
-            exact_match = id_
-            break
-    # Búsqueda parcial para sugerencias
-    for id_, item in ITEMS_MAP.items():
-        main_name = item["mainName"].lower()
-        if name_lower in main_name and id_ != exact_match:
-            similares.append((id_, item["mainName"]))
-        elif "altNames" in item and any(name_lower in alt_name.lower() for alt_name in item["altNames"]) and id_ != exact_match:
-            similares.append((id_, item["mainName"]))
+    # Búsqueda exacta (sin mayúsculas ni acentos)
+    exact_match = ITEMS_BY_NAME.get(normalize_name(name))
+    # Búsqueda parcial para sugerencias y, si no hay, por parecido
+    similares = [
+        (_MAIN_NAME_IDS[main_name], main_name)
+        for main_name in ITEMS_NAME_INDEX.search(name, 6)
+        if _MAIN_NAME_IDS[main_name] != exact_match
+    ]
+    if not similares and not exact_match:
+        similares = fuzzy_item_suggestions(name)
     return exact_match, similares[:5]
 
 class CopyNameButton(discord.ui.View):
@@ -354,24 +376,16 @@ class ItemPrice(commands.Cog):
             print(f'Error getting the icon URL from the API: {error}')
             return None
 
-    async def get_precio_ecto(self, session: aiohttp.ClientSession) -> int:
+    async def get_precio_ecto(self) -> int:
         try:
-            async with session.get('https://api.guildwars2.com/v2/commerce/prices/19721', timeout=aiohttp.ClientTimeout(total=5)) as response:
-                if response.status != 200:
-                    return None
-                ecto = await response.json()
-                return ecto['sells']['unit_price']
+            return await gw2api.get_sell_price(19721)
         except Exception as error:
             print(f'Error when getting the price of the ectos from the API: {error}')
             return None
 
-    async def get_precio_moneda_mistica(self, session: aiohttp.ClientSession) -> int:
+    async def get_precio_moneda_mistica(self) -> int:
         try:
-            async with session.get('https://api.guildwars2.com/v2/commerce/prices/19976', timeout=aiohttp.ClientTimeout(total=5)) as response:
-                if response.status != 200:
-                    return None
-                moneda_mistica = await response.json()
-                return moneda_mistica['sells']['unit_price']
+            return await gw2api.get_sell_price(19976)
         except Exception as error:
             print(f'Error when getting the price of the Mystic Coins from the API: {error}')
             return None
@@ -440,14 +454,14 @@ class ItemPrice(commands.Cog):
         return "\n".join(formatted_listings)
 
     async def item_autocomplete(self, interaction: discord.Interaction, current: str):
-        current_lower = current.lower().strip()
-        sugerencias = set()
-        for item in ITEMS_MAP.values():
-            if current_lower in item["mainName"].lower():
-                sugerencias.add(item["mainName"])
-            if len(sugerencias) >= 25:
-                break
-        return [app_commands.Choice(name=s, value=s) for s in list(sugerencias)[:25]]
+        sugerencias = ITEMS_NAME_INDEX.search(current, 25)
+        # Completar con el catálogo local de ítems
+        if len(sugerencias) < 25 and current.strip():
+            # Consulta SQLite: fuera del event loop
+            for item in await asyncio.to_thread(item_store.search, current, 25 - len(sugerencias)):
+                if item["name_en"] and item["name_en"] not in sugerencias:
+                    sugerencias.append(item["name_en"])
+        return [app_commands.Choice(name=s, value=s) for s in sugerencias[:25]]
 
     @app_commands.command(name="item", description="Displays the price and image of an object.")
     @app_commands.describe(
@@ -461,41 +475,38 @@ class ItemPrice(commands.Cog):
             objeto_id = int(query) if query.isdigit() else None
             similares = []
             if not objeto_id:
-                name_lower = query.lower().strip()
-                for id_, item in ITEMS_MAP.items():
-                    alt_names = item.get("altNames", [])
-                    if item["mainName"].lower() == name_lower or any(name_lower == alt.lower() for alt in alt_names):
-                        objeto_id = id_
-                        break
+                objeto_id, parecidos = find_object_id_by_name(query)
                 if not objeto_id:
-                    for id_, item in ITEMS_MAP.items():
-                        alt_names = item.get("altNames", [])
-                        if name_lower in item["mainName"].lower() or any(name_lower in alt.lower() for alt in alt_names):
-                            similares.append(item["mainName"])
-                
-                # Si no se encontró en el mapa, buscar en la API
+                    similares = [nombre for _, nombre in parecidos]
+
+                # Si no se encontró en el mapa, probar el catálogo local (nombre EN/ES exacto)
                 if not objeto_id:
-                    timeout = aiohttp.ClientTimeout(total=10)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        api_result = await self.search_item_by_name_api(session, query)
-                        if api_result and api_result[0]:
-                            objeto_id = api_result[0]
-                            # Si hay sugerencias de la API, agregarlas a similares
-                            if api_result[1] and len(api_result[1]) > 1:
-                                # Obtener nombres de los items sugeridos
-                                try:
-                                    ids_param = ",".join(map(str, api_result[1][:5]))
-                                    async with session.get(f"https://api.guildwars2.com/v2/items?ids={ids_param}&lang=en", timeout=aiohttp.ClientTimeout(total=5)) as items_response:
-                                        if items_response.status == 200:
-                                            items = await items_response.json()
-                                            for item in items:
-                                                if item['id'] != objeto_id:
-                                                    similares.append(item['name'])
-                                except:
-                                    pass
-                        elif not similares:
-                            await interaction.followup.send('Item with that name was not found. Try a more specific name or use the item ID.')
-                            return
+                    stored = await asyncio.to_thread(item_store.find_exact, query)
+                    if stored:
+                        objeto_id = stored['id']
+
+                # Si tampoco está en el catálogo, buscar en la API
+                if not objeto_id:
+                    session = get_session()
+                    api_result = await self.search_item_by_name_api(session, query)
+                    if api_result and api_result[0]:
+                        objeto_id = api_result[0]
+                        # Si hay sugerencias de la API, agregarlas a similares
+                        if api_result[1] and len(api_result[1]) > 1:
+                            # Obtener nombres de los items sugeridos
+                            try:
+                                ids_param = ",".join(map(str, api_result[1][:5]))
+                                async with session.get(f"https://api.guildwars2.com/v2/items?ids={ids_param}&lang=en", timeout=aiohttp.ClientTimeout(total=5)) as items_response:
+                                    if items_response.status == 200:
+                                        items = await items_response.json()
+                                        for item in items:
+                                            if item['id'] != objeto_id:
+                                                similares.append(item['name'])
+                            except:
+                                pass
+                    elif not similares:
+                        await interaction.followup.send('Item with that name was not found. Try a more specific name or use the item ID.')
+                        return
                 
                 # Si hay sugerencias pero no match exacto, mostrar sugerencias
                 if not objeto_id and similares:
@@ -503,171 +514,173 @@ class ItemPrice(commands.Cog):
                     await interaction.followup.send(f'Item not found. Did you mean?:\n{sugerencias}')
                     return
 
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                try:
-                    async with session.get(f"https://api.guildwars2.com/v2/items/{objeto_id}?lang=en") as test_response:
-                        if test_response.status != 200:
-                            await interaction.followup.send(f'Item with ID {objeto_id} was not found in the API.')
-                            return
-                        objeto_details = await test_response.json()
-                except Exception:
-                    await interaction.followup.send('Error connecting to the Guild Wars 2 API. Please try again later.')
-                    return
-                try:
-                    async with session.get(f"https://api.guildwars2.com/v2/commerce/prices/{objeto_id}") as response:
-                        if response.status != 200:
-                            await interaction.followup.send('This item does not have a valid price in the Trading Post.')
-                            return
-                        objeto = await response.json()
-                except asyncio.TimeoutError:
-                    await interaction.followup.send('The price request is taking too long. Please try again later.')
-                    return
-                except Exception as e:
-                    await interaction.followup.send(f'Error getting prices: {str(e)}')
-                    return
-                if not objeto or "sells" not in objeto or "buys" not in objeto:
-                    await interaction.followup.send('The item does not have a valid sell price in the API.')
-                    return
-                precio_venta = objeto["sells"]["unit_price"] * quantity
-                precio_compra = objeto["buys"]["unit_price"] * quantity
-                nombre_objeto = objeto_details["name"]
-                rareza_objeto = objeto_details["rarity"]
-                imagen_objeto = objeto_details["icon"]
-                descuento = (0.95 if objeto_id in NINETY_FIVE_PERCENT_ITEMS else 0.85 if rareza_objeto == "Legendary" and objeto_id not in EXCLUDED_LEGENDARY_ITEMS else 0.90)
-                precio_descuento = math.floor(precio_venta * descuento)
-                precio_descuento_unidad = math.floor(objeto["sells"]["unit_price"] * descuento)
-                precio_ecto = await self.get_precio_ecto(session)
-                precio_moneda_mistica = await self.get_precio_moneda_mistica(session)
-                try:
-                    async with session.get(f"https://api.guildwars2.com/v2/commerce/listings/{objeto_id}") as response:
-                        if response.status == 200:
-                            listings = await response.json()
-                        else:
-                            listings = {"sells": []}
-                except Exception:
-                    listings = {"sells": []}
-                ectos_requeridos = None
-                num_stacks_ectos = None
-                ectos_adicionales = None
-                monedas_misticas_requeridas = None
-                num_stacks_monedas = None
-                monedas_adicionales = None
-                embed = discord.Embed(
-                    title=f"💰 Price of {nombre_objeto}",
-                    color=self.get_rarity_color(rareza_objeto)
-                )
-                embed.set_thumbnail(url=imagen_objeto)
-                embed.add_field(
-                    name="<:TP:1328507535245836439> TP Prices",
-                    value=f"Sell: {self.calcular_monedas(precio_venta)}\nBuy: {self.calcular_monedas(precio_compra)}",
-                    inline=False
-                )
-                embed.add_field(
-                    name=f"💎 Price at {int(descuento * 100)}%",
-                    value=f"Per unit: {self.calcular_monedas(precio_descuento_unidad)}\n**Total ({quantity}x): {self.calcular_monedas(precio_descuento)}**",
-                    inline=False
-                )
-                # Sell listings (solo 3)
-                def format_sell_listings(listings, max_entries=3):
-                    if not listings or "sells" not in listings or not listings["sells"]:
-                        return "No sell listings available"
-                    formatted = []
-                    for i, entry in enumerate(listings["sells"][:max_entries]):
-                        price_str = self.calcular_monedas(entry["unit_price"])
-                        formatted.append(f"{i + 1}. {price_str} ({entry['quantity']}x)")
-                    return "\n".join(formatted)
-                embed.add_field(
-                    name="🔼 Sell listings",
-                    value=format_sell_listings(listings),
-                    inline=False
-                )
-                # Buy listings (solo 3)
-                def format_buy_listings(listings, max_entries=3):
-                    if not listings or "buys" not in listings or not listings["buys"]:
-                        return "No buy listings available"
-                    formatted = []
-                    for i, entry in enumerate(listings["buys"][:max_entries]):
-                        price_str = self.calcular_monedas(entry["unit_price"])
-                        formatted.append(f"{i + 1}. {price_str} ({entry['quantity']}x)")
-                    return "\n".join(formatted)
-                embed.add_field(
-                    name="🔽 Buy listings",
-                    value=format_buy_listings(listings),
-                    inline=False
-                )
-                cantidad_venta = sum(entry["quantity"] for entry in listings.get("sells", []))
-                cantidad_compra = sum(entry["quantity"] for entry in listings.get("buys", [])) if "buys" in listings else 0
-                embed.add_field(
-                    name="📦 Available in TP",
-                    value=f"On sale: {cantidad_venta}\nOn buy orders: {cantidad_compra}",
-                    inline=False
-                )
-                # Mostrar equivalentes según el tipo de item
-                equivalentes_full = {83410, 46743, 75919}
-                if rareza_objeto == "Legendary" or objeto_id in equivalentes_full:
-                    # Para Legendary y estos ítems: mostrar ambos equivalentes
-                    if precio_ecto:
-                        ectos_requeridos = math.ceil(precio_descuento / (precio_ecto * 0.9))
-                        num_stacks_ectos = ectos_requeridos // 250
-                        ectos_adicionales = ectos_requeridos % 250
-                        embed.add_field(
-                            name="<:Ecto:1328507640635986041> Equivalent in Ectos",
-                            value=f"{num_stacks_ectos} stack{'s' if num_stacks_ectos != 1 else ''} and {ectos_adicionales} extra\nTotal: {ectos_requeridos} <:Ecto:1328507640635986041>",
-                            inline=True
-                        )
-                    if precio_moneda_mistica:
-                        monedas_misticas_requeridas = math.ceil(precio_descuento / (precio_moneda_mistica * 0.9))
-                        num_stacks_monedas = monedas_misticas_requeridas // 250
-                        monedas_adicionales = monedas_misticas_requeridas % 250
-                        embed.add_field(
-                            name="<:mc:1328507835478315140> Equivalent in Mystic Coins",
-                            value=f"{num_stacks_monedas} stack{'s' if num_stacks_monedas != 1 else ''} and {monedas_adicionales} extra\nTotal: {monedas_misticas_requeridas} <:mc:1328507835478315140>",
-                            inline=True
-                        )
-                elif objeto_id == 19721:
-                    # Para Ectos (19721): solo mostrar equivalente en Mystic Coins
-                    if precio_moneda_mistica:
-                        monedas_misticas_requeridas = math.ceil(precio_descuento / (precio_moneda_mistica * 0.9))
-                        num_stacks_monedas = monedas_misticas_requeridas // 250
-                        monedas_adicionales = monedas_misticas_requeridas % 250
-                        embed.add_field(
-                            name="<:mc:1328507835478315140> Equivalent in Mystic Coins",
-                            value=f"{num_stacks_monedas} stack{'s' if num_stacks_monedas != 1 else ''} and {monedas_adicionales} extra\nTotal: {monedas_misticas_requeridas} <:mc:1328507835478315140>",
-                            inline=True
-                        )
-                elif objeto_id == 19976:
-                    # Para Mystic Coins (19976): solo mostrar equivalente en Ectos
-                    if precio_ecto:
-                        ectos_requeridos = math.ceil(precio_descuento / (precio_ecto * 0.9))
-                        num_stacks_ectos = ectos_requeridos // 250
-                        ectos_adicionales = ectos_requeridos % 250
-                        embed.add_field(
-                            name="<:Ecto:1328507640635986041> Equivalent in Ectos",
-                            value=f"{num_stacks_ectos} stack{'s' if num_stacks_ectos != 1 else ''} and {ectos_adicionales} extra\nTotal: {ectos_requeridos} <:Ecto:1328507640635986041>",
-                            inline=True
-                        )
-                # Ya no agrego el campo 'Copy name' al embed
+            # Detalles, precio del objeto y precios de ecto/moneda mística en paralelo;
+            # gw2api agrupa los ids en llamadas ?ids= y comparte las peticiones en vuelo
+            objeto_details, objeto, precio_ecto, precio_moneda_mistica = await asyncio.gather(
+                gw2api.get_item(objeto_id),
+                gw2api.get_price(objeto_id),
+                self.get_precio_ecto(),
+                self.get_precio_moneda_mistica(),
+            )
+            if not objeto_details:
+                await interaction.followup.send(f'Item with ID {objeto_id} was not found in the API.')
+                return
+            if not objeto:
+                await interaction.followup.send('This item does not have a valid price in the Trading Post.')
+                return
+            if not objeto or "sells" not in objeto or "buys" not in objeto:
+                await interaction.followup.send('The item does not have a valid sell price in the API.')
+                return
+            precio_venta = objeto["sells"]["unit_price"] * quantity
+            precio_compra = objeto["buys"]["unit_price"] * quantity
+            nombre_objeto = objeto_details["name"]
+            rareza_objeto = objeto_details["rarity"]
+            imagen_objeto = objeto_details["icon"]
+            descuento = (0.95 if objeto_id in NINETY_FIVE_PERCENT_ITEMS else 0.85 if rareza_objeto == "Legendary" and objeto_id not in EXCLUDED_LEGENDARY_ITEMS else 0.90)
+            precio_descuento = math.floor(precio_venta * descuento)
+            precio_descuento_unidad = math.floor(objeto["sells"]["unit_price"] * descuento)
+            try:
+                listings = await gw2api.get_json(f"commerce/listings/{objeto_id}")
+            except Exception:
+                listings = {"sells": []}
+            ectos_requeridos = None
+            num_stacks_ectos = None
+            ectos_adicionales = None
+            monedas_misticas_requeridas = None
+            num_stacks_monedas = None
+            monedas_adicionales = None
+            embed = discord.Embed(
+                title=f"💰 Price of {nombre_objeto}",
+                color=self.get_rarity_color(rareza_objeto)
+            )
+            embed.set_thumbnail(url=imagen_objeto)
+            embed.add_field(
+                name="<:TP:1328507535245836439> TP Prices",
+                value=f"Sell: {self.calcular_monedas(precio_venta)}\nBuy: {self.calcular_monedas(precio_compra)}",
+                inline=False
+            )
+            embed.add_field(
+                name=f"💎 Price at {int(descuento * 100)}%",
+                value=f"Per unit: {self.calcular_monedas(precio_descuento_unidad)}\n**Total ({quantity}x): {self.calcular_monedas(precio_descuento)}**",
+                inline=False
+            )
+            # Sell listings (solo 3)
+            def format_sell_listings(listings, max_entries=3):
+                if not listings or "sells" not in listings or not listings["sells"]:
+                    return "No sell listings available"
+                formatted = []
+                for i, entry in enumerate(listings["sells"][:max_entries]):
+                    price_str = self.calcular_monedas(entry["unit_price"])
+                    formatted.append(f"{i + 1}. {price_str} ({entry['quantity']}x)")
+                return "\n".join(formatted)
+            embed.add_field(
+                name="🔼 Sell listings",
+                value=format_sell_listings(listings),
+                inline=False
+            )
+            # Buy listings (solo 3)
+            def format_buy_listings(listings, max_entries=3):
+                if not listings or "buys" not in listings or not listings["buys"]:
+                    return "No buy listings available"
+                formatted = []
+                for i, entry in enumerate(listings["buys"][:max_entries]):
+                    price_str = self.calcular_monedas(entry["unit_price"])
+                    formatted.append(f"{i + 1}. {price_str} ({entry['quantity']}x)")
+                return "\n".join(formatted)
+            embed.add_field(
+                name="🔽 Buy listings",
+                value=format_buy_listings(listings),
+                inline=False
+            )
+            cantidad_venta = sum(entry["quantity"] for entry in listings.get("sells", []))
+            cantidad_compra = sum(entry["quantity"] for entry in listings.get("buys", [])) if "buys" in listings else 0
+            embed.add_field(
+                name="📦 Available in TP",
+                value=f"On sale: {cantidad_venta}\nOn buy orders: {cantidad_compra}",
+                inline=False
+            )
+            # Mostrar equivalentes según el tipo de item
+            equivalentes_full = {83410, 46743, 75919}
+            if rareza_objeto == "Legendary" or objeto_id in equivalentes_full:
+                # Para Legendary y estos ítems: mostrar ambos equivalentes
+                if precio_ecto:
+                    ectos_requeridos = math.ceil(precio_descuento / (precio_ecto * 0.9))
+                    num_stacks_ectos = ectos_requeridos // 250
+                    ectos_adicionales = ectos_requeridos % 250
+                    embed.add_field(
+                        name="<:Ecto:1328507640635986041> Equivalent in Ectos",
+                        value=f"{num_stacks_ectos} stack{'s' if num_stacks_ectos != 1 else ''} and {ectos_adicionales} extra\nTotal: {ectos_requeridos} <:Ecto:1328507640635986041>",
+                        inline=True
+                    )
+                if precio_moneda_mistica:
+                    monedas_misticas_requeridas = math.ceil(precio_descuento / (precio_moneda_mistica * 0.9))
+                    num_stacks_monedas = monedas_misticas_requeridas // 250
+                    monedas_adicionales = monedas_misticas_requeridas % 250
+                    embed.add_field(
+                        name="<:mc:1328507835478315140> Equivalent in Mystic Coins",
+                        value=f"{num_stacks_monedas} stack{'s' if num_stacks_monedas != 1 else ''} and {monedas_adicionales} extra\nTotal: {monedas_misticas_requeridas} <:mc:1328507835478315140>",
+                        inline=True
+                    )
+            elif objeto_id == 19721:
+                # Para Ectos (19721): solo mostrar equivalente en Mystic Coins
+                if precio_moneda_mistica:
+                    monedas_misticas_requeridas = math.ceil(precio_descuento / (precio_moneda_mistica * 0.9))
+                    num_stacks_monedas = monedas_misticas_requeridas // 250
+                    monedas_adicionales = monedas_misticas_requeridas % 250
+                    embed.add_field(
+                        name="<:mc:1328507835478315140> Equivalent in Mystic Coins",
+                        value=f"{num_stacks_monedas} stack{'s' if num_stacks_monedas != 1 else ''} and {monedas_adicionales} extra\nTotal: {monedas_misticas_requeridas} <:mc:1328507835478315140>",
+                        inline=True
+                    )
+            elif objeto_id == 19976:
+                # Para Mystic Coins (19976): solo mostrar equivalente en Ectos
+                if precio_ecto:
+                    ectos_requeridos = math.ceil(precio_descuento / (precio_ecto * 0.9))
+                    num_stacks_ectos = ectos_requeridos // 250
+                    ectos_adicionales = ectos_requeridos % 250
+                    embed.add_field(
+                        name="<:Ecto:1328507640635986041> Equivalent in Ectos",
+                        value=f"{num_stacks_ectos} stack{'s' if num_stacks_ectos != 1 else ''} and {ectos_adicionales} extra\nTotal: {ectos_requeridos} <:Ecto:1328507640635986041>",
+                        inline=True
+                    )
+            # Ya no agrego el campo 'Copy name' al embed
+            embed.add_field(
+                name="🔗 Links",
+                value=f"[GW2BLTC](https://www.gw2bltc.com/en/item/{objeto_id}) • [Wiki](https://wiki.guildwars2.com/wiki/Special:Search/{urllib.parse.quote(nombre_objeto)})",
+                inline=False
+            )
+            # Agregar mensaje sobre el cálculo al 90%
+            if (rareza_objeto == "Legendary" or objeto_id in equivalentes_full or objeto_id == 19721 or objeto_id == 19976):
                 embed.add_field(
-                    name="🔗 Links",
-                    value=f"[GW2BLTC](https://www.gw2bltc.com/en/item/{objeto_id}) • [Wiki](https://wiki.guildwars2.com/wiki/Special:Search/{urllib.parse.quote(nombre_objeto)})",
+                    name="ℹ️ Note",
+                    value="Equivalents are calculated at 90% TP value",
                     inline=False
                 )
-                # Agregar mensaje sobre el cálculo al 90%
-                if (rareza_objeto == "Legendary" or objeto_id in equivalentes_full or objeto_id == 19721 or objeto_id == 19976):
-                    embed.add_field(
-                        name="ℹ️ Note",
-                        value="Equivalents are calculated at 90% TP value",
-                        inline=False
-                    )
-                embed.set_footer(text=f"ID: {objeto_id} • Rarity: {rareza_objeto}", icon_url=imagen_objeto)
-                await interaction.followup.send(embed=embed)
+            embed.set_footer(text=f"ID: {objeto_id} • Rarity: {rareza_objeto}", icon_url=imagen_objeto)
+            await interaction.followup.send(embed=embed)
         except asyncio.TimeoutError:
             await interaction.followup.send('The API request is taking too long. Please try again later.')
         except Exception as error:
             print(f'Error while requesting the API: {error}')
             await interaction.followup.send('Oops! There was an error getting the item information.')
 
+    @commands.command(name='pricecache')
+    @commands.is_owner()
+    async def price_cache_stats(self, ctx):
+        """Muestra los contadores de la cache de precios del Trading Post."""
+        cache = gw2api.price_cache
+        stats = cache.stats
+        embed = discord.Embed(title="📈 Price cache", color=0x00C8FB)
+        embed.add_field(name="Hit rate", value=f"{stats.hit_rate:.1%}", inline=False)
+        embed.add_field(name="Hits", value=str(stats.hits), inline=True)
+        embed.add_field(name="Stale hits", value=str(stats.stale_hits), inline=True)
+        embed.add_field(name="Misses", value=str(stats.misses), inline=True)
+        embed.add_field(name="No price (cached)", value=str(stats.negative_hits), inline=True)
+        embed.add_field(name="Refreshes", value=f"{stats.refreshes} ({stats.refresh_errors} errors)", inline=True)
+        embed.add_field(name="Entries", value=str(len(cache)), inline=True)
+        embed.set_footer(text=f"TTL {cache.ttl:.0f}s • stale {cache.stale:.0f}s • no price {cache.negative_ttl:.0f}s")
+        await ctx.send(embed=embed)
+
 # Define setup function
 async def setup(bot):
     await bot.add_cog(ItemPrice(bot))
\ No newline at end of file
@@ -2,6 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import aiohttp
+from utils.http_session import get_session
 import json
 import logging
 import os
@@ -469,6 +470,9 @@ async def _analyze_upload_payload(
 # ─────────────────────────────────────────────────────────
 
 class Logs(commands.Cog):
+    # Opcional: se añade tras on_ready (ver CustomBot.add_cog)
+    load_after_ready = True
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._autouploader: Optional[LogAutouploader] = None
@@ -563,47 +567,47 @@ class Logs(commands.Cog):
             return
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(archivo.url) as dl:
-                    if dl.status != 200:
-                        embed_err = discord.Embed(
-                            title="❌ Error de Descarga",
-                            description="No se pudo descargar el archivo temporal desde los servidores de Discord.",
-                            color=0xE74C3C
-                        )
-                        await interaction.followup.send(embed=embed_err, ephemeral=True)
-                        return
-                    file_bytes = await dl.read()
-
-                user_token = os.getenv("DPS_REPORT_USER_TOKEN")
-                data, err = await upload_log_bytes(
-                    session,
-                    file_bytes,
-                    archivo.filename,
-                    user_token=user_token,
-                )
-                if err or not data:
-                    embed_err = discord.Embed(
-                        title="❌ Error en dps.report",
-                        description=f"No se pudo procesar el log.\n**Detalle:** `{err}`",
-                        color=0xE74C3C,
-                    )
-                    await interaction.followup.send(embed=embed_err, ephemeral=True)
-                    return
-
-                embed = await _analyze_upload_payload(session, data, interaction.guild)
-                if not embed:
+            session = get_session()
+            async with session.get(archivo.url) as dl:
+                if dl.status != 200:
                     embed_err = discord.Embed(
-                        title="❌ Error al generar análisis",
-                        description="No se pudo construir el embed del reporte.",
-                        color=0xE74C3C,
+                        title="❌ Error de Descarga",
+                        description="No se pudo descargar el archivo temporal desde los servidores de Discord.",
+                        color=0xE74C3C
                     )
                     await interaction.followup.send(embed=embed_err, ephemeral=True)
                     return
+                file_bytes = await dl.read()
+
+            user_token = os.getenv("DPS_REPORT_USER_TOKEN")
+            data, err = await upload_log_bytes(
+                session,
+                file_bytes,
+                archivo.filename,
+                user_token=user_token,
+            )
+            if err or not data:
+                embed_err = discord.Embed(
+                    title="❌ Error en dps.report",
+                    description=f"No se pudo procesar el log.\n**Detalle:** `{err}`",
+                    color=0xE74C3C,
+                )
+                await interaction.followup.send(embed=embed_err, ephemeral=True)
+                return
 
-                await interaction.followup.send(embed=embed)
+            embed = await _analyze_upload_payload(session, data, interaction.guild)
+            if not embed:
+                embed_err = discord.Embed(
+                    title="❌ Error al generar análisis",
+                    description="No se pudo construir el embed del reporte.",
+                    color=0xE74C3C,
+                )
+                await interaction.followup.send(embed=embed_err, ephemeral=True)
                 return
 
+            await interaction.followup.send(embed=embed)
+            return
+
         except aiohttp.ClientError as exc:
             embed_err = discord.Embed(
                 title="❌ Error de Conexión",
@@ -647,27 +651,27 @@ class Logs(commands.Cog):
         progress = await interaction.followup.send(embed=embed_loading)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                meta_url = "https://dps.report/getUploadMetadata"
-                async with session.get(meta_url, params={"id": log_id}) as resp:
-                    if resp.status != 200:
-                        await progress.edit(embed=discord.Embed(
-                            title="❌ Log no encontrado",
-                            description=f"dps.report respondió con HTTP `{resp.status}`.",
-                            color=0xE74C3C,
-                        ))
-                        return
-                    data = await resp.json(content_type=None)
-
-                if data.get("error"):
+            session = get_session()
+            meta_url = "https://dps.report/getUploadMetadata"
+            async with session.get(meta_url, params={"id": log_id}) as resp:
+                if resp.status != 200:
                     await progress.edit(embed=discord.Embed(
-                        title="❌ Error",
-                        description=f"`{data['error']}`",
+                        title="❌ Log no encontrado",
+                        description=f"dps.report respondió con HTTP `{resp.status}`.",
                         color=0xE74C3C,
                     ))
                     return
+                data = await resp.json(content_type=None)
+
+            if data.get("error"):
+                await progress.edit(embed=discord.Embed(
+                    title="❌ Error",
+                    description=f"`{data['error']}`",
+                    color=0xE74C3C,
+                ))
+                return
 
-                embed = await _analyze_upload_payload(session, data, interaction.guild)
+            embed = await _analyze_upload_payload(session, data, interaction.guild)
         except aiohttp.ClientError as exc:
             await progress.edit(embed=discord.Embed(
                 title="❌ Error de conexión",
@@ -875,10 +879,10 @@ class Logs(commands.Cog):
                 except Exception as exc:
                     fail.append(f"❌ {name}: {exc}")
 
-        async with aiohttp.ClientSession() as session:
-            await _upload_icons(SPEC_ICON_URL, _spec_emojis_cache, "gw2_", "Spec")
-            await _upload_icons(BOON_ICON_URL, _boon_emojis_cache, "gw2_", "Boon")
-            _refresh_boon_emojis_from_guilds(interaction.client)
+        session = get_session()
+        await _upload_icons(SPEC_ICON_URL, _spec_emojis_cache, "gw2_", "Spec")
+        await _upload_icons(BOON_ICON_URL, _boon_emojis_cache, "gw2_", "Boon")
+        _refresh_boon_emojis_from_guilds(interaction.client)
 
         try:
             with open(SPEC_EMOJIS_FILE, "w", encoding="utf-8") as f:
@@ -910,18 +914,18 @@ class Logs(commands.Cog):
             return
 
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {"page": 1, "content": cuenta}
-                async with session.get("https://dps.report/getUploads", params=params) as resp:
-                    if resp.status != 200:
-                        embed_err = discord.Embed(
-                            title="❌ Error de Búsqueda",
-                            description=f"dps.report respondió con un estado de error HTTP `{resp.status}`.",
-                            color=0xE74C3C
-                        )
-                        await interaction.followup.send(embed=embed_err, ephemeral=True)
-                        return
-                    data = await resp.json(content_type=None)
+            session = get_session()
+            params = {"page": 1, "content": cuenta}
+            async with session.get("https://dps.report/getUploads", params=params) as resp:
+                if resp.status != 200:
+                    embed_err = discord.Embed(
+                        title="❌ Error de Búsqueda",
+                        description=f"dps.report respondió con un estado de error HTTP `{resp.status}`.",
+                        color=0xE74C3C
+                    )
+                    await interaction.followup.send(embed=embed_err, ephemeral=True)
+                    return
+                data = await resp.json(content_type=None)
         except aiohttp.ClientError as exc:
             embed_err = discord.Embed(
                 title="❌ Error de Red",
@@ -3,7 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 from discord.ui import Select, View
 import logging
-import aiohttp
+from utils.gw2api import gw2api
 import asyncio
 from typing import Optional, List, Dict, Any
 
@@ -78,42 +78,28 @@ class MaterialPriceCalculator:
 
     @staticmethod
     async def fetch_material_prices(materials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for material in materials:
-                url = f"https://api.guildwars2.com/v2/commerce/prices/{material['itemId']}"
-                task = MaterialPriceCalculator.fetch_price_for_material(session, material, url)
-                tasks.append(task)
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            valid_results = [result for result in results if not isinstance(result, Exception) and result is not None]
-            if not valid_results:
-                raise ValueError("No valid price data could be retrieved")
-            return valid_results
+        # Una sola llamada ?ids= para todos los materiales de la categoría
+        prices = await gw2api.get_prices(material["itemId"] for material in materials)
+        results = [MaterialPriceCalculator.build_material_price(material, prices.get(material["itemId"]))
+                   for material in materials]
+        valid_results = [result for result in results if result is not None]
+        if not valid_results:
+            raise ValueError("No valid price data could be retrieved")
+        return valid_results
 
     @staticmethod
-    async def fetch_price_for_material(session: aiohttp.ClientSession, material: Dict[str, Any], url: str) -> Optional[
-        Dict[str, Any]]:
-        try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logging.error(f"API returned status {response.status} for {material['name']}")
-                    return None
-                data = await response.json()
-                if "sells" not in data or "unit_price" not in data["sells"]:
-                    logging.error(f"Invalid price data format for {material['name']}")
-                    return None
-                return {
-                    **material,
-                    "unitPrice": data["sells"]["unit_price"],
-                    "totalPrice": data["sells"]["unit_price"] * material["stackSize"]
-                }
-        except aiohttp.ClientError as e:
-            logging.error(f"Network error fetching {material['name']}: {e}")
+    def build_material_price(material: Dict[str, Any], data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if data is None:
+            logging.error(f"No price data returned for {material['name']}")
             return None
-        except Exception as e:
-            logging.error(f"Unexpected error fetching {material['name']}: {e}")
+        if "sells" not in data or "unit_price" not in data["sells"]:
+            logging.error(f"Invalid price data format for {material['name']}")
             return None
+        return {
+            **material,
+            "unitPrice": data["sells"]["unit_price"],
+            "totalPrice": data["sells"]["unit_price"] * material["stackSize"]
+        }
 
     @staticmethod
     def create_embed(category: str, price_data: List[Dict[str, Any]] = None) -> discord.Embed:
@@ -4,6 +4,7 @@ from discord.ext import commands
 from typing import Optional
 import os
 import json
+from utils.message_cache import message_cache
 
 
 class CreateMessageModal(discord.ui.Modal):
@@ -79,8 +80,14 @@ class EditMessageModal(discord.ui.Modal):
                     try:
                         channel = self.cog.bot.get_channel(msg_data["channel_id"])
                         if channel:
-                            message = await channel.fetch_message(self.message_id)
-                            await message.edit(content=self.mensaje_input.value)
+                            message = await message_cache.edit(channel, self.message_id, content=self.mensaje_input.value)
+                            if message is None:
+                                await interaction.followup.send(
+                                    f"❌ **Error al actualizar el mensaje**\n"
+                                    f"El mensaje ya no existe. Puede que haya sido eliminado.",
+                                    ephemeral=True
+                                )
+                                return
                             
                             # Actualizar el contenido guardado
                             self.cog.update_message_content(
@@ -1,9 +1,11 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import datetime
 import re
-from typing import Optional, Tuple
+import uuid
+from typing import Dict, Optional, Tuple
 from utils.database import dbManager
+from utils.scheduler import HeapScheduler
 
 class TimeConverter:
     time_regex = re.compile(r"""
@@ -30,71 +32,97 @@ class TimeConverter:
 
         return datetime.timedelta(**params)
 
+# Solo se mantienen en memoria los recordatorios que vencen dentro de esta ventana
+LOAD_WINDOW = datetime.timedelta(hours=24)
+LOAD_WINDOW_KEY = "__load_window__"
+
 class Reminders(commands.Cog):
     """Un cog para manejar recordatorios"""
 
     def __init__(self, bot):
         self.bot = bot
-        self.reminders = []
-        self.check_reminders.start()
+        # id -> recordatorio; el heap solo guarda (vencimiento, id)
+        self.reminders: Dict[str, dict] = {}
+        self.scheduler = HeapScheduler(self.send_reminder, name="reminders")
+        # Epoch hasta el que ya se leyeron recordatorios de Firestore
+        self.loaded_until: Optional[float] = None
         print("✅ Inicializado Reminders Cog")
 
     async def cog_load(self):
         """Este método se llama cuando el cog es cargado"""
         print("🔄 Cargando recordatorios...")
+        await dbManager.migrateLegacyReminders()
         await self.load_reminders()
+        self.scheduler.start()
         print("✅ Recordatorios cargados")
 
-    def cog_unload(self):
+    async def cog_unload(self):
         """Este método se llama cuando el cog es descargado"""
         print("🔄 Descargando Reminders Cog")
-        self.check_reminders.cancel()
+        await self.scheduler.stop()
+
+    def add_reminder(self, reminder):
+        reminder.setdefault('id', uuid.uuid4().hex)
+        self.reminders[reminder['id']] = reminder
+        self.scheduler.schedule(reminder['id'], reminder['time'].timestamp())
+
+    def discard_reminder(self, reminder):
+        self.reminders.pop(reminder['id'], None)
+        self.scheduler.cancel(reminder['id'])
+
+    @staticmethod
+    def reminder_from_data(reminder_data) -> Optional[dict]:
+        """Convierte un documento de Firestore en recordatorio; None si está incompleto"""
+        # Validar campos requeridos
+        required_fields = ['user_id', 'channel_id', 'message', 'time']
+        missing_fields = [field for field in required_fields if field not in reminder_data]
+        if missing_fields:
+            print(f"❌ Datos incompletos en recordatorio: Faltan los campos {missing_fields}. Datos: {reminder_data}")
+            return None
+
+        # Validar y convertir la fecha
+        time_str = reminder_data['time']
+        try:
+            reminder_time = datetime.datetime.fromisoformat(time_str)
+        except (ValueError, TypeError) as e:
+            print(f"❌ Error en formato de fecha: time={time_str}. Error: {e}")
+            return None
+
+        # Usar las IDs como cadenas directamente desde la base de datos
+        user_id = reminder_data['user_id']  # Destinatario del recordatorio
+        return {
+            'id': reminder_data['id'],
+            'user_id': user_id,  # Destinatario
+            'creator_id': reminder_data.get('creator_id', user_id),  # Quién lo creó
+            'channel_id': reminder_data['channel_id'],
+            'target_id': reminder_data.get('target_id'),  # Puede ser None
+            'message': reminder_data['message'],
+            'time': reminder_time,
+            'original_message': reminder_data.get('original_message', '')
+        }
 
     async def load_reminders(self):
+        """Carga la siguiente ventana de recordatorios y programa la carga de la próxima"""
+        until = datetime.datetime.now() + LOAD_WINDOW
         try:
-            reminders_data = await dbManager.get_all_reminders()
-            self.reminders = []
-            
+            reminders_data = await dbManager.get_reminders_due_before(until.timestamp(), after=self.loaded_until)
+            loaded = 0
             for reminder_data in reminders_data:
                 try:
-                    # Validar campos requeridos
-                    required_fields = ['user_id', 'channel_id', 'message', 'time']
-                    missing_fields = [field for field in required_fields if field not in reminder_data]
-                    if missing_fields:
-                        print(f"❌ Datos incompletos en recordatorio: Faltan los campos {missing_fields}. Datos: {reminder_data}")
-                        continue
-
-                    # Usar las IDs como cadenas directamente desde la base de datos
-                    user_id = reminder_data['user_id']  # Destinatario del recordatorio
-                    channel_id = reminder_data['channel_id']
-                    message = reminder_data['message']
-                    time_str = reminder_data['time']
-
-                    # Validar y convertir la fecha
-                    try:
-                        reminder_time = datetime.datetime.fromisoformat(time_str)
-                    except (ValueError, TypeError) as e:
-                        print(f"❌ Error en formato de fecha: time={time_str}. Error: {e}")
-                        continue
-
-                    # Procesar el recordatorio
-                    self.reminders.append({
-                        'user_id': user_id,  # Destinatario
-                        'creator_id': reminder_data.get('creator_id', user_id),  # Quién lo creó
-                        'channel_id': channel_id,
-                        'target_id': reminder_data.get('target_id'),  # Puede ser None
-                        'message': message,
-                        'time': reminder_time,
-                        'original_message': reminder_data.get('original_message', '')
-                    })
+                    reminder = self.reminder_from_data(reminder_data)
+                    if reminder and reminder['id'] not in self.reminders:
+                        self.add_reminder(reminder)
+                        loaded += 1
                 except Exception as e:
                     print(f"❌ Error procesando datos del recordatorio: {e}. Datos: {reminder_data}")
                     continue
-                    
-            print(f"✅ Cargados {len(self.reminders)} recordatorios exitosamente")
+
+            self.loaded_until = until.timestamp()
+            print(f"✅ Cargados {loaded} recordatorios exitosamente")
         except Exception as e:
             print(f"❌ Error cargando recordatorios de Firebase: {e}")
-            self.reminders = []
+        # Los recordatorios más lejanos se leen cuando se acerque el final de la ventana
+        self.scheduler.schedule(LOAD_WINDOW_KEY, until.timestamp())
 
     async def save_reminder(self, reminder):
         try:
@@ -105,58 +133,71 @@ class Reminders(commands.Cog):
                 'target_id': str(reminder['target_id']) if reminder.get('target_id') else None,
                 'message': reminder['message'],
                 'time': reminder['time'].isoformat(),
+                'due_at': reminder['time'].timestamp(),
                 'original_message': reminder.get('original_message', '')
             }
             
-            return await dbManager.setReminder(str(reminder['user_id']), reminder_data)
+            return await dbManager.saveUserReminder(reminder['id'], reminder_data)
         except Exception as e:
             print(f"❌ Error guardando recordatorio en Firebase: {e}")
             return False
 
     async def delete_reminder(self, reminder):
         try:
-            return await dbManager.deleteReminder(str(reminder['user_id']))
+            return await dbManager.deleteUserReminder(reminder['id'])
         except Exception as e:
             print(f"❌ Error eliminando recordatorio de Firebase: {e}")
             return False
 
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        now = datetime.datetime.now()
-        reminders_to_remove = []
-
-        for reminder in self.reminders:
-            if reminder['time'] <= now:
-                user = self.bot.get_user(int(reminder['user_id']))  # Enviar al destinatario
-                if user:
-                    embed = discord.Embed(
-                        title="Reminder",
-                        color=discord.Color.blue(),
-                    )
-                    embed.add_field(
-                        name="Message",
-                        value=reminder['message'],
-                        inline=False
-                    )
-                    embed.add_field(
-                        name="Created at",
-                        value=reminder['time'].strftime('%Y-%m-%d %H:%M:%S'),
-                        inline=False
-                    )
-                    embed.add_field(
-                        name="By",
-                        value=f"<@{reminder['creator_id']}>",  # Mostrar quién lo creó
-                        inline=False
-                    )
-                    try:
-                        await user.send(embed=embed)
-                    except discord.HTTPException:
-                        pass
-                reminders_to_remove.append(reminder)
-
-        for reminder in reminders_to_remove:
-            self.reminders.remove(reminder)
-            await self.delete_reminder(reminder)
+    async def get_user_reminders(self, user_id: str):
+        """Recordatorios pendientes del usuario (incluye los que aún no están en memoria)"""
+        reminders_data = await dbManager.getUserReminders(user_id)
+        if reminders_data is None:
+            return [r for r in self.reminders.values() if r['user_id'] == user_id]
+        reminders = []
+        for reminder_data in reminders_data:
+            # Preferir la copia en memoria si ya está programado
+            reminder = self.reminders.get(reminder_data['id']) or self.reminder_from_data(reminder_data)
+            if reminder:
+                reminders.append(reminder)
+        return reminders
+
+    async def send_reminder(self, reminder_id, _payload=None):
+        """Callback del planificador: se ejecuta justo cuando vence el recordatorio"""
+        if reminder_id == LOAD_WINDOW_KEY:
+            await self.load_reminders()
+            return
+        reminder = self.reminders.pop(reminder_id, None)
+        if reminder is None:
+            return
+
+        user = self.bot.get_user(int(reminder['user_id']))  # Enviar al destinatario
+        if user:
+            embed = discord.Embed(
+                title="Reminder",
+                color=discord.Color.blue(),
+            )
+            embed.add_field(
+                name="Message",
+                value=reminder['message'],
+                inline=False
+            )
+            embed.add_field(
+                name="Created at",
+                value=reminder['time'].strftime('%Y-%m-%d %H:%M:%S'),
+                inline=False
+            )
+            embed.add_field(
+                name="By",
+                value=f"<@{reminder['creator_id']}>",  # Mostrar quién lo creó
+                inline=False
+            )
+            try:
+                await user.send(embed=embed)
+            except discord.HTTPException:
+                pass
+
+        await self.delete_reminder(reminder)
 
     @commands.group(name='reminder', aliases=['remind'], invoke_without_command=True)
     async def reminder(self, ctx, *, content: str):
@@ -179,7 +220,7 @@ class Reminders(commands.Cog):
                 'original_message': f"Establecido el {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             }
 
-            self.reminders.append(reminder)
+            self.add_reminder(reminder)
             success = await self.save_reminder(reminder)
 
             if success:
@@ -206,7 +247,7 @@ class Reminders(commands.Cog):
     @commands.command(name='reminders', aliases=['listreminders', 'myreminders'])
     async def list_reminders(self, ctx):
         """Muestra todos tus recordatorios activos"""
-        user_reminders = [r for r in self.reminders if r['user_id'] == str(ctx.author.id)]  # Solo los del autor
+        user_reminders = await self.get_user_reminders(str(ctx.author.id))  # Solo los del autor
         
         if not user_reminders:
             await ctx.send("No tienes recordatorios activos.")
@@ -241,14 +282,14 @@ class Reminders(commands.Cog):
     @commands.command(name='removereminder', aliases=['remove', 'delreminder'])
     async def remove_reminder(self, ctx, index: int):
         """Elimina un recordatorio específico por su número"""
-        user_reminders = [r for r in self.reminders if r['user_id'] == str(ctx.author.id)]  # Solo los del autor
+        user_reminders = await self.get_user_reminders(str(ctx.author.id))  # Solo los del autor
         
         if not user_reminders or index > len(user_reminders) or index < 1:
             await ctx.send("❌ Índice de recordatorio inválido.")
             return
 
         reminder_to_remove = user_reminders[index - 1]
-        self.reminders.remove(reminder_to_remove)
+        self.discard_reminder(reminder_to_remove)
         success = await self.delete_reminder(reminder_to_remove)
         
         if success:
@@ -259,7 +300,7 @@ class Reminders(commands.Cog):
     @commands.command(name='removeall', aliases=['clearreminders'])
     async def remove_all_reminders(self, ctx):
         """Elimina todos tus recordatorios activos"""
-        user_reminders = [r for r in self.reminders if r['user_id'] == str(ctx.author.id)]  # Solo los del autor
+        user_reminders = await self.get_user_reminders(str(ctx.author.id))  # Solo los del autor
 
         if not user_reminders:
             await ctx.send("No tienes recordatorios activos para eliminar.")
@@ -267,7 +308,7 @@ class Reminders(commands.Cog):
 
         success = True
         for reminder in user_reminders:
-            self.reminders.remove(reminder)
+            self.discard_reminder(reminder)
             if not await self.delete_reminder(reminder):
                 success = False
 
@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union
 
 
 class RoleToggleButton(discord.ui.Button):
@@ -68,23 +68,22 @@ class RoleAssigner(commands.Cog):
         self.db = getattr(self.bot, "db", None)
         self.firestore = self.db.db if self.db else None
         self.role_messages = self.firestore.collection("role_messages") if self.firestore else None
-        # Mapeo en memoria para mensajes de reacción: {message_id: [{"role_id": int, "emoji": str}]}
-        self.reaction_role_messages: Dict[int, List[Dict[str, Any]]] = {}
+        # Índice en memoria para mensajes de reacción: {(message_id, emoji_id o nombre unicode): role_id}
+        # Los emojis se interpretan al cargar, no en cada reacción
+        self.reaction_role_messages: Dict[Tuple[int, Union[int, str]], int] = {}
 
     async def cog_load(self):
         """Al cargar el cog, re-registra vistas persistentes desde Firestore."""
         if not self.role_messages:
             return
         try:
-            for doc in self.role_messages.stream():
+            docs = await self.db.run(lambda: list(self.role_messages.stream()))
+            for doc in docs:
                 data = doc.to_dict()
                 message_id = int(data.get("message_id"))
                 roles_data = data.get("roles") or []
                 # Guardar mapeo de reacciones en memoria
-                self.reaction_role_messages[message_id] = [
-                    {"role_id": int(entry.get("role_id")), "emoji": str(entry.get("emoji"))}
-                    for entry in roles_data if entry.get("role_id") and entry.get("emoji")
-                ]
+                self._index_reaction_roles(message_id, roles_data)
         except Exception as e:
             print(f"❌ Error cargando mapeo de roles por reacción: {e}")
 
@@ -99,23 +98,34 @@ class RoleAssigner(commands.Cog):
             return str(emoji_value)
 
     @staticmethod
-    def _emoji_matches(payload_emoji: discord.PartialEmoji, stored_emoji: str) -> bool:
+    def _emoji_key(emoji_value: str) -> Union[int, str]:
+        """Clave de un emoji guardado: su id si es personalizado, el propio carácter si es unicode."""
         try:
-            pe = discord.PartialEmoji.from_str(stored_emoji)
-            if pe.id is not None and payload_emoji.id is not None:
-                return pe.id == payload_emoji.id
-            # Unicode
-            return (pe.name or stored_emoji) == (payload_emoji.name or str(payload_emoji))
+            pe = discord.PartialEmoji.from_str(emoji_value)
+            return pe.id if pe.id is not None else (pe.name or emoji_value)
         except Exception:
-            return str(payload_emoji) == stored_emoji
+            return emoji_value
+
+    def _index_reaction_roles(self, message_id: int, roles_data: Iterable[Dict[str, Any]]) -> None:
+        """(Re)construye las entradas del índice de reacciones de un mensaje."""
+        for key in [k for k in self.reaction_role_messages if k[0] == message_id]:
+            del self.reaction_role_messages[key]
+        for entry in roles_data:
+            if entry.get("role_id") and entry.get("emoji"):
+                key = (message_id, self._emoji_key(str(entry.get("emoji"))))
+                self.reaction_role_messages.setdefault(key, int(entry.get("role_id")))
+
+    def _reaction_role_id(self, payload: discord.RawReactionActionEvent) -> Optional[int]:
+        emoji = payload.emoji
+        return self.reaction_role_messages.get((payload.message_id, emoji.id if emoji.id is not None else emoji.name))
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         # Ignorar bots
         if payload.user_id == (self.bot.user.id if self.bot.user else 0):
             return
-        roles_cfg = self.reaction_role_messages.get(payload.message_id)
-        if not roles_cfg:
+        matched_role_id = self._reaction_role_id(payload)
+        if not matched_role_id:
             return
         guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
         if guild is None:
@@ -123,13 +133,6 @@ class RoleAssigner(commands.Cog):
         member = guild.get_member(payload.user_id)
         if member is None or member.bot:
             return
-        matched_role_id = None
-        for entry in roles_cfg:
-            if self._emoji_matches(payload.emoji, str(entry.get("emoji"))):
-                matched_role_id = int(entry.get("role_id"))
-                break
-        if not matched_role_id:
-            return
         role = guild.get_role(matched_role_id)
         if role is None:
             return
@@ -145,8 +148,8 @@ class RoleAssigner(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
-        roles_cfg = self.reaction_role_messages.get(payload.message_id)
-        if not roles_cfg or not payload.guild_id:
+        matched_role_id = self._reaction_role_id(payload)
+        if not matched_role_id or not payload.guild_id:
             return
         guild = self.bot.get_guild(payload.guild_id)
         if guild is None:
@@ -154,13 +157,6 @@ class RoleAssigner(commands.Cog):
         member = guild.get_member(payload.user_id)
         if member is None or member.bot:
             return
-        matched_role_id = None
-        for entry in roles_cfg:
-            if self._emoji_matches(payload.emoji, str(entry.get("emoji"))):
-                matched_role_id = int(entry.get("role_id"))
-                break
-        if not matched_role_id:
-            return
         role = guild.get_role(matched_role_id)
         if role is None:
             return
@@ -264,7 +260,7 @@ class RoleAssigner(commands.Cog):
             # 2) Guardar en Firestore para reactivar al reiniciar
             if self.role_messages is not None:
                 doc_id = f"{interaction.guild.id}-{sent_msg.id}"
-                self.role_messages.document(doc_id).set({
+                await self.db.run(self.role_messages.document(doc_id).set, {
                     "guild_id": interaction.guild.id,
                     "channel_id": canal.id,
                     "message_id": sent_msg.id,
@@ -273,9 +269,7 @@ class RoleAssigner(commands.Cog):
                 })
 
             # 3) Guardar en memoria el mapeo para los listeners
-            self.reaction_role_messages[sent_msg.id] = [
-                {"role_id": r.id, "emoji": e} for r, e in role_emoji_pairs
-            ]
+            self._index_reaction_roles(sent_msg.id, [{"role_id": r.id, "emoji": e} for r, e in role_emoji_pairs])
 
             await interaction.response.send_message(
                 f"Mensaje creado en {canal.mention}.",
@@ -306,7 +300,7 @@ class RoleAssigner(commands.Cog):
 
         # Buscar documento en Firestore
         doc_id = f"{interaction.guild.id}-{msg_id}"
-        doc = self.role_messages.document(doc_id).get() if self.role_messages else None
+        doc = await self.db.run(self.role_messages.document(doc_id).get) if self.role_messages else None
         if not doc or not doc.exists:
             await interaction.response.send_message("No encontré configuración guardada para ese mensaje.", ephemeral=True)
             return
@@ -343,10 +337,7 @@ class RoleAssigner(commands.Cog):
                     continue
 
         # Registrar en memoria para listeners
-        self.reaction_role_messages[msg_id] = [
-            {"role_id": int(e.get("role_id")), "emoji": str(e.get("emoji"))}
-            for e in roles_data if e.get("role_id") and e.get("emoji")
-        ]
+        self._index_reaction_roles(msg_id, roles_data)
 
         await interaction.response.send_message(
             f"Migración completada. Se añadieron {added} reacciones.", ephemeral=True
@@ -2,11 +2,24 @@ import discord
 from discord.ext import commands
 import random
 import asyncio
+import heapq
+import os
+from array import array
+from bisect import bisect_left
 
 # Lista configurable de roles permitidos: introducir IDs (int) o nombres (str)
 # Ejemplo: ALLOWED_ROLES = [123456789012345678, "Moderador"]
 ALLOWED_ROLES = ["Game Master", "Game Sage L", "Game Sage F"]
 MAX_RULETA_GANADORES = 50
+# Las inscripciones se acumulan en memoria y se escriben juntas cada N ms (o al girar)
+PARTICIPANT_FLUSH_MS = int(os.getenv("ROULETTE_FLUSH_MS", 2000))
+
+# Estados persistidos de una ruleta; cada transición es un compare-and-set en Firestore
+OPEN = "open"
+SPINNING = "spinning"
+RESOLVED = "resolved"
+# Intentos de guardar spinning → resolved antes de rendirse (espera 1 s, 2 s, 4 s...)
+RESOLVE_RETRIES = 4
 
 
 def has_roles_allowed():
@@ -23,10 +36,47 @@ def has_roles_allowed():
 
     return commands.check(predicate)
 
+class ParticipantSet:
+    """Ids de Discord en un array ordenado de enteros de 64 bits (8 bytes por id,
+    frente a ~60 en un set de int) más un set pequeño de altas recientes que se
+    funde en el array al crecer."""
+
+    __slots__ = ("_base", "_recent")
+    MERGE_AT = 256
+
+    def __init__(self, ids=()):
+        self._base = array("Q", sorted({int(uid) for uid in ids}))
+        self._recent = set()
+
+    def __contains__(self, user_id):
+        if user_id in self._recent:
+            return True
+        i = bisect_left(self._base, user_id)
+        return i < len(self._base) and self._base[i] == user_id
+
+    def add(self, user_id):
+        if user_id in self:
+            return
+        self._recent.add(user_id)
+        if len(self._recent) >= self.MERGE_AT:
+            self._base = array("Q", heapq.merge(self._base, sorted(self._recent)))
+            self._recent = set()
+
+    def __len__(self):
+        return len(self._base) + len(self._recent)
+
+    def __iter__(self):
+        yield from self._base
+        yield from self._recent
+
 class Roulette(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.active_roulettes = {}  # channel_id -> participants, creator, active, msg_id, guild_id, winner_count
+        self.active_roulettes = {}  # channel_id -> participants, creator, state, msg_id, guild_id, winner_count, winners
+        # Write-behind: participantes aún no guardados en Firestore (el set en memoria manda)
+        self.pending_participants = {}  # channel_id -> set(user_id)
+        self._flush_task = None
+        self._resume_tasks = set()
 
     def is_admin_or_owner():
         async def predicate(ctx):
@@ -35,23 +85,91 @@ class Roulette(commands.Cog):
 
     async def cog_load(self):
         """Restaura las ruletas activas desde Firebase al iniciar el bot."""
+        # Solo interesan los "." en canales con una ruleta abierta
+        self.bot.router.register("roulette", self.handle_message, predicate=self._wants_message)
         try:
+            # Una sola consulta trae las ruletas abiertas y las que quedaron a medio girar
             stored = await self.bot.db.getActiveRoulettes()
             for r in stored:
                 channel_id = int(r['channel_id'])
                 self.active_roulettes[channel_id] = {
-                    "participants": set(int(uid) for uid in r.get('participants', [])),
+                    "participants": ParticipantSet(r.get('participants', [])),
                     "creator": int(r.get('creator_id', 0)),
-                    "active": bool(r.get('active', True)),
+                    "state": r.get('state', OPEN),
                     "msg_id": int(r.get('msg_id', 0)),
                     "guild_id": int(r.get('guild_id', 0)),
                     "winner_count": max(1, min(int(r.get("winner_count", 1)), MAX_RULETA_GANADORES)),
+                    "winners": [int(uid) for uid in r.get('winners', [])],
                 }
+                if self.active_roulettes[channel_id]["state"] == SPINNING:
+                    task = asyncio.create_task(self._resume_spin(channel_id))
+                    self._resume_tasks.add(task)
+                    task.add_done_callback(self._resume_tasks.discard)
             if stored:
                 print(f"✅ Ruletas restauradas: {len(stored)}")
         except Exception as e:
             print(f"⚠️ No se pudieron restaurar las ruletas: {e}")
 
+    def _queue_participant(self, channel_id: int, user_id: int):
+        self.pending_participants.setdefault(channel_id, set()).add(user_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        while self.pending_participants:
+            await asyncio.sleep(PARTICIPANT_FLUSH_MS / 1000)
+            await self.flush_participants()
+
+    async def flush_participants(self, channel_id: int = None):
+        """Escribe los participantes pendientes (de un canal o de todos) en una actualización por ruleta."""
+        channel_ids = [channel_id] if channel_id is not None else list(self.pending_participants)
+        for cid in channel_ids:
+            user_ids = self.pending_participants.pop(cid, None)
+            if not user_ids or cid not in self.active_roulettes:
+                continue
+            try:
+                await self.bot.db.addRouletteParticipants(cid, user_ids)
+            except Exception as e:
+                print(f"⚠️ No se pudieron persistir {len(user_ids)} participantes de la ruleta {cid}: {e}")
+                # Se reintenta en la próxima escritura si la ruleta sigue abierta
+                if cid in self.active_roulettes:
+                    self.pending_participants.setdefault(cid, set()).update(user_ids)
+
+    async def _resume_spin(self, channel_id: int):
+        """Anuncia los ganadores ya sorteados de una ruleta que quedó girando al reiniciarse el bot."""
+        await self.bot.wait_until_ready()
+        roulette = self.active_roulettes.get(channel_id)
+        if roulette is None:
+            return
+        channel = self.bot.get_channel(channel_id)
+        winner_ids = roulette["winners"]
+        if channel is not None and winner_ids:
+            try:
+                embed = await self._winners_embed(winner_ids, len(roulette["participants"]), roulette["winner_count"])
+                await channel.send(embed=embed)
+            except Exception as e:
+                print(f"⚠️ No se pudieron anunciar los ganadores de la ruleta {channel_id}: {e}")
+        await self._resolve(channel_id)
+
+    async def _resolve(self, channel_id: int):
+        """Marca la ruleta como resuelta en Firestore y solo entonces la olvida en memoria.
+
+        Si el documento se quedara en `spinning`, al reiniciar `_resume_spin` volvería a
+        anunciar los ganadores; mientras no se guarde, la ruleta sigue ocupando el canal.
+        """
+        for attempt in range(RESOLVE_RETRIES):
+            applied = await self.bot.db.transitionRoulette(channel_id, SPINNING, RESOLVED)
+            if applied is not None:
+                # False: otro proceso ya la resolvió o la canceló; en ambos casos está cerrada
+                self.active_roulettes.pop(channel_id, None)
+                self.pending_participants.pop(channel_id, None)
+                return True
+            if attempt < RESOLVE_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+        print(f"❌ La ruleta {channel_id} sigue como 'spinning' tras {RESOLVE_RETRIES} intentos; "
+              f"usa !cancelar_ruleta en el canal para cerrarla")
+        return False
+
     async def _gw2_account_name(self, user_id: int):
         try:
             api_key = await self.bot.db.getApiKey(user_id)
@@ -81,7 +199,7 @@ class Roulette(commands.Cog):
             await ctx.send(f"❌ El número de ganadores debe estar entre **1** y **{MAX_RULETA_GANADORES}**.")
             return
         
-        if channel_id in self.active_roulettes and self.active_roulettes[channel_id]['active']:
+        if channel_id in self.active_roulettes:
             await ctx.send("❌ Ya hay una ruleta activa en este canal.")
             return
 
@@ -99,12 +217,13 @@ class Roulette(commands.Cog):
         msg = await ctx.send(embed=embed)
 
         self.active_roulettes[channel_id] = {
-            "participants": set(),
+            "participants": ParticipantSet(),
             "creator": ctx.author.id,
-            "active": True,
+            "state": OPEN,
             "msg_id": msg.id,
             "guild_id": ctx.guild.id if ctx.guild else 0,
             "winner_count": ganadores,
+            "winners": [],
         }
 
         await self.bot.db.saveRoulette(channel_id, {
@@ -112,7 +231,9 @@ class Roulette(commands.Cog):
             "creator_id": ctx.author.id,
             "msg_id": msg.id,
             "active": True,
+            "state": OPEN,
             "participants": [],
+            "winners": [],
             "winner_count": ganadores,
         })
 
@@ -129,7 +250,7 @@ class Roulette(commands.Cog):
     async def set_roulette_winners(self, ctx, cantidad: int):
         """Cambia cuántos ganadores saldrán al girar (ruleta ya abierta). Ej. `.ganadores_ruleta 5`."""
         channel_id = ctx.channel.id
-        if channel_id not in self.active_roulettes or not self.active_roulettes[channel_id]["active"]:
+        if channel_id not in self.active_roulettes or self.active_roulettes[channel_id]["state"] != OPEN:
             await ctx.send("❌ No hay ninguna ruleta activa en este canal.")
             return
         if cantidad < 1 or cantidad > MAX_RULETA_GANADORES:
@@ -145,34 +266,62 @@ class Roulette(commands.Cog):
         """Gira la ruleta y elige el número de ganadores configurado (sin repetir entre la misma lista)."""
         channel_id = ctx.channel.id
 
-        if channel_id not in self.active_roulettes or not self.active_roulettes[channel_id]['active']:
+        roulette = self.active_roulettes.get(channel_id)
+        if roulette is None or roulette['state'] != OPEN:
             await ctx.send("❌ No hay ninguna ruleta activa en este canal.")
             return
 
-        participants = list(self.active_roulettes[channel_id]['participants'])
-        
+        participants = list(roulette['participants'])
+
         if not participants:
             await ctx.send("❌ No hay participantes en la ruleta.")
             return
 
-        requested = int(self.active_roulettes[channel_id].get("winner_count", 1))
+        requested = int(roulette.get("winner_count", 1))
         k = min(max(1, requested), len(participants))
 
-        self.active_roulettes[channel_id]['active'] = False
-        
+        # Cerrar inscripciones y dejar guardada la lista completa antes del sorteo
+        roulette['state'] = SPINNING
+        await self.flush_participants(channel_id)
+
+        # Los ganadores se guardan en la misma transición open → spinning: si el bot se
+        # reinicia a mitad del giro se anuncian esos mismos, sin volver a sortear
+        winner_ids = random.sample(participants, k)
+        applied = await self.bot.db.transitionRoulette(channel_id, OPEN, SPINNING, {"winners": winner_ids})
+        if applied is None:
+            roulette['state'] = OPEN
+            await ctx.send("⚠️ No se pudo guardar el sorteo. Inténtalo de nuevo.")
+            return
+        if not applied:
+            # Otro proceso ya la giró o la cerró
+            self.active_roulettes.pop(channel_id, None)
+            await ctx.send("❌ Esta ruleta ya fue girada.")
+            return
+        roulette['winners'] = winner_ids
+
         waiting_embed = discord.Embed(
             title="🎲 La ruleta está girando...",
             description=f"¡Mucha suerte! Se elegirán **{k}** ganador(es) entre **{len(participants)}** participantes.",
             color=0xffff00 # Amarillo
         )
         waiting_embed.set_image(url="https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExM3ZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqOHZqJmVwPXYxX2ludGVybmFsX2dpZl9ieV9pZCZjdD1n/3o7TKMGpxVf7EelK80/giphy.gif")
-        
+
         msg = await ctx.send(embed=waiting_embed)
-        
+
         await asyncio.sleep(4)
 
-        winner_ids = random.sample(participants, k)
+        win_embed = await self._winners_embed(winner_ids, len(participants), requested)
+
+        try:
+            await msg.edit(embed=win_embed)
+        except Exception as e:
+            print(f"❌ Error editando embed de ganadores: {e}")
+            await ctx.send(embed=win_embed)
+
+        await self._resolve(channel_id)
 
+    async def _winners_embed(self, winner_ids, participant_count: int, requested: int) -> discord.Embed:
+        k = len(winner_ids)
         lines = []
         for i, wid in enumerate(winner_ids, start=1):
             gw2 = await self._gw2_account_line(wid)
@@ -200,24 +349,16 @@ class Roulette(commands.Cog):
                 win_embed.set_thumbnail(url=first.display_avatar.url)
         except Exception as e:
             print(f"⚠️ No se pudo obtener avatar del ganador: {e}")
-        win_embed.add_field(name="Participantes", value=str(len(participants)), inline=True)
+        win_embed.add_field(name="Participantes", value=str(participant_count), inline=True)
         win_embed.add_field(name="Ganadores sorteados", value=str(k), inline=True)
-        if requested > len(participants):
+        if requested > participant_count:
             win_embed.add_field(
                 name="ℹ️ Nota",
-                value=f"Pedías **{requested}** ganadores; solo había **{len(participants)}** participantes.",
+                value=f"Pedías **{requested}** ganadores; solo había **{participant_count}** participantes.",
                 inline=False,
             )
         win_embed.set_footer(text="¡Gracias por participar!")
-
-        try:
-            await msg.edit(embed=win_embed)
-        except Exception as e:
-            print(f"❌ Error editando embed de ganadores: {e}")
-            await ctx.send(embed=win_embed)
-
-        del self.active_roulettes[channel_id]
-        await self.bot.db.deleteRoulette(channel_id)
+        return win_embed
 
     @spin_roulette.error
     async def spin_roulette_error(self, ctx, error):
@@ -257,37 +398,43 @@ class Roulette(commands.Cog):
         channel_id = ctx.channel.id
         if channel_id in self.active_roulettes:
             del self.active_roulettes[channel_id]
+            self.pending_participants.pop(channel_id, None)
             await self.bot.db.deleteRoulette(channel_id)
             await ctx.send("🛑 La ruleta ha sido cancelada.")
         else:
             await ctx.send("❌ No hay una ruleta activa para cancelar.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-
-        channel_id = message.channel.id
-        if channel_id not in self.active_roulettes or not self.active_roulettes[channel_id]['active']:
+    async def cog_unload(self):
+        self.bot.router.unregister("roulette")
+        for task in list(self._resume_tasks):
+            task.cancel()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush_participants()
+
+    def _wants_message(self, ctx) -> bool:
+        roulette = self.active_roulettes.get(ctx.channel_id)
+        return roulette is not None and roulette['state'] == OPEN and ctx.content.strip() == "."
+
+    async def handle_message(self, ctx):
+        message = ctx.message
+        channel_id = ctx.channel_id
+        # La ruleta pudo cerrarse entre el filtro y la ejecución del handler
+        if not self._wants_message(ctx):
             return
 
-        if message.content.strip() == ".":
-            # Añadir al usuario a la lista de participantes
-            user_id = message.author.id
-            if user_id not in self.active_roulettes[channel_id]['participants']:
-                self.active_roulettes[channel_id]['participants'].add(user_id)
-
-                try:
-                    await self.bot.db.addRouletteParticipant(channel_id, user_id)
-                except Exception as e:
-                    print(f"⚠️ No se pudo persistir participante {user_id}: {e}")
-
-                try:
-                    await message.add_reaction("✅")
-                except discord.Forbidden:
-                    pass
-                except Exception as e:
-                    print(f"Error reaccionando: {e}")
+        # Añadir al usuario a la lista de participantes
+        user_id = message.author.id
+        if user_id not in self.active_roulettes[channel_id]['participants']:
+            self.active_roulettes[channel_id]['participants'].add(user_id)
+            self._queue_participant(channel_id, user_id)
+
+            try:
+                await message.add_reaction("✅")
+            except discord.Forbidden:
+                pass
+            except Exception as e:
+                print(f"Error reaccionando: {e}")
 
 async def setup(bot):
     await bot.add_cog(Roulette(bot))
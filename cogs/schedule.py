@@ -1,15 +1,21 @@
-from discord.ext import commands, tasks
+from discord.ext import commands
 from datetime import datetime, timedelta
+import calendar
 import pytz
 import discord
 from utils.database import dbManager
+from utils.scheduler import HeapScheduler
+
+DEFAULT_MESSAGE = "Hoy se reinicia la semana. ¡Recuerda comprar tus ASS!"
 
 class Reminder(commands.Cog):
     def __init__(self, client):
         self.client = client
         self.db = dbManager
         self.tz_col = pytz.timezone('America/Bogota')
-        self.reminder.start()
+        # guild_id -> configuración; se lee de Firestore una vez y se mantiene con write-through
+        self.configs = {}
+        self.scheduler = HeapScheduler(self.send_guild_reminder, name="schedule")
         self.dias = {
             "lunes": 0,
             "martes": 1,
@@ -20,22 +26,67 @@ class Reminder(commands.Cog):
             "domingo": 6
         }
 
-    def cog_unload(self):
-        self.reminder.cancel()
-
-    def is_reminder_time(self, reminder_config):
+    async def cog_load(self):
+        for config in await self.db.get_all_reminders():
+            if config.get('guild_id'):
+                self.configs[str(config['guild_id'])] = config
         now = datetime.now(self.tz_col)
-        # Verificar si es un recordatorio semanal
-        is_weekly = reminder_config.get('day_of_month') is None
-        if is_weekly:
-            return (now.weekday() == reminder_config.get('day', 0) and 
-                    now.hour == reminder_config.get('hour', 2) and 
-                    now.minute == reminder_config.get('minute', 0))
-        # Verificar si es un recordatorio mensual
+        for guild_id, config in self.configs.items():
+            # Si el bot estuvo caído cuando tocaba enviarlo, se envía una sola vez al arrancar
+            last_sent = self.parse_last_sent(config)
+            missed = last_sent and self.next_fire_time(config, last_sent)
+            if missed and missed <= now:
+                self.scheduler.schedule(guild_id, now.timestamp())
+            else:
+                self.reschedule(guild_id, now)
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        await self.scheduler.stop()
+
+    def parse_last_sent(self, config):
+        try:
+            last_sent = datetime.fromisoformat(config['last_sent'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return last_sent if last_sent.tzinfo else self.tz_col.localize(last_sent)
+
+    def next_fire_time(self, config, after):
+        """Próximo envío estrictamente posterior a `after`: semanal (`day`) o mensual (`day_of_month`)"""
+        after = after.astimezone(self.tz_col)
+        hour = config.get('hour', 2)
+        minute = config.get('minute', 0)
+        day_of_month = config.get('day_of_month')
+        if day_of_month is None:
+            days_ahead = (config.get('day', 0) - after.weekday()) % 7
+            date = after.date() + timedelta(days=days_ahead)
+            candidate = datetime(date.year, date.month, date.day, hour, minute)
+            if self.tz_col.localize(candidate) <= after:
+                candidate += timedelta(days=7)
+            return self.tz_col.localize(candidate)
+        # Mensual: los meses que no tienen ese día se saltan
+        year, month = after.year, after.month
+        for _ in range(13):
+            if day_of_month <= calendar.monthrange(year, month)[1]:
+                candidate = self.tz_col.localize(datetime(year, month, day_of_month, hour, minute))
+                if candidate > after:
+                    return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return None
+
+    def reschedule(self, guild_id, after=None):
+        config = self.configs.get(guild_id)
+        fire_at = self.next_fire_time(config, after or datetime.now(self.tz_col)) if config else None
+        if fire_at:
+            self.scheduler.schedule(guild_id, fire_at.timestamp())
         else:
-            return (now.day == reminder_config.get('day_of_month') and 
-                    now.hour == reminder_config.get('hour', 2) and 
-                    now.minute == reminder_config.get('minute', 0))
+            self.scheduler.cancel(guild_id)
+
+    async def save_config(self, guild_id, reminder_data):
+        self.configs[guild_id] = reminder_data
+        success = await self.db.setReminder(guild_id, reminder_data)
+        self.reschedule(guild_id)
+        return success
 
     @commands.has_permissions(administrator=True)
     @commands.command(name="setcanal")
@@ -44,7 +95,7 @@ class Reminder(commands.Cog):
         reminder_data = await self.get_or_create_reminder(guild_id)
         reminder_data['channel_id'] = channel.id
         reminder_data['updated_at'] = datetime.now()
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Canal de recordatorios establecido a {channel.mention}")
         else:
@@ -64,7 +115,7 @@ class Reminder(commands.Cog):
         reminder_data['day'] = None  # Desactiva el recordatorio semanal
         reminder_data['updated_at'] = datetime.now()
 
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Día del mes establecido a {dia}")
         else:
@@ -86,7 +137,7 @@ class Reminder(commands.Cog):
         reminder_data['day_of_month'] = None  # Desactiva el recordatorio mensual
         reminder_data['updated_at'] = datetime.now()
 
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Día del recordatorio establecido a {dia}")
         else:
@@ -103,7 +154,7 @@ class Reminder(commands.Cog):
         reminder_data['hour'] = hora
         reminder_data['minute'] = minuto
         reminder_data['updated_at'] = datetime.now()
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Hora del recordatorio establecida a {hora:02d}:{minuto:02d}")
         else:
@@ -116,7 +167,7 @@ class Reminder(commands.Cog):
         reminder_data = await self.get_or_create_reminder(guild_id)
         reminder_data['message'] = mensaje
         reminder_data['updated_at'] = datetime.now()
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Mensaje del recordatorio establecido a: {mensaje}")
         else:
@@ -129,7 +180,7 @@ class Reminder(commands.Cog):
         reminder_data = await self.get_or_create_reminder(guild_id)
         reminder_data['role_id'] = role.id
         reminder_data['updated_at'] = datetime.now()
-        success = await self.db.setReminder(guild_id, reminder_data)
+        success = await self.save_config(guild_id, reminder_data)
         if success:
             await ctx.send(f"✅ Rol de mención establecido a {role.mention}")
         else:
@@ -139,7 +190,7 @@ class Reminder(commands.Cog):
     @commands.command(name="config")
     async def view_config(self, ctx):
         guild_id = str(ctx.guild.id)
-        config = await self.db.getReminder(guild_id)
+        config = self.configs.get(guild_id)
         if not config:
             await ctx.send("❌ No hay configuración establecida para este servidor")
             return
@@ -150,7 +201,7 @@ class Reminder(commands.Cog):
         minute = config.get('minute', 0)
         day_num = config.get('day')
         day_of_month = config.get('day_of_month')
-        message = config.get('message', "Hoy se reinicia la semana. ¡Recuerda comprar tus ASS!")
+        message = config.get('message', DEFAULT_MESSAGE)
         
         day_name = [name for name, num in self.dias.items() if num == day_num][0] if day_num is not None else None
 
@@ -180,7 +231,7 @@ class Reminder(commands.Cog):
         await ctx.send(embed=embed)
 
     async def get_or_create_reminder(self, guild_id):
-        reminder_data = await self.db.getReminder(guild_id)
+        reminder_data = self.configs.get(guild_id)
         if not reminder_data:
             reminder_data = {
                 'guild_id': guild_id,
@@ -190,72 +241,32 @@ class Reminder(commands.Cog):
                 'minute': 0,
                 'day': 0,  # 0 = Lunes por defecto
                 'day_of_month': None,  # None indica que no es mensual
-                'message': "Hoy se reinicia la semana. ¡Recuerda comprar tus ASS!",
+                'message': DEFAULT_MESSAGE,
                 'created_at': datetime.now()
             }
         return reminder_data
 
-    @tasks.loop(minutes=1)
-    async def reminder(self):
-        reminders = await self.db.get_all_reminders()
-        now = datetime.now(self.tz_col)
-        for reminder in reminders:
-            # Obtener la última vez que se envió el recordatorio
-            last_sent = reminder.get('last_sent')
-            if last_sent:
-                try:
-                    last_sent_dt = datetime.fromisoformat(last_sent)
-                except Exception:
-                    last_sent_dt = None
-            else:
-                last_sent_dt = None
-
-            # Si es la primera vez o han pasado más de 59 segundos desde el último envío
-            should_send = False
-            if self.is_reminder_time(reminder):
-                if not last_sent_dt or (now - last_sent_dt).total_seconds() > 59:
-                    should_send = True
-            # Si el bot estuvo caído, verificar si debió enviarse en el intervalo
-            elif last_sent_dt and (now - last_sent_dt).total_seconds() > 60:
-                # Revisar si entre last_sent y ahora hubo un momento que coincidía con el recordatorio
-                check_time = last_sent_dt + timedelta(minutes=1)
-                while check_time <= now:
-                    temp_reminder = reminder.copy()
-                    # Simular el tiempo para is_reminder_time
-                    temp_reminder['__now'] = check_time
-                    if self.is_reminder_time_with_time(temp_reminder, check_time):
-                        should_send = True
-                        break
-                    check_time += timedelta(minutes=1)
-
-            if should_send:
-                channel_id = reminder.get('channel_id')
-                role_id = reminder.get('role_id')
-                message = reminder.get('message', "Hoy se reinicia la semana. ¡Recuerda comprar tus ASS!")
-                if channel_id:
-                    channel = self.client.get_channel(channel_id)
-                    if channel:
-                        role_mention = f"<@&{role_id}>" if role_id else ""
-                        await channel.send(f"{message} {role_mention}")
-                        # Actualizar last_sent
-                        reminder['last_sent'] = now.isoformat()
-                        await self.db.setReminder(reminder.get('guild_id'), reminder)
-
-    def is_reminder_time_with_time(self, reminder_config, now):
-        # Igual que is_reminder_time pero usando un tiempo dado
-        is_weekly = reminder_config.get('day_of_month') is None
-        if is_weekly:
-            return (now.weekday() == reminder_config.get('day', 0) and 
-                    now.hour == reminder_config.get('hour', 2) and 
-                    now.minute == reminder_config.get('minute', 0))
-        else:
-            return (now.day == reminder_config.get('day_of_month') and 
-                    now.hour == reminder_config.get('hour', 2) and 
-                    now.minute == reminder_config.get('minute', 0))
-
-    @reminder.before_loop
-    async def before_reminder(self):
+    async def send_guild_reminder(self, guild_id, _payload=None):
+        """Callback del planificador: envía el recordatorio del servidor y programa el siguiente"""
         await self.client.wait_until_ready()
+        reminder = self.configs.get(guild_id)
+        if not reminder:
+            return
+        now = datetime.now(self.tz_col)
+        channel_id = reminder.get('channel_id')
+        role_id = reminder.get('role_id')
+        message = reminder.get('message', DEFAULT_MESSAGE)
+        try:
+            if channel_id:
+                channel = self.client.get_channel(channel_id)
+                if channel:
+                    role_mention = f"<@&{role_id}>" if role_id else ""
+                    await channel.send(f"{message} {role_mention}")
+                    # Actualizar last_sent
+                    reminder['last_sent'] = now.isoformat()
+                    await self.db.setReminder(reminder.get('guild_id'), reminder)
+        finally:
+            self.reschedule(guild_id, now)
 
 async def setup(client):
     await client.add_cog(Reminder(client))
\ No newline at end of file
@@ -1,139 +1,79 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
+from utils.http_session import get_session
 import asyncio
 import logging
+import time
 from typing import List, Dict, Any, Optional, Set
 from utils.database import dbManager
+from utils.gw2api import gw2api
+from utils.item_store import item_store
+from utils.item_sync import ItemCatalogSync, merge_item_langs
+from utils.name_index import CatalogIndex
 from datetime import datetime
-import os
-import json
 import pytz
 
 # Configure logging for debugging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-CACHE_FILE = "items_cache.json"
-CACHE_MAX_AGE_HOURS = 24 * 7
-
 COLOMBIA_TZ = pytz.timezone('America/Bogota')
 
 class SearchCog(commands.Cog):
+    # Opcional: se añade tras on_ready (ver CustomBot.add_cog)
+    load_after_ready = True
+
     def __init__(self, bot):
         self.bot = bot
-        self.items_cache: Optional[List[Dict[str, str]]] = None
-        self.items_cache_loaded: bool = False
-
-    def should_update_cache(self):
-        """Solo actualizar la caché los martes a las 11:00 AM hora Colombia (UTC-5)"""
-        now = datetime.now(COLOMBIA_TZ)
-        if now.weekday() == 1 and now.hour == 11:
-            return True
-        return False
-
-    def cache_file_exists_and_fresh(self):
-        if not os.path.exists(CACHE_FILE):
-            return False
-        if not self.should_update_cache():
-            return True  # Usar la caché aunque esté vieja
-        return False  # Forzar actualización solo si es martes 11:00 AM
-
-    def load_cache_from_disk(self):
-        if os.path.exists(CACHE_FILE):
-            try:
-                with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                    self.items_cache = json.load(f)
-                    self.items_cache_loaded = True
-                    logger.info("Caché de ítems cargada desde disco.")
-            except Exception as e:
-                logger.error(f"Error leyendo la caché de ítems: {e}")
-                self.items_cache = []
-                self.items_cache_loaded = False
-
-    def save_cache_to_disk(self):
-        try:
-            with open(CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.items_cache, f, ensure_ascii=False)
-            logger.info("Caché de ítems guardada en disco.")
-        except Exception as e:
-            logger.error(f"Error guardando la caché de ítems: {e}")
-
-    async def notify_owner_cache_updated(self):
+        self.catalog_sync = ItemCatalogSync(on_complete=self.on_catalog_updated)
+        # Índice en memoria del catálogo para el autocompletado; None hasta construirlo
+        self.catalog_index: Optional[CatalogIndex] = None
+
+    async def build_catalog_index(self):
+        """Construye el índice del catálogo en un hilo y lo sustituye de una vez."""
+        started = time.perf_counter()
+        index = await asyncio.to_thread(lambda: CatalogIndex().build(item_store.names()))
+        self.catalog_index = index
+        logger.info(f"Índice de autocompletado: {len(index)} nombres en {time.perf_counter() - started:.1f}s")
+
+    async def on_catalog_updated(self, added: int):
+        await self.build_catalog_index()
+        await self.notify_owner_cache_updated(added)
+
+    async def notify_owner_cache_updated(self, added: int):
         try:
             app_info = await self.bot.application_info()
             owner = app_info.owner
             if owner:
                 dt = datetime.now(COLOMBIA_TZ).strftime('%Y-%m-%d %H:%M:%S')
-                await owner.send(f"La caché de ítems de GW2 fue actualizada el {dt} (hora Colombia).")
+                await owner.send(f"La caché de ítems de GW2 fue actualizada el {dt} (hora Colombia): {added} ítems nuevos.")
         except Exception as e:
             logger.error(f"No se pudo notificar al owner sobre la actualización de la caché: {e}")
 
-    async def load_items_cache(self):
-        # 1. Intentar cargar desde disco si es reciente
-        if self.cache_file_exists_and_fresh():
-            self.load_cache_from_disk()
-            return
-        # 2. Si no existe o está vieja, descargar y actualizar solo los nuevos
-        self.items_cache = []
-        existing_ids = set()
-        if os.path.exists(CACHE_FILE):
-            try:
-                with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                    self.items_cache = json.load(f)
-                    existing_ids = set(item['id'] for item in self.items_cache)
-            except Exception as e:
-                logger.error(f"Error leyendo la caché de ítems para actualizar: {e}")
-                self.items_cache = []
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Obtener todos los IDs
-                async with session.get("https://api.guildwars2.com/v2/items") as resp:
-                    if resp.status != 200:
-                        return
-                    ids = await resp.json()
-                # Filtrar solo los nuevos
-                new_ids = [i for i in ids if str(i) not in existing_ids]
-                logger.info(f"Descargando {len(new_ids)} ítems nuevos para la caché...")
-                # Descargar detalles por lotes de 200
-                for i in range(0, len(new_ids), 200):
-                    chunk = new_ids[i:i+200]
-                    ids_param = ",".join(map(str, chunk))
-                    url = f"https://api.guildwars2.com/v2/items?ids={ids_param}&lang=en"
-                    async with session.get(url) as resp2:
-                        if resp2.status != 200:
-                            continue
-                        items = await resp2.json()
-                        for item in items:
-                            if 'name' in item and item['name']:
-                                self.items_cache.append({
-                                    'id': str(item['id']),
-                                    'name': item['name']
-                                })
-            self.items_cache_loaded = True
-            self.save_cache_to_disk()
-            await self.notify_owner_cache_updated()
-        except Exception as e:
-            logger.error(f"Error cargando la caché de ítems: {e}")
-
     async def cog_load(self):
-        await self.load_items_cache()
+        # Importar la antigua items_cache.json la primera vez; la descarga corre en segundo plano
+        await asyncio.to_thread(item_store.import_legacy_cache)
+        await self.build_catalog_index()
+        self.catalog_sync.start()
         logger.info("Caché de ítems de GW2 lista para autocompletado.")
 
+    async def cog_unload(self):
+        await self.catalog_sync.stop()
+
     async def search_autocomplete(self, interaction: discord.Interaction, current: str):
-        """Autocompletado para el parámetro item_name del comando /search usando caché local de nombres de ítems"""
-        if not self.items_cache_loaded:
-            await self.load_items_cache()
-        sugerencias = set()
-        current_lower = current.lower().strip()
-        if self.items_cache:
-            for item in self.items_cache:
-                if current_lower in item['name'].lower():
-                    sugerencias.add(item['name'])
-                if len(sugerencias) >= 25:
-                    break
-        return [app_commands.Choice(name=s, value=s) for s in list(sugerencias)[:25]]
+        """Autocompletado para el parámetro item_name del comando /search usando el catálogo local de ítems"""
+        if self.catalog_index is not None:
+            # Índice en memoria: menos de un milisegundo, directamente en el event loop
+            sugerencias = self.catalog_index.search(current, 25)
+        else:
+            # Aún construyéndose: consulta SQLite fuera del event loop
+            sugerencias = []
+            for item in await asyncio.to_thread(item_store.search, current, 25):
+                name = item['name_en'] or item['name_es']
+                if name and name not in sugerencias:
+                    sugerencias.append(name)
+        return [app_commands.Choice(name=s, value=s) for s in sugerencias[:25]]
 
     @app_commands.command(
         name="search",
@@ -237,29 +177,29 @@ class SearchCog(commands.Cog):
 
     async def get_api_permissions(self, api_key: str) -> List[str]:
         """Verify API key permissions"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.guildwars2.com/v2/tokeninfo?access_token={api_key}") as response:
-                if response.status != 200:
-                    return []
-                token_info = await response.json()
-                return token_info.get('permissions', [])
+        session = get_session()
+        async with session.get(f"https://api.guildwars2.com/v2/tokeninfo?access_token={api_key}") as response:
+            if response.status != 200:
+                return []
+            token_info = await response.json()
+            return token_info.get('permissions', [])
 
     async def _get_account_name(self, api_key: str) -> str:
         """Get account name"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.guildwars2.com/v2/account?access_token={api_key}") as response:
-                if response.status != 200:
-                    return "Unknown Account"
-                account_data = await response.json()
-                return account_data.get('name', 'Unknown Account')
+        session = get_session()
+        async with session.get(f"https://api.guildwars2.com/v2/account?access_token={api_key}") as response:
+            if response.status != 200:
+                return "Unknown Account"
+            account_data = await response.json()
+            return account_data.get('name', 'Unknown Account')
 
     async def _get_characters(self, api_key: str) -> List[str]:
         """Get list of account characters"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.guildwars2.com/v2/characters?access_token={api_key}") as response:
-                if response.status != 200:
-                    return []
-                return await response.json()
+        session = get_session()
+        async with session.get(f"https://api.guildwars2.com/v2/characters?access_token={api_key}") as response:
+            if response.status != 200:
+                return []
+            return await response.json()
 
     async def _get_character_inventories(self, api_key: str, character_names: List[str]) -> Dict[str, Dict]:
         """Get inventories of multiple characters in parallel"""
@@ -272,85 +212,63 @@ class SearchCog(commands.Cog):
 
     async def _get_character_inventory(self, api_key: str, character_name: str) -> Dict[str, Any]:
         """Get complete inventory of a character"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"https://api.guildwars2.com/v2/characters/{character_name}/inventory?access_token={api_key}"
-            ) as response:
-                if response.status != 200:
-                    return {}
-                return await response.json()
+        session = get_session()
+        async with session.get(
+                f"https://api.guildwars2.com/v2/characters/{character_name}/inventory?access_token={api_key}"
+        ) as response:
+            if response.status != 200:
+                return {}
+            return await response.json()
 
     async def _get_bank_content(self, api_key: str) -> List[Dict]:
         """Get bank contents"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.guildwars2.com/v2/account/bank?access_token={api_key}") as response:
-                if response.status != 200:
-                    return []
-                return await response.json()
+        session = get_session()
+        async with session.get(f"https://api.guildwars2.com/v2/account/bank?access_token={api_key}") as response:
+            if response.status != 200:
+                return []
+            return await response.json()
 
     async def _get_materials(self, api_key: str) -> List[Dict]:
         """Get material storage contents"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"https://api.guildwars2.com/v2/account/materials?access_token={api_key}") as response:
-                if response.status != 200:
-                    return []
-                return await response.json()
+        session = get_session()
+        async with session.get(
+                f"https://api.guildwars2.com/v2/account/materials?access_token={api_key}") as response:
+            if response.status != 200:
+                return []
+            return await response.json()
 
     async def _get_shared_inventory(self, api_key: str) -> List[Dict]:
         """Get shared inventory slots contents"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"https://api.guildwars2.com/v2/account/inventory?access_token={api_key}") as response:
-                if response.status != 200:
-                    return []
-                return await response.json()
+        session = get_session()
+        async with session.get(
+                f"https://api.guildwars2.com/v2/account/inventory?access_token={api_key}") as response:
+            if response.status != 200:
+                return []
+            return await response.json()
 
     async def _get_item_details(self, api_key: str, item_ids: Set[int]) -> Dict[int, Dict]:
-        """Get item details by their IDs in both English and Spanish"""
+        """Get item details by their IDs in both English and Spanish (local catalog first, API for the rest)"""
         if not item_ids:
             return {}
 
         result = {}
-        chunks = [list(item_ids)[i:i + 50] for i in range(0, len(item_ids), 50)]
-
-        async with aiohttp.ClientSession() as session:
-            # Get details in English
-            tasks = []
-            for chunk in chunks:
-                ids_param = ",".join(map(str, chunk))
-                url = f"https://api.guildwars2.com/v2/items?ids={ids_param}&lang=en&access_token={api_key}"
-                tasks.append(session.get(url))
-
-            responses = await asyncio.gather(*tasks)
-
-            for response in responses:
-                if response.status == 200:
-                    items = await response.json()
-                    for item in items:
-                        item_id = item['id']
-                        if item_id not in result:
-                            result[item_id] = item
-                        result[item_id]['name_en'] = item['name']
-
-            # Get details in Spanish
-            tasks = []
-            for chunk in chunks:
-                ids_param = ",".join(map(str, chunk))
-                url = f"https://api.guildwars2.com/v2/items?ids={ids_param}&lang=es&access_token={api_key}"
-                tasks.append(session.get(url))
-
-            responses = await asyncio.gather(*tasks)
-
-            for response in responses:
-                if response.status == 200:
-                    items = await response.json()
-                    for item in items:
-                        item_id = item['id']
-                        if item_id in result:
-                            result[item_id]['name_es'] = item['name']
-                            # Use Spanish name as default display name
-                            result[item_id]['name'] = item['name']
+        stored = await asyncio.to_thread(item_store.get_many, item_ids)
+        for item_id, item in stored.items():
+            if item['name_en'] and item['name_es']:
+                # Use Spanish name as default display name
+                result[item_id] = {**item, 'name': item['name_es']}
+
+        missing = [i for i in item_ids if i not in result]
+        if missing:
+            items_en, items_es = await asyncio.gather(
+                gw2api.get_items(missing, lang="en"),
+                gw2api.get_items(missing, lang="es"),
+            )
+            rows = merge_item_langs(list(items_en.values()), list(items_es.values()))
+            for row in rows:
+                result[row['id']] = {**row, 'name': row['name_es'] or row['name_en']}
+            if rows:
+                await asyncio.to_thread(item_store.upsert_items, rows)
 
         return result
 
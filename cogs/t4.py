@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
+from utils.gw2api import gw2api
 import asyncio
 
 # Lista de IDs de los materiales T4
@@ -17,14 +17,9 @@ def calculate_coins(price):
 
 # Función asincrónica para obtener los detalles de los artículos
 async def get_item_details(item_id):
-    async with aiohttp.ClientSession() as session:
-        item_info_response = await session.get(f"https://api.guildwars2.com/v2/items/{item_id}")
-        price_info_response = await session.get(f"https://api.guildwars2.com/v2/commerce/prices/{item_id}")
-        
-        # Obtener la información y convertirla en JSON
-        item_info = await item_info_response.json()
-        price_info = await price_info_response.json()
-        return item_info, price_info
+    # El cliente agrupa los ids de todas las llamadas concurrentes en un solo ?ids=
+    item_info, price_info = await asyncio.gather(gw2api.get_item(item_id), gw2api.get_price(item_id))
+    return item_info, price_info
 
 class T4(commands.Cog):
     def __init__(self, bot):
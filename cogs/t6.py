@@ -1,27 +1,17 @@
 import discord
 from discord import app_commands
-import aiohttp
+from utils.gw2api import gw2api
 from datetime import datetime
 import asyncio
 import math
 
-async def get_gw2_api_data(endpoint: str):
-    """Fetch data from the GW2 API asynchronously"""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f'https://api.guildwars2.com/v2/{endpoint}') as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"API request failed: {response.status}")
-
 async def get_precio_ecto():
     """Get the current price of an Ecto from the GW2 API."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get('https://api.guildwars2.com/v2/commerce/prices/19721') as response:
-                if response.status == 200:
-                    ecto_data = await response.json()
-                    return ecto_data['sells']['unit_price']
-                raise Exception("Failed to fetch Ecto price.")
+        precio = await gw2api.get_sell_price(19721)
+        if precio is None:
+            raise Exception("Failed to fetch Ecto price.")
+        return precio
     except Exception as e:
         print(f"Error fetching Ecto price: {e}")
         return None
@@ -143,8 +133,9 @@ class T6(app_commands.Group):
 
     async def fetch_item_data(self, item_id: int, total_quantity: int, base_stack_size: int):
         """Fetch item data and calculate prices"""
-        price_data = await get_gw2_api_data(f'commerce/prices/{item_id}')
-        item_data = await get_gw2_api_data(f'items/{item_id}')
+        price_data, item_data = await asyncio.gather(gw2api.get_price(item_id), gw2api.get_item(item_id))
+        if price_data is None or item_data is None:
+            raise Exception(f"API request failed for item {item_id}")
 
         unit_price = price_data.get('sells', {}).get('unit_price', 0)
         total_price = unit_price * base_stack_size
@@ -1,11 +1,14 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
+from utils.http_session import get_session
+import asyncio
 from datetime import datetime
 from typing import List, Dict, Any
 
 from utils.database import dbManager
+from utils.gw2api import gw2api
+from utils.item_store import item_store
 
 
 # Navigation buttons class
@@ -110,6 +113,22 @@ class TradingPostCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def get_item_names(self, item_ids) -> Dict[int, str]:
+        """Item names from the local catalog, falling back to the API for unknown ids"""
+        item_ids = set(item_ids)
+        stored = await asyncio.to_thread(item_store.get_many, item_ids)
+        names = {item_id: item["name_en"] for item_id, item in stored.items() if item["name_en"]}
+        missing = item_ids - names.keys()
+        if missing:
+            items = await gw2api.get_items(missing)
+            names.update({item_id: item["name"] for item_id, item in items.items() if item.get("name")})
+            await asyncio.to_thread(
+                item_store.upsert_items,
+                ({"id": item_id, "name_en": item.get("name", ""), "rarity": item.get("rarity"), "icon": item.get("icon")}
+                 for item_id, item in items.items()),
+            )
+        return names
+
     @app_commands.command(
         name="tpsell",
         description="Shows your current Trading Post sell orders in Guild Wars 2"
@@ -130,44 +149,42 @@ class TradingPostCommands(commands.Cog):
 
         try:
             # Get Trading Post sales
-            async with aiohttp.ClientSession() as session:
-                # First get sell listings
-                async with session.get(
-                        f"https://api.guildwars2.com/v2/commerce/transactions/current/sells?access_token={api_key}") as response:
-                    if response.status != 200:
-                        await interaction.followup.send(f"❌ Error querying GW2 API: {response.status}",
-                                                        ephemeral=False)
-                        return
-
-                    sell_listings = await response.json()
-
-                    if not sell_listings:
-                        await interaction.followup.send("📊 You don't have any items listed for sale in the Trading Post.",
-                                                        ephemeral=False)
-                        return
-
-                # Get current Trading Post prices for comparison
-                item_ids = [str(item["item_id"]) for item in sell_listings]
-                items_param = ",".join(item_ids)
-
-                # Get prices and item details
-                async with session.get(
-                        f"https://api.guildwars2.com/v2/commerce/prices?ids={items_param}") as prices_response:
-                    prices_data = await prices_response.json() if prices_response.status == 200 else []
-
-                async with session.get(f"https://api.guildwars2.com/v2/items?ids={items_param}") as items_response:
-                    items_data = await items_response.json() if items_response.status == 200 else []
+            session = get_session()
+            # First get sell listings
+            async with session.get(
+                    f"https://api.guildwars2.com/v2/commerce/transactions/current/sells?access_token={api_key}") as response:
+                if response.status != 200:
+                    await interaction.followup.send(f"❌ Error querying GW2 API: {response.status}",
+                                                    ephemeral=False)
+                    return
+
+                sell_listings = await response.json()
+
+                if not sell_listings:
+                    await interaction.followup.send("📊 You don't have any items listed for sale in the Trading Post.",
+                                                    ephemeral=False)
+                    return
+
+            # Get current Trading Post prices for comparison
+            item_ids = [str(item["item_id"]) for item in sell_listings]
+            items_param = ",".join(item_ids)
+
+            # Get prices and item details
+            async with session.get(
+                    f"https://api.guildwars2.com/v2/commerce/prices?ids={items_param}") as prices_response:
+                prices_data = await prices_response.json() if prices_response.status == 200 else []
+
+            items_dict = await self.get_item_names(int(i) for i in item_ids)
 
             # Create dictionaries for easy lookup
             prices_dict = {item["id"]: item for item in prices_data}
-            items_dict = {item["id"]: item for item in items_data}
 
             # Prepare data for all sales
             formatted_items = []
 
             for selling in sell_listings:
                 item_id = selling["item_id"]
-                item_name = items_dict[item_id]["name"] if item_id in items_dict else f"Item {item_id}"
+                item_name = items_dict.get(item_id, f"Item {item_id}")
                 quantity = selling["quantity"]
                 price_each = selling["price"]
                 price_total = price_each * quantity
@@ -244,44 +261,42 @@ class TradingPostCommands(commands.Cog):
 
         try:
             # Get Trading Post buy orders
-            async with aiohttp.ClientSession() as session:
-                # First get buy listings
-                async with session.get(
-                        f"https://api.guildwars2.com/v2/commerce/transactions/current/buys?access_token={api_key}") as response:
-                    if response.status != 200:
-                        await interaction.followup.send(f"❌ Error querying GW2 API: {response.status}",
-                                                        ephemeral=False)
-                        return
-
-                    buy_listings = await response.json()
-
-                    if not buy_listings:
-                        await interaction.followup.send(
-                            "📊 You don't have any active buy orders in the Trading Post.", ephemeral=False)
-                        return
-
-                # Get current Trading Post prices for comparison
-                item_ids = [str(item["item_id"]) for item in buy_listings]
-                items_param = ",".join(item_ids)
-
-                # Get prices and item details
-                async with session.get(
-                        f"https://api.guildwars2.com/v2/commerce/prices?ids={items_param}") as prices_response:
-                    prices_data = await prices_response.json() if prices_response.status == 200 else []
-
-                async with session.get(f"https://api.guildwars2.com/v2/items?ids={items_param}") as items_response:
-                    items_data = await items_response.json() if items_response.status == 200 else []
+            session = get_session()
+            # First get buy listings
+            async with session.get(
+                    f"https://api.guildwars2.com/v2/commerce/transactions/current/buys?access_token={api_key}") as response:
+                if response.status != 200:
+                    await interaction.followup.send(f"❌ Error querying GW2 API: {response.status}",
+                                                    ephemeral=False)
+                    return
+
+                buy_listings = await response.json()
+
+                if not buy_listings:
+                    await interaction.followup.send(
+                        "📊 You don't have any active buy orders in the Trading Post.", ephemeral=False)
+                    return
+
+            # Get current Trading Post prices for comparison
+            item_ids = [str(item["item_id"]) for item in buy_listings]
+            items_param = ",".join(item_ids)
+
+            # Get prices and item details
+            async with session.get(
+                    f"https://api.guildwars2.com/v2/commerce/prices?ids={items_param}") as prices_response:
+                prices_data = await prices_response.json() if prices_response.status == 200 else []
+
+            items_dict = await self.get_item_names(int(i) for i in item_ids)
 
             # Create dictionaries for easy lookup
             prices_dict = {item["id"]: item for item in prices_data}
-            items_dict = {item["id"]: item for item in items_data}
 
             # Prepare data for all buys
             formatted_items = []
 
             for buying in buy_listings:
                 item_id = buying["item_id"]
-                item_name = items_dict[item_id]["name"] if item_id in items_dict else f"Item {item_id}"
+                item_name = items_dict.get(item_id, f"Item {item_id}")
                 quantity = buying["quantity"]
                 price_each = buying["price"]
                 price_total = price_each * quantity
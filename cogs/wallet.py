@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
+from utils.http_session import get_session
 import asyncio
 from datetime import datetime
 from utils.database import dbManager
@@ -19,14 +19,14 @@ class WalletCog(commands.Cog):
     async def load_currencies_async(self):
         """Asynchronously load currency data from the GW2 API."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{GW2_API_URL}/currencies?ids=all") as response:
-                    if response.status != 200:
-                        print(f"❌ Error getting currencies: Status {response.status}")
-                        return
-                    
-                    currencies_data = await response.json()
-                    
+            session = get_session()
+            async with session.get(f"{GW2_API_URL}/currencies?ids=all") as response:
+                if response.status != 200:
+                    print(f"❌ Error getting currencies: Status {response.status}")
+                    return
+                
+                currencies_data = await response.json()
+                
             self.currency_map = {currency['id']: {
                 'name': currency['name'],
                 'icon': currency['icon'],
@@ -65,50 +65,50 @@ class WalletCog(commands.Cog):
             return
 
         try:
-            async with aiohttp.ClientSession() as session:
-                # Verify API key permissions
-                async with session.get(f"{GW2_API_URL}/tokeninfo?access_token={api_key}") as token_response:
-                    if token_response.status != 200:
-                        embed = discord.Embed(
-                            title="❌ API Key Error",
-                            description="The API key is invalid or has expired.",
-                            color=discord.Color.red(),
-                            timestamp=datetime.now()
-                        )
-                        await interaction.followup.send(embed=embed, ephemeral=True)
-                        return
-                    
-                    token_info = await token_response.json()
-                    if "wallet" not in token_info.get("permissions", []):
-                        embed = discord.Embed(
-                            title="⚠️ Insufficient Permissions",
-                            description="Your API key doesn't have wallet permissions. You need to add the 'wallet' permission.",
-                            color=discord.Color.yellow(),
-                            timestamp=datetime.now()
-                        )
-                        await interaction.followup.send(embed=embed, ephemeral=True)
-                        return
+            session = get_session()
+            # Verify API key permissions
+            async with session.get(f"{GW2_API_URL}/tokeninfo?access_token={api_key}") as token_response:
+                if token_response.status != 200:
+                    embed = discord.Embed(
+                        title="❌ API Key Error",
+                        description="The API key is invalid or has expired.",
+                        color=discord.Color.red(),
+                        timestamp=datetime.now()
+                    )
+                    await interaction.followup.send(embed=embed, ephemeral=True)
+                    return
+                
+                token_info = await token_response.json()
+                if "wallet" not in token_info.get("permissions", []):
+                    embed = discord.Embed(
+                        title="⚠️ Insufficient Permissions",
+                        description="Your API key doesn't have wallet permissions. You need to add the 'wallet' permission.",
+                        color=discord.Color.yellow(),
+                        timestamp=datetime.now()
+                    )
+                    await interaction.followup.send(embed=embed, ephemeral=True)
+                    return
 
-                # Get wallet data
-                async with session.get(f"{GW2_API_URL}/account/wallet?access_token={api_key}") as response:
-                    if response.status != 200:
-                        embed = discord.Embed(
-                            title="❌ Error",
-                            description=f"Error querying GW2 API (Status {response.status}). Verify your API key.",
-                            color=discord.Color.red(),
-                            timestamp=datetime.now()
-                        )
-                        await interaction.followup.send(embed=embed, ephemeral=True)
-                        return
-                    
-                    wallet_data = await response.json()
+            # Get wallet data
+            async with session.get(f"{GW2_API_URL}/account/wallet?access_token={api_key}") as response:
+                if response.status != 200:
+                    embed = discord.Embed(
+                        title="❌ Error",
+                        description=f"Error querying GW2 API (Status {response.status}). Verify your API key.",
+                        color=discord.Color.red(),
+                        timestamp=datetime.now()
+                    )
+                    await interaction.followup.send(embed=embed, ephemeral=True)
+                    return
                 
-                # Get account name
-                async with session.get(f"{GW2_API_URL}/account?access_token={api_key}") as account_response:
-                    account_name = "Unknown"
-                    if account_response.status == 200:
-                        account_data = await account_response.json()
-                        account_name = account_data.get("name", "Unknown")
+                wallet_data = await response.json()
+            
+            # Get account name
+            async with session.get(f"{GW2_API_URL}/account?access_token={api_key}") as account_response:
+                account_name = "Unknown"
+                if account_response.status == 200:
+                    account_data = await account_response.json()
+                    account_name = account_data.get("name", "Unknown")
 
             # Currency ID to category mapping
             categories = {
@@ -2,7 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import urllib.parse
-import aiohttp
+from utils.http_session import get_session
 
 class WikiCommand(commands.Cog):
     def __init__(self, bot):
@@ -26,14 +26,14 @@ class WikiCommand(commands.Cog):
             "srlimit": 1
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_urls[lang], params=params) as response:
-                data = await response.json()
-                
-                if not data.get("query", {}).get("search"):
-                    return None, None
+        session = get_session()
+        async with session.get(api_urls[lang], params=params) as response:
+            data = await response.json()
+            
+            if not data.get("query", {}).get("search"):
+                return None, None
 
-                page_title = data["query"]["search"][0]["title"]
+            page_title = data["query"]["search"][0]["title"]
 
         # Now get language links
         params = {
@@ -44,16 +44,16 @@ class WikiCommand(commands.Cog):
             "lllang": "es" if lang == "en" else "en"
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_urls[lang], params=params) as response:
-                data = await response.json()
-                pages = data["query"]["pages"]
-                page = next(iter(pages.values()))
-                
-                # Get title in other language
-                other_lang_title = None
-                if "langlinks" in page and page["langlinks"]:
-                    other_lang_title = page["langlinks"][0]["*"]
+        session = get_session()
+        async with session.get(api_urls[lang], params=params) as response:
+            data = await response.json()
+            pages = data["query"]["pages"]
+            page = next(iter(pages.values()))
+            
+            # Get title in other language
+            other_lang_title = None
+            if "langlinks" in page and page["langlinks"]:
+                other_lang_title = page["langlinks"][0]["*"]
 
         # Build URLs
         wiki_urls = {
@@ -5,7 +5,9 @@ from dotenv import load_dotenv
 import asyncio
 from flask import Flask
 import threading
-from utils.database import DatabaseManager
+from utils.database import dbManager
+from utils.http_session import create_session, close_session
+from utils.message_router import MessageRouter
 import time
 import json
 import logging
@@ -31,6 +33,8 @@ logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
+# Un cog que tarde más que esto en cargarse se marca en el resumen de arranque
+SLOW_COG_SECONDS = float(os.getenv("SLOW_COG_SECONDS", 2))
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -46,12 +50,19 @@ class CustomBot(commands.Bot):
             owner_ids={552563672162107431, 313384882606833676},
             chunk_guilds_at_startup=False,  # evita bloquear el event loop al arrancar
         )
-        self.db = DatabaseManager()
+        self.db = dbManager  # instancia compartida con los cogs que importan dbManager
         self.sync_commands = os.getenv("SYNC_COMMANDS", "false").lower() == "true"
+        self.http_session = None  # sesión aiohttp compartida, se crea en setup_hook
+        # Despacho único de mensajes: los cogs registran handlers en lugar de listeners on_message
+        self.router = MessageRouter(self.command_prefix)
+        # Cogs con load_after_ready = True: se añaden tras on_ready para conectar antes al gateway
+        self._deferred_cogs = []
+        self._deferred_task = None
         print("Bot initialized with prefix:", self.command_prefix)
 
     async def setup_hook(self):
         self.remove_command('help')
+        self.http_session = create_session()
         print("Connecting to database...")
         connected = await self.db.connect()
         if not connected:
@@ -60,52 +71,97 @@ class CustomBot(commands.Bot):
             return
         print("✅ Database connected successfully")
         
-        print("Reloading all cogs...")
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                cog_name = f'cogs.{filename[:-3]}'
-                try:
-                    self.unload_extension(cog_name)  # Desactiva el cog si ya está cargado
-                    await self.load_extension(cog_name)
-                    print(f'✅ Reloaded {filename[:-3]}')
-                except Exception as e:
-                    print(f'❌ Failed to reload {filename[:-3]}: {e}')
-                    import traceback
-                    traceback.print_exc()
-        print("✅ All cogs reloaded")
-        
+        await self.load_cogs()
+
         print("Loading help extension...")
         try:
             await self.load_extension('utils.help')
             print("✅ Help extension loaded")
         except Exception as e:
             print(f"❌ Error loading help extension: {e}")
-        
+
         # Mostrar los comandos registrados en el árbol antes de sincronizar
         print("Commands in tree before sync:", [cmd.name for cmd in self.tree.get_commands()])
 
-        # Sincronizar solo si SYNC_COMMANDS es true
-        if self.sync_commands:
-            print("Attempting global sync...")
-            try:
-                synced = await self.tree.sync()
-                print(f"✅ Synced {len(synced)} command(s) globally")
-                print("Commands in tree after sync:", [cmd.name for cmd in self.tree.get_commands()])
-            except Exception as e:
-                print(f"❌ Error syncing commands globally: {e}")
-        
+        if self._deferred_cogs:
+            # La sincronización espera a los cogs diferidos para incluir sus comandos
+            self._deferred_task = asyncio.create_task(self.load_deferred_cogs())
+        elif self.sync_commands:
+            await self.sync_tree()
+
         print("Comandos registrados (tradicionales):", [cmd.name for cmd in self.commands])
 
+    async def sync_tree(self):
+        print("Attempting global sync...")
+        try:
+            synced = await self.tree.sync()
+            print(f"✅ Synced {len(synced)} command(s) globally")
+            print("Commands in tree after sync:", [cmd.name for cmd in self.tree.get_commands()])
+        except Exception as e:
+            print(f"❌ Error syncing commands globally: {e}")
+
+    async def add_cog(self, cog, **kwargs):
+        if getattr(cog, "load_after_ready", False) and not self.is_ready():
+            self._deferred_cogs.append((cog, kwargs))
+            return
+        await super().add_cog(cog, **kwargs)
+
+    async def _timed(self, name, coro):
+        start = time.perf_counter()
+        try:
+            await coro
+            error = None
+        except Exception as e:
+            print(f'❌ Failed to load {name}: {e}')
+            import traceback
+            traceback.print_exc()
+            error = e
+        return name, time.perf_counter() - start, error
+
+    def print_cog_timings(self, title, timings, elapsed):
+        print(f"{title} ({elapsed:.2f}s)")
+        for name, seconds, error in sorted(timings, key=lambda t: t[1], reverse=True):
+            if error:
+                status = "❌"
+            elif seconds >= SLOW_COG_SECONDS:
+                status = "🐢"
+            else:
+                status = "✅"
+            print(f"  {status} {name:<14} {seconds * 1000:>8.0f} ms")
+        slow = [name for name, seconds, error in timings if not error and seconds >= SLOW_COG_SECONDS]
+        if slow:
+            print(f"⚠️ Cogs lentos (>{SLOW_COG_SECONDS:g}s): {', '.join(slow)}")
+
     async def load_cogs(self):
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                    print(f'✅ Loaded {filename[:-3]}')
-                except Exception as e:
-                    print(f'❌ Failed to load {filename[:-3]}: {e}')
-                    import traceback
-                    traceback.print_exc()
+        """Carga todos los cogs de ./cogs en paralelo y muestra cuánto tardó cada uno"""
+        print("Loading all cogs...")
+        start = time.perf_counter()
+        names = sorted(filename[:-3] for filename in os.listdir('./cogs') if filename.endswith('.py'))
+        timings = await asyncio.gather(*(self._timed(name, self.load_extension(f'cogs.{name}')) for name in names))
+        self.print_cog_timings("✅ Cogs loaded", timings, time.perf_counter() - start)
+
+    async def load_deferred_cogs(self):
+        """Añade los cogs opcionales una vez conectado y después sincroniza los comandos"""
+        await self.wait_until_ready()
+        deferred, self._deferred_cogs = self._deferred_cogs, []
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(
+            self._timed(cog.qualified_name, self.add_cog(cog, **kwargs)) for cog, kwargs in deferred
+        ))
+        self.print_cog_timings("✅ Deferred cogs loaded", timings, time.perf_counter() - start)
+        if self.sync_commands:
+            await self.sync_tree()
+
+    async def close(self):
+        await super().close()
+        await close_session()
+        self.db.close()
+
+    async def on_message(self, message):
+        if message.author.bot:
+            return
+        self.router.dispatch(message)
+        await self.process_commands(message)
 
     async def on_ready(self):
         print(f'✅ Logged in as {self.user.name} ({self.user.id})')
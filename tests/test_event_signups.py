@@ -0,0 +1,146 @@
+"""Inscripciones concurrentes a eventos sobre el backend en memoria.
+
+Cada inscripción es un campo `signups.<clave>` del documento: 200 altas a la vez
+(y una baja de otra clave en medio) no deben pisarse entre sí.
+
+    python -m pytest -q tests/test_event_signups.py
+"""
+
+import asyncio
+import os
+import time
+
+# Sin credenciales de Firebase: el singleton `dbManager` se crea en memoria al importar
+os.environ.setdefault("DB_BACKEND", "memory")
+
+import pytest  # noqa: E402
+
+import cogs.events as events  # noqa: E402
+from utils.database import DatabaseManager  # noqa: E402
+
+SIGNUPS = 200
+
+
+@pytest.fixture
+def db(monkeypatch):
+    manager = DatabaseManager(backend="memory")
+    monkeypatch.setattr(events, "dbManager", manager)
+    yield manager
+    manager.close()
+
+
+def _roles():
+    return [
+        {"id": "dps", "name": "DPS", "max_slots": SIGNUPS, "participants": []},
+        {"id": "heal", "name": "Heal", "max_slots": SIGNUPS, "participants": []},
+    ]
+
+
+def _stored_signups(db, doc_id):
+    return db.events.document(doc_id).get().to_dict()["signups"]
+
+
+def test_concurrent_signups_all_persist(db):
+    async def main():
+        assert await db.saveEvent({"message_id": 1, "roles": _roles(), "signups": {}})
+        registry = events.EventRegistry()
+
+        async def join(user_id):
+            event = await registry.get("1")
+            role = event["roles"][user_id % 2]
+            participant = {"name": f"user{user_id}", "discord_id": user_id,
+                           "key": events._signup_key(user_id), "ts": time.time()}
+            role["participants"].append(participant)
+            registry.signup_changed(event, role["id"], participant, None)
+            await registry.flush()
+
+        await asyncio.gather(*(join(user_id) for user_id in range(1, SIGNUPS + 1)))
+        await registry.close()
+
+    asyncio.run(main())
+    stored = _stored_signups(db, "1")
+    assert set(stored) == {f"u{user_id}" for user_id in range(1, SIGNUPS + 1)}
+    assert all("participants" not in role for role in db.events.document("1").get().to_dict()["roles"])
+
+
+def test_concurrent_remove_does_not_clobber_signups(db):
+    async def main():
+        leaving = {"role_id": "dps", "name": "leaving", "discord_id": 999_999, "ts": 0}
+        assert await db.saveEvent({"message_id": 2, "roles": _roles(), "signups": {"u999999": leaving}})
+        registry = events.EventRegistry()
+
+        async def join(user_id):
+            event = await registry.get("2")
+            participant = {"name": f"user{user_id}", "discord_id": user_id,
+                           "key": events._signup_key(user_id), "ts": time.time()}
+            event["roles"][0]["participants"].append(participant)
+            registry.signup_changed(event, "dps", participant, None)
+            await registry.flush()
+
+        async def leave():
+            event = await registry.get("2")
+            participants = event["roles"][0]["participants"]
+            participant = next(p for p in participants if p["key"] == "u999999")
+            participants.remove(participant)
+            registry.signup_removed(event, participant["key"], None)
+            await registry.flush()
+
+        jobs = [join(user_id) for user_id in range(1, SIGNUPS + 1)]
+        jobs.insert(SIGNUPS // 2, leave())
+        await asyncio.gather(*jobs)
+        await registry.close()
+
+        # Rehidratado desde la base de datos: cada rol recupera sus participantes
+        reloaded = await events.EventRegistry().get("2")
+        assert len(reloaded["roles"][0]["participants"]) == SIGNUPS
+
+    asyncio.run(main())
+    stored = _stored_signups(db, "2")
+    assert "u999999" not in stored
+    assert len(stored) == SIGNUPS
+
+
+def test_direct_field_updates_do_not_conflict(db):
+    async def main():
+        assert await db.saveEvent({"message_id": 3, "roles": _roles(), "signups": {"u0": {"role_id": "dps"}}})
+        writes = [
+            db.updateEvents({"3": {f"signups.u{user_id}": {"role_id": "heal", "discord_id": user_id}}})
+            for user_id in range(1, SIGNUPS + 1)
+        ]
+        writes.append(db.updateEvents({"3": {"signups.u0": db.ops.DELETE_FIELD}}))
+        return await asyncio.gather(*writes)
+
+    failures = asyncio.run(main())
+    assert not any(failures)
+    stored = _stored_signups(db, "3")
+    assert set(stored) == {f"u{user_id}" for user_id in range(1, SIGNUPS + 1)}
+
+
+def test_closed_event_is_evicted_once_idle(db, monkeypatch):
+    monkeypatch.setattr(events, "EVENT_EDIT_INTERVAL", 0)
+
+    async def main():
+        assert await db.saveEvent({"message_id": 4, "roles": _roles(), "signups": {}})
+        registry = events.EventRegistry()
+        event = await registry.get("4")
+        participant = {"name": "user1", "discord_id": 1, "key": events._signup_key(1), "ts": time.time()}
+        event["roles"][0]["participants"].append(participant)
+        registry.signup_changed(event, "dps", participant, None)
+
+        await db.updateEventStatus("4", "closed")
+        event["status"] = "closed"
+        registry.schedule_render(event, None)
+        await asyncio.sleep(0)  # la edición ya se hizo, pero la inscripción sigue pendiente
+        assert "4" in registry.events
+
+        await registry.flush()
+        assert "4" not in registry.events
+        assert "4" not in registry._last_render
+
+        # Un evento cerrado leído de nuevo no se queda en memoria
+        assert (await registry.get("4"))["roles"][0]["participants"][0]["key"] == "u1"
+        assert "4" not in registry.events
+        await registry.close()
+
+    asyncio.run(main())
+    assert set(_stored_signups(db, "4")) == {"u1"}
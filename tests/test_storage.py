@@ -0,0 +1,112 @@
+"""Backends locales de `utils/storage.py` (memoria y SQLite) con la API de Firestore.
+
+    python -m pytest -q tests/test_storage.py
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from utils import storage
+from utils.database import DatabaseManager
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = storage.create_store(request.param, str(tmp_path / "firestore.sqlite3"))
+    yield store
+    if isinstance(store, storage.SQLiteStore):
+        store.close()
+
+
+def test_local_store_requires_every_primitive():
+    class Partial(storage.LocalStore):
+        def read(self, collection, doc_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_set_merge_and_dotted_update(store):
+    ref = store.collection("events").document("1")
+    ref.set({"title": "Raid", "signups": {"u1": {"role_id": "dps"}}, "count": 1, "tags": ["a"]})
+    ref.set({"signups": {"u2": {"role_id": "heal"}}}, merge=True)
+    ref.update({
+        "signups.u3.role_id": "bdps",
+        "signups.u1": store.DELETE_FIELD,
+        "count": store.Increment(2),
+        "tags": store.ArrayUnion(["a", "b"]),
+    })
+
+    doc = ref.get()
+    assert doc.exists
+    assert doc.to_dict() == {
+        "title": "Raid",
+        "signups": {"u2": {"role_id": "heal"}, "u3": {"role_id": "bdps"}},
+        "count": 3,
+        "tags": ["a", "b"],
+    }
+    assert doc.get("signups.u3.role_id") == "bdps"
+
+    ref.set({"title": "Fractales"})
+    assert ref.get().to_dict() == {"title": "Fractales"}
+
+    with pytest.raises(storage.NotFound):
+        store.collection("events").document("missing").update({"title": "x"})
+
+
+def test_where_order_by_limit(store):
+    reminders = store.collection("user_reminders")
+    for i, due in enumerate([30, 10, 20, 40]):
+        reminders.document(f"r{i}").set({"user_id": i % 2, "due_at": due, "created": datetime(2026, 1, i + 1)})
+    reminders.document("undated").set({"user_id": 0})
+
+    due = [doc.id for doc in reminders.where("due_at", "<=", 30).order_by("due_at").stream()]
+    assert due == ["r1", "r2", "r0"]
+
+    latest = reminders.where("user_id", "==", 0).order_by("due_at", direction="DESCENDING").limit(1).get()
+    assert [doc.id for doc in latest] == ["r0"]
+
+    # order_by deja fuera los documentos sin el campo, como Firestore
+    assert len(list(reminders.order_by("due_at").stream())) == 4
+    assert reminders.document("r0").get().to_dict()["created"] == datetime(2026, 1, 1)
+
+
+def test_batch_rolls_back_on_failure(store):
+    events = store.collection("events")
+    events.document("1").set({"status": "open"})
+
+    batch = store.batch()
+    batch.update(events.document("1"), {"status": "closed"})
+    batch.set(events.document("2"), {"status": "open"})
+    batch.update(events.document("missing"), {"status": "closed"})
+    with pytest.raises(storage.NotFound):
+        batch.commit()
+
+    assert events.document("1").get().to_dict() == {"status": "open"}
+    assert not events.document("2").get().exists
+
+    batch = store.batch()
+    batch.update(events.document("1"), {"status": "closed"})
+    batch.delete(events.document("1"))
+    batch.set(events.document("2"), {"status": "open"})
+    batch.commit()
+    assert not events.document("1").get().exists
+    assert events.document("2").get().exists
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_database_manager_runs_on_local_backend(backend, tmp_path):
+    db = DatabaseManager(backend=backend, path=str(tmp_path / "firestore.sqlite3"))
+
+    async def main():
+        keys = [{"api_key": "OLD", "active": False}, {"api_key": "KEY-42", "active": True}]
+        db.apiKeys.document("42").set({"keys": keys})
+        return await asyncio.gather(*(db.getApiKey("42") for _ in range(50)))
+
+    try:
+        assert asyncio.run(main()) == ["KEY-42"] * 50
+    finally:
+        db.close()
@@ -1,14 +1,51 @@
 import os
+import asyncio
+import functools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, firestore
 from dotenv import load_dotenv
-import aiohttp
+from google.api_core.exceptions import NotFound
+from utils.http_session import get_session
+from utils.storage import NotFound as LocalNotFound, create_store
 
 load_dotenv()
 
+# firestore (por defecto), memory o sqlite; los dos últimos no necesitan credenciales
+DB_BACKEND = os.getenv('DB_BACKEND', 'firestore').lower()
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, backend=DB_BACKEND, path=None):
+        self.backend = backend
+        if backend == 'firestore':
+            self.db = self._firestore_client()
+            # Transforms atómicos (ArrayUnion, ArrayRemove, Increment, DELETE_FIELD) del backend activo
+            self.ops = firestore
+        else:
+            self.db = self.ops = create_store(backend, path or os.getenv('DB_SQLITE_PATH'))
+        self.apiKeys = self.db.collection('api_keys')
+        # Configuración de recordatorios por servidor (cogs/schedule.py), un documento por guild
+        self.reminders = self.db.collection('reminders')
+        # Recordatorios personales (cogs/remind.py), un documento por recordatorio con `due_at`
+        self.userReminders = self.db.collection('user_reminders')
+        self.blacklist = self.db.collection('blacklist')
+        self.roulettes = self.db.collection('roulettes')
+        self.events = self.db.collection('events')
+        self.logAutoupload = self.db.collection('log_autoupload')
+        self.antispam = self.db.collection('antispam')
+        # Cache en memoria de la blacklist (ids de usuario). None = aún no cargada.
+        self._blacklist_ids: set[int] | None = None
+        # El SDK de Firestore es síncrono: todas las llamadas de red se ejecutan en
+        # un pool de hilos acotado para no bloquear nunca el event loop de discord.py.
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('FIRESTORE_MAX_WORKERS', 16)),
+            thread_name_prefix='firestore',
+        )
+
+    @staticmethod
+    def _firestore_client():
         firebase_config = {
             "type": os.getenv('FIREBASE_TYPE'),
             "project_id": os.getenv('FIREBASE_PROJECT_ID'),
@@ -22,24 +59,31 @@ class DatabaseManager:
             "client_x509_cert_url": os.getenv('FIREBASE_CLIENT_X509_CERT_URL'),
             "universe_domain": os.getenv('FIREBASE_UNIVERSE_DOMAIN')
         }
-        
+
         if not firebase_admin._apps:
-            self.cred = credentials.Certificate(firebase_config)
-            firebase_admin.initialize_app(self.cred)
-        
-        self.db = firestore.client()
-        self.apiKeys = self.db.collection('api_keys')
-        self.reminders = self.db.collection('reminders')
-        self.blacklist = self.db.collection('blacklist')
-        self.roulettes = self.db.collection('roulettes')
-        self.events = self.db.collection('events')
-        self.logAutoupload = self.db.collection('log_autoupload')
+            firebase_admin.initialize_app(credentials.Certificate(firebase_config))
+        return firestore.client()
+
+    async def run(self, func, *args, **kwargs):
+        """Ejecuta una llamada bloqueante de Firestore en el pool dedicado y espera su resultado."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _stream(self, query):
+        """Materializa un `stream()` de Firestore fuera del event loop."""
+        return await self.run(lambda: list(query.stream()))
+
+    def close(self):
+        """Libera el pool de hilos de Firestore."""
+        self._executor.shutdown(wait=False)
 
     async def connect(self):
         try:
             doc_ref = self.db.collection('test').document('ping')
-            doc_ref.set({'message': 'ping'})
-            print('✅ Conectado a Firebase Firestore')
+            await self.run(doc_ref.set, {'message': 'ping'})
+            print('✅ Conectado a Firebase Firestore' if self.backend == 'firestore' else f'✅ Base de datos local ({self.backend})')
+            if self._blacklist_ids is None:
+                await self.loadBlacklist()
             return True
         except Exception as error:
             print('❌ Error de conexión Firestore:', str(error))
@@ -48,16 +92,16 @@ class DatabaseManager:
     async def setApiKey(self, userId, apiKey):
         try:
             # Validar la clave API y obtener el nombre de la cuenta
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"https://api.guildwars2.com/v2/account?access_token={apiKey}") as response:
-                    if response.status != 200:
-                        print(f"❌ API key inválida para usuario {userId}")
-                        return False
-                    account_data = await response.json()
-                    account_name = account_data.get('name', 'Unknown')
+            session = get_session()
+            async with session.get(f"https://api.guildwars2.com/v2/account?access_token={apiKey}") as response:
+                if response.status != 200:
+                    print(f"❌ API key inválida para usuario {userId}")
+                    return False
+                account_data = await response.json()
+                account_name = account_data.get('name', 'Unknown')
 
             doc_ref = self.apiKeys.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             api_keys = doc.to_dict().get('keys', []) if doc.exists else []
             
             # Añadir la nueva clave como un diccionario
@@ -69,7 +113,7 @@ class DatabaseManager:
             }
             api_keys.append(new_key)
             
-            doc_ref.set({'keys': api_keys})
+            await self.run(doc_ref.set, {'keys': api_keys})
             print(f"✅ API Key añadida para usuario {userId}, cuenta {account_name}")
             return True
         except Exception as error:
@@ -79,7 +123,7 @@ class DatabaseManager:
     async def getApiKey(self, userId):
         try:
             doc_ref = self.apiKeys.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             if not doc.exists:
                 return None
                 
@@ -95,7 +139,7 @@ class DatabaseManager:
     async def deleteApiKey(self, userId, index=None):
         try:
             doc_ref = self.apiKeys.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             if not doc.exists:
                 return False
                 
@@ -112,9 +156,9 @@ class DatabaseManager:
                 api_keys.clear()
                 
             if api_keys:
-                doc_ref.set({'keys': api_keys})
+                await self.run(doc_ref.set, {'keys': api_keys})
             else:
-                doc_ref.delete()
+                await self.run(doc_ref.delete)
             print(f"✅ API Key eliminada para usuario {userId}")
             return True
         except Exception as error:
@@ -124,7 +168,7 @@ class DatabaseManager:
     async def setActiveApiKey(self, userId, index):
         try:
             doc_ref = self.apiKeys.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             if not doc.exists:
                 return False
                 
@@ -135,7 +179,7 @@ class DatabaseManager:
             for i in range(len(api_keys)):
                 api_keys[i]['active'] = (i == index)
             
-            doc_ref.set({'keys': api_keys})
+            await self.run(doc_ref.set, {'keys': api_keys})
             print(f"✅ API Key en índice {index} activada para usuario {userId}")
             return True
         except Exception as error:
@@ -145,7 +189,7 @@ class DatabaseManager:
     async def getApiKeysList(self, userId):
         try:
             doc_ref = self.apiKeys.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             if not doc.exists:
                 return []
             
@@ -167,7 +211,7 @@ class DatabaseManager:
     async def setReminder(self, userId, reminderData):
         try:
             reminder_ref = self.reminders.document(str(userId))
-            reminder_ref.set(reminderData)
+            await self.run(reminder_ref.set, reminderData)
             print(f"✅ Recordatorio guardado para usuario {userId}")
             return True
         except Exception as error:
@@ -177,7 +221,7 @@ class DatabaseManager:
     async def getReminder(self, userId):
         try:
             doc_ref = self.reminders.document(str(userId))
-            doc = doc_ref.get()
+            doc = await self.run(doc_ref.get)
             return doc.to_dict() if doc.exists else None
         except Exception as error:
             print(f"❌ Error obteniendo recordatorio: {str(error)}")
@@ -186,7 +230,7 @@ class DatabaseManager:
     async def deleteReminder(self, userId):
         try:
             doc_ref = self.reminders.document(str(userId))
-            doc_ref.delete()
+            await self.run(doc_ref.delete)
             print(f"✅ Recordatorio eliminado para usuario {userId}")
             return True
         except Exception as error:
@@ -196,7 +240,7 @@ class DatabaseManager:
     async def get_all_reminders(self):
         try:
             reminders_list = []
-            docs = self.reminders.stream()
+            docs = await self._stream(self.reminders)
             
             for doc in docs:
                 reminder_data = doc.to_dict()
@@ -209,12 +253,101 @@ class DatabaseManager:
             print(f"❌ Error obteniendo todos los recordatorios: {str(error)}")
             return []
 
+    # ─────────────────────────────────────────────────────────
+    #  Recordatorios personales
+    # ─────────────────────────────────────────────────────────
+
+    async def saveUserReminder(self, reminderId, reminderData):
+        """Guarda un recordatorio en su propio documento; `reminderData` debe incluir `due_at` (epoch)."""
+        try:
+            await self.run(self.userReminders.document(str(reminderId)).set, reminderData)
+            return True
+        except Exception as error:
+            print(f"❌ Error guardando recordatorio {reminderId}: {str(error)}")
+            return False
+
+    async def deleteUserReminder(self, reminderId):
+        try:
+            await self.run(self.userReminders.document(str(reminderId)).delete)
+            return True
+        except Exception as error:
+            print(f"❌ Error eliminando recordatorio {reminderId}: {str(error)}")
+            return False
+
+    async def getUserReminders(self, userId):
+        """Recordatorios pendientes de un usuario, ordenados por vencimiento."""
+        try:
+            docs = await self._stream(self.userReminders.where('user_id', '==', str(userId)))
+            reminders_list = [{**doc.to_dict(), 'id': doc.id} for doc in docs]
+            reminders_list.sort(key=lambda r: r.get('due_at', 0))
+            return reminders_list
+        except Exception as error:
+            print(f"❌ Error obteniendo recordatorios de {userId}: {str(error)}")
+            return None
+
+    async def get_reminders_due_before(self, ts, after=None):
+        """Recordatorios con `after <= due_at < ts` (consulta por rango sobre el índice de `due_at`)."""
+        try:
+            query = self.userReminders.where('due_at', '<', ts)
+            if after is not None:
+                query = query.where('due_at', '>=', after)
+            docs = await self._stream(query.order_by('due_at'))
+            return [{**doc.to_dict(), 'id': doc.id} for doc in docs]
+        except Exception as error:
+            print(f"❌ Error obteniendo recordatorios pendientes: {str(error)}")
+            return []
+
+    async def migrateLegacyReminders(self):
+        """Mueve los recordatorios antiguos (un documento por usuario en `reminders`) a `user_reminders`."""
+        try:
+            # Los recordatorios antiguos guardan `time` como texto ISO y las configuraciones de
+            # servidor no tienen ese campo: un rango sobre strings (todo string es >= '') solo
+            # devuelve documentos con `time` de tipo texto, sin leer toda la colección
+            docs = await self._stream(self.reminders.where('time', '>=', ''))
+            moves = []
+            for doc in docs:
+                data = doc.to_dict() or {}
+                if 'user_id' not in data:
+                    continue
+                try:
+                    data['due_at'] = datetime.fromisoformat(data['time']).timestamp()
+                except (ValueError, TypeError):
+                    continue
+                moves.append((doc.reference, data))
+
+            # 250 pares set + delete = 500 escrituras, el máximo de un lote
+            for start in range(0, len(moves), 250):
+                batch = self.db.batch()
+                for reference, data in moves[start:start + 250]:
+                    batch.set(self.userReminders.document(uuid.uuid4().hex), data)
+                    batch.delete(reference)
+                await self.run(batch.commit)
+            if moves:
+                print(f"✅ Migrados {len(moves)} recordatorios a user_reminders")
+            return len(moves)
+        except Exception as error:
+            print(f"❌ Error migrando recordatorios antiguos: {str(error)}")
+            return 0
+
+    async def loadBlacklist(self):
+        """Carga la blacklist completa en memoria; después se mantiene con write-through."""
+        try:
+            docs = await self._stream(self.blacklist)
+            self._blacklist_ids = {int(doc.id) for doc in docs if doc.id.isdigit()}
+            print(f"✅ Blacklist cargada ({len(self._blacklist_ids)} usuarios)")
+            return True
+        except Exception as error:
+            print(f"❌ Error cargando blacklist: {str(error)}")
+            return False
+
     async def addToBlacklist(self, userId, reason="No reason"):
         try:
-            self.blacklist.document(str(userId)).set({
+            await self.run(self.blacklist.document(str(userId)).set, {
                 'reason': reason,
                 'timestamp': datetime.now()
             })
+            if self._blacklist_ids is not None:
+                self._blacklist_ids.add(int(userId))
             print(f"✅ Usuario {userId} añadido a la blacklist")
             return True
         except Exception as error:
@@ -223,7 +356,9 @@ class DatabaseManager:
 
     async def removeFromBlacklist(self, userId):
         try:
-            self.blacklist.document(str(userId)).delete()
+            await self.run(self.blacklist.document(str(userId)).delete)
+            if self._blacklist_ids is not None:
+                self._blacklist_ids.discard(int(userId))
             print(f"✅ Usuario {userId} eliminado de la blacklist")
             return True
         except Exception as error:
@@ -231,8 +366,11 @@ class DatabaseManager:
             return False
 
     async def isBlacklisted(self, userId):
+        # Camino rápido: la cache en memoria responde sin tocar Firestore.
+        if self._blacklist_ids is not None:
+            return int(userId) in self._blacklist_ids
         try:
-            doc = self.blacklist.document(str(userId)).get()
+            doc = await self.run(self.blacklist.document(str(userId)).get)
             return doc.exists
         except Exception as error:
             print(f"❌ Error comprobando blacklist: {str(error)}")
@@ -254,27 +392,69 @@ class DatabaseManager:
                 payload['participants'] = [int(uid) for uid in data['participants']]
             if 'winner_count' in data:
                 payload['winner_count'] = int(data['winner_count'])
-            self.roulettes.document(str(channel_id)).set(payload, merge=True)
+            if 'state' in data:
+                payload['state'] = str(data['state'])
+                payload['version'] = 0
+            if 'winners' in data:
+                payload['winners'] = [int(uid) for uid in data['winners']]
+            await self.run(self.roulettes.document(str(channel_id)).set, payload, merge=True)
             return True
         except Exception as error:
             print(f"❌ Error guardando ruleta {channel_id}: {str(error)}")
             return False
 
-    async def addRouletteParticipant(self, channel_id, user_id):
-        """Añade un participante a la ruleta usando ArrayUnion (atómico, evita duplicados)."""
-        try:
-            self.roulettes.document(str(channel_id)).update({
-                'participants': firestore.ArrayUnion([int(user_id)]),
-                'updated_at': datetime.now(),
-            })
+    def _compare_and_set(self, ref, field, expected, changes, default=None):
+        """Aplica `changes` solo si `field` vale `expected`, de forma atómica. Devuelve si se aplicó."""
+        def check(snapshot):
+            return snapshot.exists and (snapshot.to_dict() or {}).get(field, default) == expected
+
+        if self.backend != 'firestore':
+            with self.db.atomic():
+                if not check(ref.get()):
+                    return False
+                ref.update(changes)
+                return True
+
+        @firestore.transactional
+        def apply(transaction):
+            if not check(ref.get(transaction=transaction)):
+                return False
+            transaction.update(ref, changes)
             return True
+
+        return apply(self.db.transaction())
+
+    async def transitionRoulette(self, channel_id, from_state, to_state, data=None):
+        """Cambia el estado de una ruleta (open → spinning → resolved) solo si sigue en `from_state`.
+
+        Devuelve True si se aplicó, False si otro proceso ya la cambió y None si Firestore falló.
+        Los documentos antiguos sin `state` cuentan como abiertos.
+        """
+        changes = {
+            'state': to_state,
+            'active': to_state != 'resolved',
+            'version': self.ops.Increment(1),
+            'updated_at': datetime.now(),
+        }
+        if data and 'winners' in data:
+            changes['winners'] = [int(uid) for uid in data['winners']]
+        try:
+            ref = self.roulettes.document(str(channel_id))
+            return await self.run(self._compare_and_set, ref, 'state', from_state, changes, 'open')
         except Exception as error:
-            print(f"❌ Error añadiendo participante {user_id} a ruleta {channel_id}: {str(error)}")
-            return False
+            print(f"❌ Error cambiando ruleta {channel_id} a {to_state}: {str(error)}")
+            return None
+
+    async def addRouletteParticipants(self, channel_id, user_ids):
+        """Añade varios participantes en una sola escritura (ArrayUnion); lanza excepción si falla."""
+        await self.run(self.roulettes.document(str(channel_id)).update, {
+            'participants': self.ops.ArrayUnion([int(uid) for uid in user_ids]),
+            'updated_at': datetime.now(),
+        })
 
     async def deleteRoulette(self, channel_id):
         try:
-            self.roulettes.document(str(channel_id)).delete()
+            await self.run(self.roulettes.document(str(channel_id)).delete)
             return True
         except Exception as error:
             print(f"❌ Error eliminando ruleta {channel_id}: {str(error)}")
@@ -284,7 +464,7 @@ class DatabaseManager:
         """Devuelve todas las ruletas activas (lista de dicts)."""
         try:
             results = []
-            docs = self.roulettes.where('active', '==', True).stream()
+            docs = await self._stream(self.roulettes.where('active', '==', True))
             for doc in docs:
                 data = doc.to_dict() or {}
                 data['channel_id'] = int(doc.id)
@@ -311,10 +491,13 @@ class DatabaseManager:
                 "start_ts":   int(event_data.get("start_ts", 0)),
                 "end_ts":     int(event_data.get("end_ts", 0)),
                 "status":     str(event_data.get("status", "open")),
-                "roles":      event_data.get("roles", []),
+                # Solo la definición de los roles; los participantes van en `signups`
+                "roles":      [{k: v for k, v in r.items() if k != "participants"} for r in event_data.get("roles", [])],
+                # Un campo por participante (ver updateEvents); nunca se reescribe entero
+                "signups":    event_data.get("signups", {}),
                 "created_at": event_data.get("created_at", datetime.now()),
             }
-            self.events.document(doc_id).set(payload)
+            await self.run(self.events.document(doc_id).set, payload)
             print(f"✅ Evento guardado: {doc_id}")
             return True
         except Exception as e:
@@ -324,7 +507,7 @@ class DatabaseManager:
     async def getEvent(self, doc_id: str) -> dict | None:
         """Obtiene un evento por su ID (= message_id)."""
         try:
-            doc = self.events.document(str(doc_id)).get()
+            doc = await self.run(self.events.document(str(doc_id)).get)
             if not doc.exists:
                 return None
             data = doc.to_dict()
@@ -334,19 +517,41 @@ class DatabaseManager:
             print(f"❌ Error obteniendo evento {doc_id}: {e}")
             return None
 
-    async def updateEventRoles(self, doc_id: str, roles: list) -> bool:
-        """Actualiza la lista de roles (con participantes) de un evento."""
-        try:
-            self.events.document(str(doc_id)).update({"roles": roles})
-            return True
-        except Exception as e:
-            print(f"❌ Error actualizando roles del evento {doc_id}: {e}")
-            return False
+    async def updateEvents(self, updates: dict) -> dict:
+        """Aplica `{doc_id: {campo: valor}}` con escrituras en lote (hasta 500 por commit).
+
+        Los campos admiten rutas con punto (`signups.<clave>`), así cada alta o baja
+        toca un solo campo y las inscripciones simultáneas no se pisan entre sí.
+        Un lote es todo o nada: si falla, ese lote se repite documento a documento
+        para que un evento borrado no bloquee a los demás. Devuelve los que no se
+        pudieron escribir: `{doc_id: "missing" | "error"}` (vacío si todo fue bien).
+        """
+        failed = {}
+        items = list(updates.items())
+        for start in range(0, len(items), 500):
+            chunk = items[start:start + 500]
+            try:
+                batch = self.db.batch()
+                for doc_id, fields in chunk:
+                    batch.update(self.events.document(str(doc_id)), fields)
+                await self.run(batch.commit)
+                continue
+            except Exception as e:
+                print(f"⚠️ Lote de {len(chunk)} evento(s) falló, se reintenta uno a uno: {e}")
+            for doc_id, fields in chunk:
+                try:
+                    await self.run(self.events.document(str(doc_id)).update, fields)
+                except (NotFound, LocalNotFound):
+                    failed[doc_id] = "missing"
+                except Exception as e:
+                    print(f"❌ Error actualizando evento {doc_id}: {e}")
+                    failed[doc_id] = "error"
+        return failed
 
     async def updateEventStatus(self, doc_id: str, status: str) -> bool:
         """Actualiza el estado de un evento (open / closed / cancelled)."""
         try:
-            self.events.document(str(doc_id)).update({"status": status})
+            await self.run(self.events.document(str(doc_id)).update, {"status": status})
             return True
         except Exception as e:
             print(f"❌ Error actualizando estado del evento {doc_id}: {e}")
@@ -356,7 +561,7 @@ class DatabaseManager:
         """Devuelve todos los eventos con status='open'."""
         try:
             results = []
-            for doc in self.events.where("status", "==", "open").stream():
+            for doc in await self._stream(self.events.where("status", "==", "open")):
                 data = doc.to_dict() or {}
                 data["doc_id"] = doc.id
                 results.append(data)
@@ -369,7 +574,7 @@ class DatabaseManager:
         """Devuelve todos los eventos de un servidor."""
         try:
             results = []
-            for doc in self.events.where("guild_id", "==", int(guild_id)).stream():
+            for doc in await self._stream(self.events.where("guild_id", "==", int(guild_id))):
                 data = doc.to_dict() or {}
                 data["doc_id"] = doc.id
                 results.append(data)
@@ -380,7 +585,7 @@ class DatabaseManager:
 
     async def getLogAutouploadConfig(self, guild_id: str) -> dict:
         try:
-            doc = self.logAutoupload.document(str(guild_id)).get()
+            doc = await self.run(self.logAutoupload.document(str(guild_id)).get)
             if not doc.exists:
                 return {"enabled": False, "channel_id": None, "only_success": True}
             data = doc.to_dict() or {}
@@ -402,7 +607,7 @@ class DatabaseManager:
             }
             if config.get("channel_id") is not None:
                 payload["channel_id"] = int(config["channel_id"])
-            self.logAutoupload.document(str(guild_id)).set(payload, merge=True)
+            await self.run(self.logAutoupload.document(str(guild_id)).set, payload, merge=True)
             return True
         except Exception as e:
             print(f"❌ Error guardando config autoupload {guild_id}: {e}")
@@ -411,7 +616,7 @@ class DatabaseManager:
     async def getEnabledLogAutouploadGuilds(self) -> list[dict]:
         try:
             results = []
-            for doc in self.logAutoupload.where("enabled", "==", True).stream():
+            for doc in await self._stream(self.logAutoupload.where("enabled", "==", True)):
                 data = doc.to_dict() or {}
                 data["guild_id"] = doc.id
                 if data.get("channel_id"):
@@ -422,4 +627,26 @@ class DatabaseManager:
             return []
 
 
+    # ─────────────────────────────────────────────────────────
+    #  AntiSpam
+    # ─────────────────────────────────────────────────────────
+
+    async def getAntispamConfig(self, guild_id) -> dict | None:
+        """Config guardada del servidor ({} si no tiene); None si Firestore falló."""
+        try:
+            doc = await self.run(self.antispam.document(str(guild_id)).get)
+            return (doc.to_dict() or {}) if doc.exists else {}
+        except Exception as e:
+            print(f"❌ Error leyendo config antispam {guild_id}: {e}")
+            return None
+
+    async def setAntispamConfig(self, guild_id, config: dict) -> bool:
+        try:
+            payload = {**config, "updated_at": datetime.now()}
+            await self.run(self.antispam.document(str(guild_id)).set, payload, merge=True)
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando config antispam {guild_id}: {e}")
+            return False
+
 dbManager = DatabaseManager()
\ No newline at end of file
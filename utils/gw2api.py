@@ -0,0 +1,303 @@
+"""Cliente centralizado de la API de GW2.
+
+- Las peticiones de un solo id a endpoints bulk (`/v2/items`, `/v2/commerce/prices`)
+  se agrupan durante una ventana corta y se resuelven con una sola llamada `?ids=`
+  de hasta 200 ids.
+- Las peticiones idénticas en vuelo se comparten: diez usuarios pidiendo el precio
+  del ecto a la vez generan una única llamada HTTP.
+- Los precios del Trading Post se guardan en una cache con TTL y
+  stale-while-revalidate (`PriceCache`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import aiohttp
+
+from utils.http_session import get_session
+
+logger = logging.getLogger(__name__)
+
+GW2_API_URL = "https://api.guildwars2.com/v2"
+MAX_IDS_PER_REQUEST = 200
+BATCH_WINDOW_SECONDS = float(os.getenv("GW2_BATCH_WINDOW_MS", 15)) / 1000
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# Cache de precios: frescos durante TTL; hasta TTL + STALE se sirven y se refrescan en segundo plano
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", 60))
+PRICE_CACHE_STALE = float(os.getenv("PRICE_CACHE_STALE", 300))
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", 5000))
+# Ítems sin precio (no comerciables, 404): se recuerda el None durante este tiempo
+PRICE_CACHE_NEGATIVE_TTL = float(os.getenv("PRICE_CACHE_NEGATIVE_TTL", 30))
+
+
+class BulkEndpoint:
+    """Agrupa peticiones de ids sueltos a un endpoint bulk de la API."""
+
+    def __init__(self, client: "GW2Client", path: str, params: Optional[dict] = None):
+        self.client = client
+        self.path = path
+        self.params = params or {}
+        # id -> future compartido por todos los que esperan ese id (pendiente o en vuelo)
+        self._waiters: dict[int, asyncio.Future] = {}
+        self._queued: list[int] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _enqueue(self, item_id: int) -> asyncio.Future:
+        fut = self._waiters.get(item_id)
+        if fut is not None:
+            return fut
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters[item_id] = fut
+        self._queued.append(item_id)
+        if len(self._queued) >= MAX_IDS_PER_REQUEST:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(BATCH_WINDOW_SECONDS, self._flush)
+        return fut
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        queued, self._queued = self._queued, []
+        for i in range(0, len(queued), MAX_IDS_PER_REQUEST):
+            task = asyncio.create_task(self._fetch_chunk(queued[i:i + MAX_IDS_PER_REQUEST]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_chunk(self, ids: list[int]) -> None:
+        params = {**self.params, "ids": ",".join(map(str, ids))}
+        results: dict[int, Any] = {}
+        error: Optional[Exception] = None
+        try:
+            data = await self.client.get_json(self.path, params)
+            if isinstance(data, list):
+                results = {entry["id"]: entry for entry in data if isinstance(entry, dict) and "id" in entry}
+        except aiohttp.ClientResponseError as exc:
+            # 404 en una consulta `?ids=` es "all ids provided are invalid": respuesta válida sin entradas
+            if exc.status != 404:
+                error = exc
+        except Exception as exc:
+            error = exc
+        if error is not None:
+            logger.warning("GW2 API %s ids=%s falló: %s", self.path, len(ids), error)
+        for item_id in ids:
+            fut = self._waiters.pop(item_id, None)
+            if fut is None or fut.done():
+                continue
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(results.get(item_id))
+
+    async def fetch(self, item_id: int) -> Optional[dict]:
+        """Devuelve la entrada de un id o None si la API no la conoce.
+
+        Lanza la excepción de la petición si la API falló (timeout, 5xx, conexión).
+        """
+        return await asyncio.shield(self._enqueue(int(item_id)))
+
+    async def get(self, item_id: int) -> Optional[dict]:
+        """Devuelve la entrada de un id o None si no existe / la API falló."""
+        try:
+            return await self.fetch(item_id)
+        except Exception:
+            return None
+
+    async def get_many(self, ids: Iterable[int]) -> dict[int, dict]:
+        """Devuelve {id: entrada} para los ids encontrados."""
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        entries = await asyncio.gather(*(self.get(i) for i in ids))
+        return {i: entry for i, entry in zip(ids, entries) if entry is not None}
+
+
+@dataclass
+class PriceCacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        cached = self.hits + self.stale_hits + self.negative_hits
+        total = cached + self.misses
+        return cached / total if total else 0.0
+
+
+@dataclass
+class PriceCache:
+    """Cache de precios por id con TTL y stale-while-revalidate."""
+
+    fetch: Callable[[int], Awaitable[Optional[dict]]]
+    ttl: float = PRICE_CACHE_TTL
+    stale: float = PRICE_CACHE_STALE
+    max_entries: int = PRICE_CACHE_MAX_ENTRIES
+    negative_ttl: float = PRICE_CACHE_NEGATIVE_TTL
+
+    # id -> (timestamp monotónico, precio)
+    _entries: dict[int, tuple[float, dict]] = field(default_factory=dict, init=False)
+    # id -> timestamp monotónico de la última consulta que no devolvió precio
+    _missing: dict[int, float] = field(default_factory=dict, init=False)
+    _refreshing: dict[int, asyncio.Task] = field(default_factory=dict, init=False)
+    stats: PriceCacheStats = field(default_factory=PriceCacheStats, init=False)
+
+    async def get(self, item_id: int) -> Optional[dict]:
+        """Precio del id, o None si no tiene precio o la API falló (los fallos no se cachean)."""
+        item_id = int(item_id)
+        entry = self._entries.get(item_id)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.stats.hits += 1
+                return entry[1]
+            if age < self.ttl + self.stale:
+                self.stats.stale_hits += 1
+                self._schedule_refresh(item_id)
+                return entry[1]
+        missing_since = self._missing.get(item_id)
+        if missing_since is not None:
+            if time.monotonic() - missing_since < self.negative_ttl:
+                self.stats.negative_hits += 1
+                return None
+            del self._missing[item_id]
+        self.stats.misses += 1
+        try:
+            return await self._load(item_id)
+        except Exception as exc:
+            self.stats.refresh_errors += 1
+            logger.debug("Consulta de precio %s falló: %s", item_id, exc)
+            return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, item_id: Optional[int] = None) -> None:
+        if item_id is None:
+            self._entries.clear()
+            self._missing.clear()
+        else:
+            self._entries.pop(int(item_id), None)
+            self._missing.pop(int(item_id), None)
+
+    def _schedule_refresh(self, item_id: int) -> None:
+        if item_id in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(item_id))
+        self._refreshing[item_id] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(item_id, None))
+
+    async def _refresh(self, item_id: int) -> None:
+        self.stats.refreshes += 1
+        try:
+            await self._load(item_id)
+        except Exception as exc:
+            self.stats.refresh_errors += 1
+            logger.warning("Refresco de precio %s falló: %s", item_id, exc)
+
+    async def _load(self, item_id: int) -> Optional[dict]:
+        # Si la API falla, `fetch` lanza: no se toca la cache y el precio antiguo (si lo
+        # hay) se sigue sirviendo mientras esté dentro de la ventana stale
+        data = await self.fetch(item_id)
+        if data is not None:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+            self._entries[item_id] = (time.monotonic(), data)
+            self._missing.pop(item_id, None)
+        else:
+            # La API respondió sin este id: ya no tiene precio, se recuerda el None
+            self._entries.pop(item_id, None)
+            if len(self._missing) >= self.max_entries:
+                self._evict_missing()
+            self._missing[item_id] = time.monotonic()
+        return data
+
+    def _evict_expired(self) -> None:
+        limit = time.monotonic() - (self.ttl + self.stale)
+        expired = [item_id for item_id, (ts, _) in self._entries.items() if ts < limit]
+        for item_id in expired:
+            del self._entries[item_id]
+        # Si todo sigue vigente, se descartan las entradas más antiguas
+        overflow = len(self._entries) - self.max_entries + 1
+        if overflow > 0:
+            for item_id, _ in sorted(self._entries.items(), key=lambda kv: kv[1][0])[:overflow]:
+                del self._entries[item_id]
+
+    def _evict_missing(self) -> None:
+        limit = time.monotonic() - self.negative_ttl
+        self._missing = {item_id: ts for item_id, ts in self._missing.items() if ts >= limit}
+        overflow = len(self._missing) - self.max_entries + 1
+        if overflow > 0:
+            for item_id in list(self._missing)[:overflow]:
+                del self._missing[item_id]
+
+
+class GW2Client:
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._bulk: dict[tuple, BulkEndpoint] = {}
+        self.price_cache = PriceCache(fetch=lambda item_id: self.bulk("commerce/prices").fetch(item_id))
+
+    def bulk(self, path: str, **params) -> BulkEndpoint:
+        key = (path, tuple(sorted(params.items())))
+        endpoint = self._bulk.get(key)
+        if endpoint is None:
+            endpoint = self._bulk[key] = BulkEndpoint(self, path, params)
+        return endpoint
+
+    async def get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        """GET a `/v2/{path}` compartiendo las peticiones idénticas que ya estén en vuelo.
+
+        Lanza `aiohttp.ClientResponseError` si la API no responde 200/206.
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._request(path, params))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
+
+    async def _request(self, path: str, params: Optional[dict]) -> Any:
+        session = get_session()
+        async with session.get(f"{GW2_API_URL}/{path}", params=params, timeout=REQUEST_TIMEOUT) as response:
+            if response.status not in (200, 206):
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history, status=response.status,
+                    message=f"Unexpected status {response.status}",
+                )
+            return await response.json()
+
+    async def get_item(self, item_id: int, lang: str = "en") -> Optional[dict]:
+        return await self.bulk("items", lang=lang).get(item_id)
+
+    async def get_items(self, ids: Iterable[int], lang: str = "en") -> dict[int, dict]:
+        return await self.bulk("items", lang=lang).get_many(ids)
+
+    async def get_price(self, item_id: int) -> Optional[dict]:
+        return await self.price_cache.get(item_id)
+
+    async def get_prices(self, ids: Iterable[int]) -> dict[int, dict]:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        entries = await asyncio.gather(*(self.price_cache.get(i) for i in ids))
+        return {i: entry for i, entry in zip(ids, entries) if entry is not None}
+
+    async def get_sell_price(self, item_id: int) -> Optional[int]:
+        """Precio de venta unitario (sells.unit_price) o None."""
+        price = await self.get_price(item_id)
+        if not price:
+            return None
+        return price.get("sells", {}).get("unit_price")
+
+
+gw2api = GW2Client()
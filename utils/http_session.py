@@ -0,0 +1,47 @@
+"""Sesión HTTP (aiohttp) compartida por todo el bot.
+
+El bot la crea en `setup_hook` y la cierra al apagarse; los cogs la piden con
+`get_session()` en lugar de abrir un `aiohttp.ClientSession()` por comando, de
+modo que las conexiones TCP/TLS a api.guildwars2.com se reutilizan.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import aiohttp
+
+# Límites del pool de conexiones (configurables por entorno)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 60))
+HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", 300))
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def create_session() -> aiohttp.ClientSession:
+    """Crea (o devuelve, si sigue abierta) la sesión compartida."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=HTTP_DNS_CACHE_SECONDS,
+        )
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Sesión para usar en cogs y utilidades. No debe cerrarse ni usarse con `async with`."""
+    return create_session()
+
+
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -0,0 +1,335 @@
+"""Catálogo local de ítems de GW2 en SQLite.
+
+Guarda id, nombres EN/ES, rareza e icono de cada ítem y responde búsquedas por
+prefijo (índice B-tree sobre el nombre normalizado) y por subcadena (FTS5 con
+tokenizer trigram) en milisegundos, sin mantener el catálogo en memoria.
+Lo comparten /search, /item y los comandos del Trading Post.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ITEM_DB_FILE = os.path.join(_PROJECT_ROOT, "data", "items.sqlite3")
+# Caché antigua (lista JSON de {id, name}); se importa una vez si la base está vacía
+LEGACY_CACHE_FILE = "items_cache.json"
+
+_PREFIX_HIGH = "\U0010ffff"
+# Las consultas de 1-2 letras tocan miles de filas; su resultado se guarda en memoria
+SHORT_QUERY_CACHE_LEN = 2
+# Consultas cortas recordadas como máximo (LRU): el texto lo escribe el usuario, Unicode incluido
+SHORT_QUERY_CACHE_SIZE = int(os.getenv("ITEM_SHORT_QUERY_CACHE_SIZE", 512))
+_COLUMNS = ("id", "name_en", "name_es", "rarity", "icon")
+
+
+def normalize_name(text: str) -> str:
+    """Minúsculas y sin acentos: 'Sabiduría' -> 'sabiduria'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+class ItemStore:
+    def __init__(self, path: str = ITEM_DB_FILE):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._has_fts = False
+        self._short_query_cache: OrderedDict[tuple[str, int], list[dict]] = OrderedDict()
+        # Sube con cada escritura: un resultado calculado antes no se guarda en la caché
+        self._generation = 0
+
+    # ── conexión / esquema ──────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    id      INTEGER PRIMARY KEY,
+                    name_en TEXT NOT NULL DEFAULT '',
+                    name_es TEXT NOT NULL DEFAULT '',
+                    rarity  TEXT,
+                    icon    TEXT,
+                    norm_en TEXT NOT NULL DEFAULT '',
+                    norm_es TEXT NOT NULL DEFAULT '',
+                    fetched_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_items_norm_en ON items(norm_en);
+                CREATE INDEX IF NOT EXISTS idx_items_norm_es ON items(norm_es);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key   TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """
+            )
+            # Bases creadas antes de existir `fetched_at`
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+            if "fetched_at" not in columns:
+                conn.execute("ALTER TABLE items ADD COLUMN fetched_at REAL")
+            try:
+                conn.executescript(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                        norm_en, norm_es, content='items', content_rowid='id', tokenize='trigram'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+                        INSERT INTO items_fts(rowid, norm_en, norm_es) VALUES (new.id, new.norm_en, new.norm_es);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+                        INSERT INTO items_fts(items_fts, rowid, norm_en, norm_es) VALUES ('delete', old.id, old.norm_en, old.norm_es);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE ON items BEGIN
+                        INSERT INTO items_fts(items_fts, rowid, norm_en, norm_es) VALUES ('delete', old.id, old.norm_en, old.norm_es);
+                        INSERT INTO items_fts(rowid, norm_en, norm_es) VALUES (new.id, new.norm_en, new.norm_es);
+                    END;
+                    """
+                )
+                self._has_fts = True
+            except sqlite3.OperationalError as exc:
+                # SQLite sin FTS5/trigram: las búsquedas por subcadena hacen un escaneo
+                logger.warning("FTS5 trigram no disponible, se usará LIKE: %s", exc)
+            conn.commit()
+            self._conn = conn
+            return conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ── escritura ───────────────────────────────────────────
+
+    def upsert_items(self, items: Iterable[dict], fetched: bool = False) -> int:
+        """Inserta o actualiza ítems ({id, name_en, name_es, rarity, icon}). Bloqueante.
+
+        `fetched` marca los ítems como descargados ya de la API en ambos idiomas, aunque
+        les falte el nombre ES o la rareza: la sincronización no vuelve a pedirlos.
+        """
+        fetched_at = time.time() if fetched else None
+        rows = []
+        for item in items:
+            name_en = item.get("name_en") or ""
+            name_es = item.get("name_es") or ""
+            rows.append((
+                int(item["id"]), name_en, name_es, item.get("rarity"), item.get("icon"),
+                normalize_name(name_en), normalize_name(name_es), fetched_at,
+            ))
+        if not rows:
+            return 0
+        conn = self._connect()
+        with self._lock:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO items (id, name_en, name_es, rarity, icon, norm_en, norm_es, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        name_en = CASE WHEN excluded.name_en != '' THEN excluded.name_en ELSE items.name_en END,
+                        name_es = CASE WHEN excluded.name_es != '' THEN excluded.name_es ELSE items.name_es END,
+                        rarity  = COALESCE(excluded.rarity, items.rarity),
+                        icon    = COALESCE(excluded.icon, items.icon),
+                        norm_en = CASE WHEN excluded.norm_en != '' THEN excluded.norm_en ELSE items.norm_en END,
+                        norm_es = CASE WHEN excluded.norm_es != '' THEN excluded.norm_es ELSE items.norm_es END,
+                        fetched_at = COALESCE(excluded.fetched_at, items.fetched_at)
+                    """,
+                    rows,
+                )
+            # Tras el commit y con el lock: ninguna búsqueda en curso puede guardar un resultado anterior
+            self._generation += 1
+            self._short_query_cache.clear()
+        return len(rows)
+
+    def import_legacy_cache(self, path: str = LEGACY_CACHE_FILE) -> int:
+        """Importa la antigua `items_cache.json` si la base está vacía."""
+        if self.count() or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.error("No se pudo leer la caché antigua de ítems: %s", exc)
+            return 0
+        imported = self.upsert_items(
+            {"id": entry["id"], "name_en": entry.get("name", "")}
+            for entry in legacy if entry.get("id") and entry.get("name")
+        )
+        logger.info("Importados %s ítems desde %s", imported, path)
+        return imported
+
+    def set_meta(self, key: str, value: str) -> None:
+        conn = self._connect()
+        with self._lock, conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    # ── lectura ─────────────────────────────────────────────
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> dict:
+        return {key: row[key] for key in _COLUMNS}
+
+    def get_meta(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        with self._lock:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        conn = self._connect()
+        with self._lock:
+            return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def known_ids(self, complete_only: bool = False) -> set[int]:
+        """Ids guardados; con `complete_only` solo los ya descargados de la API (o que ya
+        tienen nombre ES y rareza). Algunos ítems nunca tienen nombre ES: cuentan igual."""
+        sql = "SELECT id FROM items"
+        if complete_only:
+            sql += " WHERE fetched_at IS NOT NULL OR (name_es != '' AND rarity IS NOT NULL)"
+        conn = self._connect()
+        with self._lock:
+            return {row[0] for row in conn.execute(sql)}
+
+    def names(self) -> list[tuple[str, str]]:
+        """Pares (name_en, name_es) de todo el catálogo, para construir índices en memoria."""
+        conn = self._connect()
+        with self._lock:
+            return [(row[0], row[1]) for row in conn.execute("SELECT name_en, name_es FROM items")]
+
+    def get(self, item_id: int) -> Optional[dict]:
+        conn = self._connect()
+        with self._lock:
+            row = conn.execute(
+                "SELECT id, name_en, name_es, rarity, icon FROM items WHERE id = ?", (int(item_id),)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_many(self, ids: Iterable[int]) -> dict[int, dict]:
+        ids = [int(i) for i in ids]
+        result: dict[int, dict] = {}
+        if not ids:
+            return result
+        conn = self._connect()
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT id, name_en, name_es, rarity, icon FROM items WHERE id IN ({placeholders})", chunk
+                ):
+                    result[row["id"]] = self._row_to_dict(row)
+        return result
+
+    def find_exact(self, name: str) -> Optional[dict]:
+        """Ítem cuyo nombre EN o ES coincide exactamente (sin mayúsculas ni acentos)."""
+        norm = normalize_name(name)
+        if not norm:
+            return None
+        conn = self._connect()
+        with self._lock:
+            row = conn.execute(
+                """
+                SELECT id, name_en, name_es, rarity, icon FROM items
+                WHERE norm_en = ?1 OR norm_es = ?1
+                ORDER BY id LIMIT 1
+                """,
+                (norm,),
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def search(self, query: str, limit: int = 25) -> list[dict]:
+        """Coincidencias por prefijo primero y luego por subcadena, en EN y ES."""
+        norm = normalize_name(query)
+        if not norm:
+            return []
+        if len(norm) > SHORT_QUERY_CACHE_LEN:
+            return self._search(norm, limit)
+        key = (norm, limit)
+        with self._lock:
+            cached = self._short_query_cache.get(key)
+            if cached is not None:
+                self._short_query_cache.move_to_end(key)
+                return list(cached)
+            generation = self._generation
+        results = self._search(norm, limit)
+        with self._lock:
+            if generation == self._generation:
+                self._short_query_cache[key] = results
+                if len(self._short_query_cache) > SHORT_QUERY_CACHE_SIZE:
+                    self._short_query_cache.popitem(last=False)
+        return list(results)
+
+    def _search(self, norm: str, limit: int) -> list[dict]:
+        conn = self._connect()
+        seen: set[int] = set()
+        results: list[dict] = []
+
+        def collect(rows) -> None:
+            for row in rows:
+                if row["id"] not in seen and len(results) < limit:
+                    seen.add(row["id"])
+                    results.append(self._row_to_dict(row))
+
+        with self._lock:
+            high = norm + _PREFIX_HIGH
+            collect(conn.execute(
+                """
+                SELECT id, name_en, name_es, rarity, icon FROM items
+                WHERE (norm_en >= ?1 AND norm_en < ?2) OR (norm_es >= ?1 AND norm_es < ?2)
+                ORDER BY length(name_en), name_en
+                LIMIT ?3
+                """,
+                (norm, high, limit),
+            ))
+            if len(results) >= limit:
+                return results
+            if self._has_fts and len(norm) >= 3:
+                phrase = '"' + norm.replace('"', '""') + '"'
+                rows = conn.execute(
+                    """
+                    SELECT i.id, i.name_en, i.name_es, i.rarity, i.icon
+                    FROM items_fts f JOIN items i ON i.id = f.rowid
+                    WHERE items_fts MATCH ?
+                    ORDER BY length(i.name_en), i.name_en
+                    LIMIT ?
+                    """,
+                    (phrase, limit + len(results)),
+                )
+            else:
+                pattern = "%" + norm.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                rows = conn.execute(
+                    """
+                    SELECT id, name_en, name_es, rarity, icon FROM items
+                    WHERE norm_en LIKE ?1 ESCAPE '\\' OR norm_es LIKE ?1 ESCAPE '\\'
+                    ORDER BY length(name_en), name_en
+                    LIMIT ?2
+                    """,
+                    (pattern, limit + len(results)),
+                )
+            collect(rows)
+        return results
+
+
+item_store = ItemStore()
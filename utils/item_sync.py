@@ -0,0 +1,199 @@
+"""Sincronización incremental del catálogo local de ítems (`item_store`).
+
+Compara los ids de `/v2/items` con los que ya están completos en el catálogo y
+descarga solo los que faltan, en lotes de 200 ids (EN y ES) pedidos en paralelo
+con un límite de concurrencia y de peticiones por segundo. Cada lote se guarda
+en SQLite en cuanto llega, así que si el bot se cae a mitad de la descarga la
+siguiente ejecución solo vuelve a pedir lo que no alcanzó a guardarse.
+
+Corre en segundo plano: `start()` no espera a la descarga.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from utils.gw2api import GW2Client, MAX_IDS_PER_REQUEST, gw2api
+from utils.item_store import ItemStore, item_store
+
+logger = logging.getLogger(__name__)
+
+ITEM_SYNC_INTERVAL_HOURS = float(os.getenv("ITEM_SYNC_INTERVAL_HOURS", 24))
+ITEM_SYNC_CONCURRENCY = int(os.getenv("ITEM_SYNC_CONCURRENCY", 4))
+ITEM_SYNC_REQUESTS_PER_SECOND = float(os.getenv("ITEM_SYNC_REQUESTS_PER_SECOND", 5))
+# Clave en la tabla meta del catálogo con la hora (epoch) de la última sincronización completa
+LAST_SYNC_KEY = "last_full_sync"
+
+
+def merge_item_langs(items_en: list[dict], items_es: list[dict]) -> list[dict]:
+    """Une las respuestas EN y ES de /v2/items en filas para el catálogo local."""
+    names_es = {item["id"]: item.get("name", "") for item in items_es or []}
+    return [
+        {
+            "id": item["id"],
+            "name_en": item.get("name", ""),
+            "name_es": names_es.get(item["id"], ""),
+            "rarity": item.get("rarity"),
+            "icon": item.get("icon"),
+        }
+        for item in items_en or []
+        if item.get("name") or names_es.get(item["id"])
+    ]
+
+
+class RateLimiter:
+    """Espacia el inicio de las peticiones para no pasar de `rate` por segundo."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class ItemSyncStats:
+    runs: int = 0
+    running: bool = False
+    last_started_at: Optional[str] = None
+    last_finished_at: Optional[str] = None
+    last_missing: int = 0
+    last_added: int = 0
+    chunks_ok: int = 0
+    chunks_failed: int = 0
+
+
+class ItemCatalogSync:
+    def __init__(
+        self,
+        store: ItemStore = item_store,
+        client: GW2Client = gw2api,
+        interval_hours: float = ITEM_SYNC_INTERVAL_HOURS,
+        concurrency: int = ITEM_SYNC_CONCURRENCY,
+        requests_per_second: float = ITEM_SYNC_REQUESTS_PER_SECOND,
+        on_complete: Optional[Callable[[int], Awaitable[None]]] = None,
+    ):
+        self.store = store
+        self.client = client
+        self.interval = interval_hours * 3600
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(requests_per_second)
+        self.on_complete = on_complete
+        self.stats = ItemSyncStats()
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _seconds_until_due(self) -> float:
+        last = self.store.get_meta(LAST_SYNC_KEY)
+        if not last or not self.store.count():
+            return 0.0
+        return max(0.0, float(last) + self.interval - time.time())
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                delay = await asyncio.to_thread(self._seconds_until_due)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.sync_once()
+                if await asyncio.to_thread(self._seconds_until_due) > 0:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error sincronizando el catálogo de ítems")
+            # Quedaron lotes pendientes o la API falló: reintento en una hora
+            await asyncio.sleep(min(self.interval, 3600))
+
+    async def sync_once(self) -> int:
+        """Descarga los ítems que faltan en el catálogo. Devuelve cuántos se guardaron."""
+        async with self._run_lock:
+            self.stats.running = True
+            self.stats.runs += 1
+            self.stats.last_started_at = datetime.utcnow().isoformat()
+            try:
+                added = await self._sync()
+            finally:
+                self.stats.running = False
+                self.stats.last_finished_at = datetime.utcnow().isoformat()
+        if added and self.on_complete:
+            try:
+                await self.on_complete(added)
+            except Exception as exc:
+                logger.warning("Callback de sincronización de ítems falló: %s", exc)
+        return added
+
+    async def _sync(self) -> int:
+        await self.limiter.wait()
+        remote_ids, known = await asyncio.gather(
+            self.client.get_json("items"),
+            asyncio.to_thread(self.store.known_ids, True),
+        )
+        missing = [item_id for item_id in remote_ids if item_id not in known]
+        self.stats.last_missing = len(missing)
+        self.stats.last_added = 0
+        if missing:
+            logger.info("Catálogo de ítems: %s ítems por descargar", len(missing))
+
+        chunks = [missing[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(missing), MAX_IDS_PER_REQUEST)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failed_before = self.stats.chunks_failed
+
+        async def run_chunk(chunk: list[int]) -> None:
+            async with semaphore:
+                await self._sync_chunk(chunk)
+
+        await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+
+        # Solo se da por completa si no falló ningún lote; si no, se reintenta en la próxima vuelta
+        if self.stats.chunks_failed == failed_before:
+            await asyncio.to_thread(self.store.set_meta, LAST_SYNC_KEY, str(time.time()))
+        logger.info("Catálogo de ítems sincronizado: %s nuevos/completados", self.stats.last_added)
+        return self.stats.last_added
+
+    async def _fetch(self, ids_param: str, lang: str) -> list[dict]:
+        await self.limiter.wait()
+        return await self.client.get_json("items", {"ids": ids_param, "lang": lang})
+
+    async def _sync_chunk(self, chunk: list[int]) -> None:
+        ids_param = ",".join(map(str, chunk))
+        try:
+            items_en, items_es = await asyncio.gather(self._fetch(ids_param, "en"), self._fetch(ids_param, "es"))
+        except Exception as exc:
+            self.stats.chunks_failed += 1
+            logger.warning("Lote de %s ítems falló: %s", len(chunk), exc)
+            return
+        # Se escribe cada lote al llegar: un corte deja guardado todo lo anterior
+        self.stats.last_added += await asyncio.to_thread(
+            self.store.upsert_items, merge_item_langs(items_en, items_es), True
+        )
+        self.stats.chunks_ok += 1
@@ -15,6 +15,7 @@ import aiohttp
 import discord
 
 from utils.gw2_log_analysis import upload_log_bytes
+from utils.http_session import get_session
 
 logger = logging.getLogger(__name__)
 
@@ -199,7 +200,7 @@ class LogAutouploader:
         if self._task and not self._task.done():
             return
         self.baseline_existing_files()
-        self._session = aiohttp.ClientSession()
+        self._session = get_session()
         self._task = asyncio.create_task(self._run_loop())
         logger.info("Autoupload iniciado — vigilando %s carpeta(s): %s", len(self.log_dirs), self.log_dirs)
 
@@ -211,9 +212,8 @@ class LogAutouploader:
             except asyncio.CancelledError:
                 pass
             self._task = None
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        # La sesión es la compartida del bot: se suelta, pero no se cierra aquí
+        self._session = None
 
     async def _run_loop(self) -> None:
         while True:
@@ -0,0 +1,53 @@
+"""Handles de mensajes para editarlos por id sin leerlos antes.
+
+`channel.get_partial_message(id)` no hace ninguna petición, así que editar a
+través del handle es un solo PATCH en lugar de GET (`fetch_message`) + PATCH.
+Los handles se guardan en un LRU pequeño por (canal, mensaje). Si el mensaje se
+ha borrado, Discord responde 404 al editar: el handle se descarta y `edit`
+devuelve None para que el cog decida qué hacer.
+
+    msg = await message_cache.edit(channel, message_id, embed=embed)
+"""
+
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from typing import Optional
+
+import discord
+
+# Mensajes recordados como máximo (eventos abiertos, mensajes de recepción...)
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 512))
+
+
+class MessageCache:
+    def __init__(self, maxsize: int = MESSAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._handles: OrderedDict[tuple[int, int], discord.PartialMessage] = OrderedDict()
+
+    def get(self, channel, message_id: int) -> discord.PartialMessage:
+        """Handle del mensaje; se crea sin tocar la API si no está en la caché."""
+        key = (channel.id, int(message_id))
+        handle = self._handles.get(key)
+        if handle is not None:
+            self._handles.move_to_end(key)
+            return handle
+        handle = self._handles[key] = channel.get_partial_message(int(message_id))
+        if len(self._handles) > self.maxsize:
+            self._handles.popitem(last=False)
+        return handle
+
+    def discard(self, channel_id: int, message_id: int) -> None:
+        self._handles.pop((int(channel_id), int(message_id)), None)
+
+    async def edit(self, channel, message_id: int, **fields) -> Optional[discord.Message]:
+        """Edita el mensaje directamente. Devuelve None si ya no existe."""
+        try:
+            return await self.get(channel, message_id).edit(**fields)
+        except discord.NotFound:
+            self.discard(channel.id, message_id)
+            return None
+
+
+message_cache = MessageCache()
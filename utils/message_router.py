@@ -0,0 +1,142 @@
+"""Despacho único de `on_message` para todos los cogs.
+
+El bot analiza cada mensaje una sola vez (`MessageContext`: prefijo, comando,
+menciones, adjuntos) y solo invoca a los handlers cuyo interés coincide, en
+lugar de que cada cog registre su propio listener y repita las mismas
+comprobaciones. El tiempo de cada handler queda registrado en `HandlerStats`.
+
+    bot.router.register("antispam", self.handle_message, guild_only=True, attachments=True)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Un handler que tarde más que esto queda en el log
+SLOW_HANDLER_MS = float(os.getenv("SLOW_HANDLER_MS", 250))
+
+
+@dataclass
+class MessageContext:
+    message: discord.Message
+    content: str
+    prefix: Optional[str]
+    # Primera palabra tras el prefijo, en minúsculas (None si no hay prefijo)
+    command: Optional[str]
+    guild_id: Optional[int]
+    channel_id: int
+    author_id: int
+    has_mentions: bool
+    has_attachments: bool
+
+    @classmethod
+    def parse(cls, message: discord.Message, prefixes: Iterable[str]) -> "MessageContext":
+        content = message.content
+        prefix = next((p for p in prefixes if content.startswith(p)), None)
+        command = None
+        if prefix is not None:
+            rest = content[len(prefix):].split(maxsplit=1)
+            command = rest[0].lower() if rest else ""
+        return cls(
+            message=message,
+            content=content,
+            prefix=prefix,
+            command=command,
+            guild_id=message.guild.id if message.guild else None,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            has_mentions=bool(message.mentions),
+            has_attachments=bool(message.attachments) or bool(message.embeds),
+        )
+
+
+@dataclass
+class HandlerStats:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+@dataclass
+class MessageHandler:
+    name: str
+    callback: Callable[[MessageContext], Awaitable[None]]
+    guild_only: bool = False
+    prefixed: bool = False
+    mentions: bool = False
+    attachments: bool = False
+    # Filtro extra barato y síncrono (p. ej. "¿hay una ruleta activa en este canal?")
+    predicate: Optional[Callable[[MessageContext], bool]] = None
+    stats: HandlerStats = field(default_factory=HandlerStats)
+
+    def wants(self, ctx: MessageContext) -> bool:
+        if self.guild_only and ctx.guild_id is None:
+            return False
+        if self.prefixed and ctx.prefix is None:
+            return False
+        if self.mentions and not ctx.has_mentions:
+            return False
+        if self.attachments and not ctx.has_attachments:
+            return False
+        return self.predicate is None or self.predicate(ctx)
+
+
+class MessageRouter:
+    def __init__(self, prefixes: Iterable[str]):
+        self.prefixes = tuple(prefixes)
+        self.handlers: dict[str, MessageHandler] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def register(self, name: str, callback: Callable[[MessageContext], Awaitable[None]], **interest) -> None:
+        """Registra (o reemplaza) un handler. Interés: guild_only, prefixed, mentions, attachments, predicate."""
+        self.handlers[name] = MessageHandler(name, callback, **interest)
+
+    def unregister(self, name: str) -> None:
+        self.handlers.pop(name, None)
+
+    def dispatch(self, message: discord.Message) -> Optional[MessageContext]:
+        """Analiza el mensaje y lanza en paralelo los handlers interesados (no espera a que terminen)."""
+        if message.author.bot or not self.handlers:
+            return None
+        ctx = MessageContext.parse(message, self.prefixes)
+        for handler in list(self.handlers.values()):
+            try:
+                wanted = handler.wants(ctx)
+            except Exception:
+                logger.exception("Filtro del handler %s falló", handler.name)
+                continue
+            if wanted:
+                task = asyncio.create_task(self._run(handler, ctx))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        return ctx
+
+    async def _run(self, handler: MessageHandler, ctx: MessageContext) -> None:
+        start = time.perf_counter()
+        try:
+            await handler.callback(ctx)
+        except Exception:
+            handler.stats.errors += 1
+            logger.exception("Handler de mensajes %s falló", handler.name)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            stats = handler.stats
+            stats.calls += 1
+            stats.total_ms += elapsed
+            stats.max_ms = max(stats.max_ms, elapsed)
+            if elapsed > SLOW_HANDLER_MS:
+                logger.warning("Handler de mensajes %s tardó %.0f ms", handler.name, elapsed)
@@ -0,0 +1,277 @@
+"""Índice de nombres en memoria para el autocompletado de comandos.
+
+Los nombres (y alias) se normalizan una sola vez -minúsculas y sin acentos- y
+se guardan en:
+
+- un trie por prefijo, donde cada nodo ya trae precalculados sus mejores
+  `limit` resultados, así que buscar un prefijo cuesta O(len(prefijo));
+  además del nombre completo se inserta cada palabra, para que "ecto"
+  encuentre "Glob of Ectoplasm";
+- un índice de trigramas para coincidencias en mitad de una palabra.
+
+Orden: prefijo del nombre completo, luego prefijo de una palabra, luego
+subcadena; dentro de cada grupo, el nombre más corto primero.
+
+El trie con resultados precalculados por nodo es ideal para listas pequeñas
+(ITEMS_MAP de /item); para el catálogo completo (~70k ítems en EN y ES) ocupa
+cientos de MB. `CatalogIndex` es la versión compacta para el catálogo: un array
+ordenado de nombres normalizados (prefijo = dos bisecciones), los mejores
+resultados precalculados solo para los prefijos que abarcan muchos nombres, y
+listas de trigramas (`array`) para las subcadenas.
+"""
+
+from __future__ import annotations
+
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from utils.item_store import normalize_name
+
+DEFAULT_LIMIT = 25
+# Prefijos del catálogo con más nombres que esto guardan su top precalculado
+CATALOG_TOP_MIN_RANGE = 256
+_PREFIX_HIGH = "\U0010ffff"
+
+# Tipo de coincidencia (menor = mejor)
+_FULL_PREFIX = 0
+_WORD_PREFIX = 1
+_SUBSTRING = 2
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        # (rango, id) de los nombres que terminan de insertarse en este nodo
+        self.entries: list[tuple] = []
+        self.top: list[tuple] = []
+
+
+class NameIndex:
+    def __init__(self, limit: int = DEFAULT_LIMIT):
+        self.limit = limit
+        self._values: list[str] = []
+        self._value_ids: dict[str, int] = {}
+        self._keys: list[tuple[str, int]] = []
+        self._root = _TrieNode()
+        self._trigrams: dict[str, list[int]] = {}
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: str, names: Iterable[str]) -> None:
+        """Registra `value` (lo que se devuelve) bajo todos sus `names` (nombre principal y alias)."""
+        entry_id = self._value_ids.get(value)
+        if entry_id is None:
+            entry_id = self._value_ids[value] = len(self._values)
+            self._values.append(value)
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                self._keys.append((key, entry_id))
+        self._built = False
+
+    def build(self) -> None:
+        self._root = _TrieNode()
+        self._trigrams = {}
+        for key_id, (key, entry_id) in enumerate(self._keys):
+            self._insert(key, (_FULL_PREFIX, len(key), key, entry_id))
+            start = key.find(" ")
+            while start != -1:
+                self._insert(key[start + 1:], (_WORD_PREFIX, len(key), key, entry_id))
+                start = key.find(" ", start + 1)
+            for gram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                self._trigrams.setdefault(gram, []).append(key_id)
+        self._compute_top(self._root)
+        self._built = True
+
+    def _insert(self, text: str, rank: tuple) -> None:
+        node = self._root
+        for ch in text:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+        node.entries.append(rank)
+
+    def _compute_top(self, root: _TrieNode) -> None:
+        # Postorden iterativo: cada nodo combina sus entradas con el top de sus hijos
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+                continue
+            candidates = heapq.merge(sorted(node.entries), *(child.top for child in node.children.values()))
+            node.top = self._take_unique(candidates, self.limit)
+
+    @staticmethod
+    def _take_unique(ranked: Iterable[tuple], limit: int, seen: Optional[set[int]] = None) -> list[tuple]:
+        seen = set() if seen is None else seen
+        result = []
+        for rank in ranked:
+            if rank[-1] in seen:
+                continue
+            seen.add(rank[-1])
+            result.append(rank)
+            if len(result) >= limit:
+                break
+        return result
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[str]:
+        """Hasta `limit` valores que coinciden con `query`, ordenados por relevancia."""
+        if not self._built:
+            self.build()
+        limit = min(limit or self.limit, self.limit)
+        norm = normalize_name(query)
+
+        node: Optional[_TrieNode] = self._root
+        for ch in norm:
+            node = node.children.get(ch)
+            if node is None:
+                break
+        seen: set[int] = set()
+        ranked = self._take_unique(node.top, limit, seen) if node is not None else []
+
+        if len(ranked) < limit and len(norm) >= 3:
+            ranked += self._take_unique(self._substring_matches(norm), limit - len(ranked), seen)
+        return [self._values[rank[-1]] for rank in ranked]
+
+    def _substring_matches(self, norm: str) -> list[tuple]:
+        grams = {norm[i:i + 3] for i in range(len(norm) - 2)}
+        postings = sorted((self._trigrams.get(gram, []) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        matches = []
+        for key_id in candidates:
+            key, entry_id = self._keys[key_id]
+            if norm in key:
+                matches.append((_SUBSTRING, len(key), key, entry_id))
+        matches.sort()
+        return matches
+
+
+class CatalogIndex:
+    """Índice del catálogo de ítems con el mismo orden que `ItemStore.search`:
+    prefijo del nombre EN o ES primero, luego subcadena; dentro de cada grupo,
+    el nombre más corto primero. Se construye entero con `build` y no se modifica:
+    para actualizarlo se construye uno nuevo y se sustituye la referencia."""
+
+    def __init__(self, limit: int = DEFAULT_LIMIT):
+        self.limit = limit
+        self._names: list[str] = []  # nombre a mostrar; el índice es su rango
+        self._norms: list[str] = []  # nombres normalizados del rango, separados por "\n"
+        self._keys: list[str] = []  # nombres normalizados ordenados
+        self._key_ids = array("i")  # rango del nombre de cada clave
+        self._top: dict[str, list[int]] = {}
+        self._trigrams: dict[str, array] = {}
+        # Subcadenas de 1-2 caracteres: basta con los primeros `limit` nombres de cada una
+        self._short_grams: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def build(self, rows: Iterable[tuple[str, str]]) -> "CatalogIndex":
+        """Construye el índice a partir de pares (name_en, name_es). Bloqueante."""
+        keys_by_name: dict[str, set[str]] = {}
+        for name_en, name_es in rows:
+            name = name_en or name_es
+            if not name:
+                continue
+            keys = keys_by_name.setdefault(name, set())
+            for other in (name_en, name_es):
+                key = normalize_name(other)
+                if key:
+                    keys.add(key)
+
+        self._names = sorted(keys_by_name, key=lambda name: (len(name), name))
+        self._norms = ["\n".join(sorted(keys_by_name[name])) for name in self._names]
+        pairs = sorted((key, rank) for rank, name in enumerate(self._names) for key in keys_by_name[name])
+        self._keys = [key for key, _ in pairs]
+        self._key_ids = array("i", (rank for _, rank in pairs))
+        self._build_top()
+
+        trigrams: dict[str, array] = {}
+        short_grams: dict[str, list[int]] = {}
+        for rank, norms in enumerate(self._norms):
+            # En orden de rango: cada lista ya sale ordenada
+            for gram in {norms[i:i + 3] for i in range(len(norms) - 2)}:
+                if "\n" in gram:
+                    continue
+                posting = trigrams.get(gram)
+                if posting is None:
+                    posting = trigrams[gram] = array("i")
+                posting.append(rank)
+            for gram in {norms[i:i + n] for n in (1, 2) for i in range(len(norms) - n + 1)}:
+                if "\n" in gram:
+                    continue
+                posting = short_grams.setdefault(gram, [])
+                if len(posting) < self.limit:
+                    posting.append(rank)
+        self._trigrams = trigrams
+        self._short_grams = short_grams
+        return self
+
+    def _build_top(self) -> None:
+        # Cada rango [lo, hi) comparte los primeros `depth` caracteres; solo se bajan
+        # de nivel los rangos grandes, los pequeños se resuelven al buscar
+        self._top = {}
+        stack = [(0, len(self._keys), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= CATALOG_TOP_MIN_RANGE:
+                continue
+            if depth:
+                self._top[self._keys[lo][:depth]] = heapq.nsmallest(self.limit, set(self._key_ids[lo:hi]))
+            start = lo
+            while start < hi and len(self._keys[start]) <= depth:
+                start += 1  # la clave igual al prefijo va primero y no tiene hijos
+            while start < hi:
+                prefix = self._keys[start][:depth + 1]
+                end = bisect_left(self._keys, prefix + _PREFIX_HIGH, start, hi)
+                stack.append((start, end, depth + 1))
+                start = end
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[str]:
+        """Hasta `limit` nombres que coinciden con `query`, ordenados por relevancia."""
+        limit = min(limit or self.limit, self.limit)
+        norm = normalize_name(query)
+        if not norm:
+            return []
+        ranks = self._top.get(norm)
+        if ranks is None:
+            lo = bisect_left(self._keys, norm)
+            hi = bisect_left(self._keys, norm + _PREFIX_HIGH, lo)
+            ranks = heapq.nsmallest(limit, set(self._key_ids[lo:hi]))
+        ranks = ranks[:limit]
+        if len(ranks) < limit:
+            seen = set(ranks)
+            if len(norm) < 3:
+                ranks += [rank for rank in self._short_grams.get(norm, ()) if rank not in seen][:limit - len(ranks)]
+            else:
+                ranks += self._substring_matches(norm, limit - len(ranks), seen)
+        return [self._names[rank] for rank in ranks]
+
+    def _substring_matches(self, norm: str, limit: int, seen: set[int]) -> list[int]:
+        grams = {norm[i:i + 3] for i in range(len(norm) - 2)}
+        postings = [self._trigrams.get(gram) for gram in grams]
+        if not all(postings):
+            return []
+        matches = []
+        # La lista más corta en orden de rango: los primeros que contienen `norm` son los mejores
+        for rank in min(postings, key=len):
+            if rank not in seen and norm in self._norms[rank]:
+                matches.append(rank)
+                if len(matches) >= limit:
+                    break
+        return matches
@@ -0,0 +1,112 @@
+"""Planificador de tareas por hora (min-heap) para recordatorios y avisos.
+
+En lugar de revisar toda la lista cada N segundos, duerme exactamente hasta
+el próximo vencimiento y se despierta antes si llega uno más cercano.
+
+- `schedule(key, due, payload)`: O(log n).
+- `cancel(key)`: O(1); la entrada queda marcada y se descarta al llegar a la
+  cima del heap (el heap se compacta si acumula demasiadas canceladas).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tope de cada espera, para seguir cambios del reloj del sistema
+MAX_SLEEP_SECONDS = 300.0
+
+
+class HeapScheduler:
+    def __init__(self, callback: Callable[[Hashable, Any], Awaitable[None]], name: str = "scheduler"):
+        self.callback = callback
+        self.name = name
+        # (vencimiento epoch, secuencia, clave); la entrada vigente de cada clave está en _entries
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._entries: dict[Hashable, tuple[float, int, Any]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, due: float, payload: Any = None) -> None:
+        """Programa (o reprograma) `key` para el epoch `due`."""
+        seq = next(self._counter)
+        self._entries[key] = (due, seq, payload)
+        heapq.heappush(self._heap, (due, seq, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._compact()
+        return True
+
+    def next_due(self) -> Optional[float]:
+        self._drop_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def _compact(self) -> None:
+        self._heap = [(due, seq, key) for key, (due, seq, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, entry: tuple[float, int, Hashable]) -> bool:
+        current = self._entries.get(entry[2])
+        return current is not None and current[1] == entry[1]
+
+    def _drop_cancelled(self) -> None:
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due = self.next_due()
+            delay = MAX_SLEEP_SECONDS if due is None else due - time.time()
+            if delay > 0:
+                # Sin wait_for: en 3.11 puede tragarse la cancelación si el evento se activa a la vez
+                timer = asyncio.get_running_loop().call_later(min(delay, MAX_SLEEP_SECONDS), self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+                continue
+            _, _, key = heapq.heappop(self._heap)
+            _, _, payload = self._entries.pop(key)
+            task = asyncio.create_task(self._dispatch(key, payload))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, key: Hashable, payload: Any) -> None:
+        try:
+            await self.callback(key, payload)
+        except Exception:
+            logger.exception("%s: error ejecutando %s", self.name, key)
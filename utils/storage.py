@@ -0,0 +1,438 @@
+"""Backends locales de documentos con la misma interfaz que el cliente de Firestore.
+
+`DatabaseManager` (y los cogs que usan `bot.db.db`) solo necesitan un subconjunto
+de la API de Firestore: `collection().document()`, `get/set/update/delete`,
+`where/order_by/limit/stream`, `batch()`, los transforms `ArrayUnion`,
+`ArrayRemove` e `Increment` y `DELETE_FIELD`. Este módulo lo implementa sobre:
+
+- `MemoryStore`: diccionarios en memoria (pruebas de carga, desarrollo);
+- `SQLiteStore`: un fichero SQLite con un documento JSON por fila.
+
+Se elige con `DB_BACKEND=firestore|memory|sqlite` (ver `utils/database.py`).
+Las consultas recorren la colección en Python: sirven para medir el bot sin un
+proyecto de Google, no para reemplazar los índices de Firestore en producción.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQLITE_DB_FILE = os.path.join(_PROJECT_ROOT, "data", "firestore.sqlite3")
+
+
+class NotFound(Exception):
+    """`update()` sobre un documento que no existe (como google.api_core NotFound)."""
+
+
+# ── transforms ──────────────────────────────────────────────
+
+class ArrayUnion:
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+
+class ArrayRemove:
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+
+class Increment:
+    def __init__(self, value: int | float):
+        self.value = value
+
+
+class _DeleteField:
+    def __repr__(self) -> str:
+        return "DELETE_FIELD"
+
+
+# Valor de `update()` que borra el campo, como firestore.DELETE_FIELD
+DELETE_FIELD = _DeleteField()
+
+
+def _apply(current: Any, value: Any) -> Any:
+    if isinstance(value, ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        result.extend(v for v in value.values if v not in result)
+        return result
+    if isinstance(value, ArrayRemove):
+        return [v for v in current if v not in value.values] if isinstance(current, list) else []
+    if isinstance(value, Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    return copy.deepcopy(value)
+
+
+def _set_path(data: dict, path: str, value: Any) -> None:
+    """Asigna `a.b.c` como lo hace `update()` de Firestore."""
+    *parents, leaf = path.split(".")
+    for key in parents:
+        child = data.get(key)
+        if not isinstance(child, dict):
+            child = data[key] = {}
+        data = child
+    if value is DELETE_FIELD:
+        data.pop(leaf, None)
+    else:
+        data[leaf] = _apply(data.get(leaf), value)
+
+
+def _merge(target: dict, changes: dict) -> None:
+    for key, value in changes.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _apply(target.get(key), value)
+
+
+def _get_path(data: dict, path: str) -> tuple[bool, Any]:
+    for key in path.split("."):
+        if not isinstance(data, dict) or key not in data:
+            return False, None
+        data = data[key]
+    return True, data
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    try:
+        if op == "==":
+            return value == expected
+        if op == "!=":
+            return value != expected
+        if op == "<":
+            return value < expected
+        if op == "<=":
+            return value <= expected
+        if op == ">":
+            return value > expected
+        if op == ">=":
+            return value >= expected
+        if op == "in":
+            return value in expected
+        if op == "not-in":
+            return value not in expected
+        if op == "array-contains":
+            return isinstance(value, list) and expected in value
+        if op == "array-contains-any":
+            return isinstance(value, list) and any(v in value for v in expected)
+    except TypeError:
+        # Firestore solo compara valores del mismo tipo
+        return False
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+# ── referencias y consultas ─────────────────────────────────
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return _get_path(self._data or {}, field)[1]
+
+
+class DocumentReference:
+    def __init__(self, store: "LocalStore", collection: str, doc_id: str):
+        self._store = store
+        self.collection_path = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._store, f"{self.path}/{name}")
+
+    def get(self) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self._store.read(self.collection_path, self.id))
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        self._store.set(self.collection_path, self.id, data, merge)
+
+    def update(self, data: dict) -> None:
+        self._store.update(self.collection_path, self.id, data)
+
+    def delete(self) -> None:
+        self._store.delete(self.collection_path, self.id)
+
+
+class Query:
+    def __init__(self, store: "LocalStore", collection: str, filters=(), orders=(), limit_to: Optional[int] = None):
+        self._store = store
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_to
+
+    def where(self, field: str, op: str, value: Any) -> "Query":
+        return Query(self._store, self._collection, self._filters + ((field, op, value),), self._orders, self._limit)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "Query":
+        return Query(self._store, self._collection, self._filters, self._orders + ((field, direction),), self._limit)
+
+    def limit(self, count: int) -> "Query":
+        return Query(self._store, self._collection, self._filters, self._orders, count)
+
+    def stream(self) -> Iterator[DocumentSnapshot]:
+        results = []
+        for doc_id, data in self._store.scan(self._collection):
+            ok = True
+            for field, op, expected in self._filters:
+                present, value = _get_path(data, field)
+                if not present or not _matches(value, op, expected):
+                    ok = False
+                    break
+            # Como en Firestore, order_by excluye los documentos sin ese campo
+            if ok and all(_get_path(data, field)[0] for field, _ in self._orders):
+                results.append((doc_id, data))
+        for field, direction in reversed(self._orders):
+            results.sort(key=lambda item: _get_path(item[1], field)[1], reverse=direction == "DESCENDING")
+        if self._limit is not None:
+            results = results[:self._limit]
+        for doc_id, data in results:
+            yield DocumentSnapshot(DocumentReference(self._store, self._collection, doc_id), data)
+
+    def get(self) -> list[DocumentSnapshot]:
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, store: "LocalStore", path: str):
+        super().__init__(store, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._store, self._collection, str(doc_id) if doc_id is not None else uuid.uuid4().hex)
+
+    def add(self, data: dict) -> tuple[None, DocumentReference]:
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class WriteBatch:
+    def __init__(self, store: "LocalStore"):
+        self._store = store
+        self._ops: list[tuple] = []
+
+    def set(self, ref: DocumentReference, data: dict, merge: bool = False) -> None:
+        self._ops.append(("set", ref, data, merge))
+
+    def update(self, ref: DocumentReference, data: dict) -> None:
+        self._ops.append(("update", ref, data))
+
+    def delete(self, ref: DocumentReference) -> None:
+        self._ops.append(("delete", ref))
+
+    def commit(self) -> None:
+        # Todo el lote bajo el mismo lock: nadie ve un estado intermedio
+        with self._store.atomic():
+            for op, ref, *args in self._ops:
+                getattr(ref, op)(*args)
+        self._ops.clear()
+
+
+# ── almacenamiento ──────────────────────────────────────────
+
+class LocalStore(ABC):
+    """Cliente compatible con Firestore; las subclases solo guardan y leen documentos."""
+
+    ArrayUnion = ArrayUnion
+    ArrayRemove = ArrayRemove
+    Increment = Increment
+    DELETE_FIELD = DELETE_FIELD
+
+    def __init__(self):
+        # El SDK se usa desde el pool de hilos de DatabaseManager
+        self.lock = threading.RLock()
+
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    @contextmanager
+    def atomic(self):
+        with self.lock:
+            yield
+
+    @abstractmethod
+    def read(self, collection: str, doc_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def write(self, collection: str, doc_id: str, data: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, collection: str, doc_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def scan(self, collection: str) -> list[tuple[str, dict]]:
+        ...
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False) -> None:
+        with self.lock:
+            current = (self.read(collection, doc_id) or {}) if merge else {}
+            _merge(current, data)
+            self.write(collection, doc_id, current)
+
+    def update(self, collection: str, doc_id: str, data: dict) -> None:
+        with self.lock:
+            current = self.read(collection, doc_id)
+            if current is None:
+                raise NotFound(f"No document to update: {collection}/{doc_id}")
+            for path, value in data.items():
+                _set_path(current, path, value)
+            self.write(collection, doc_id, current)
+
+
+class MemoryStore(LocalStore):
+    def __init__(self):
+        super().__init__()
+        self._collections: dict[str, dict[str, dict]] = {}
+        # Valores anteriores de lo escrito dentro de `atomic()`, para deshacerlo si falla
+        self._undo: Optional[list[tuple[str, str, Optional[dict]]]] = None
+
+    @contextmanager
+    def atomic(self):
+        """Todo o nada, como un lote de Firestore: si algo falla se restaura lo escrito."""
+        with self.lock:
+            if self._undo is not None:
+                # Anidado: lo deshace el bloque exterior
+                yield
+                return
+            self._undo = []
+            try:
+                yield
+            except BaseException:
+                for collection, doc_id, previous in reversed(self._undo):
+                    docs = self._collections.setdefault(collection, {})
+                    if previous is None:
+                        docs.pop(doc_id, None)
+                    else:
+                        docs[doc_id] = previous
+                raise
+            finally:
+                self._undo = None
+
+    def _remember(self, collection: str, doc_id: str) -> None:
+        if self._undo is not None:
+            self._undo.append((collection, doc_id, self._collections.get(collection, {}).get(doc_id)))
+
+    def read(self, collection: str, doc_id: str) -> Optional[dict]:
+        with self.lock:
+            data = self._collections.get(collection, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def write(self, collection: str, doc_id: str, data: dict) -> None:
+        with self.lock:
+            self._remember(collection, doc_id)
+            self._collections.setdefault(collection, {})[doc_id] = copy.deepcopy(data)
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self.lock:
+            self._remember(collection, doc_id)
+            self._collections.get(collection, {}).pop(doc_id, None)
+
+    def scan(self, collection: str) -> list[tuple[str, dict]]:
+        with self.lock:
+            return copy.deepcopy(list(self._collections.get(collection, {}).items()))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode(obj: dict) -> Any:
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class SQLiteStore(LocalStore):
+    def __init__(self, path: str = SQLITE_DB_FILE):
+        super().__init__()
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id         TEXT NOT NULL,
+                data       TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def read(self, collection: str, doc_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def write(self, collection: str, doc_id: str, data: dict) -> None:
+        payload = json.dumps(data, default=_encode)
+        with self.lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (collection, doc_id, payload),
+            )
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self.lock:
+            self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+
+    def scan(self, collection: str) -> list[tuple[str, dict]]:
+        with self.lock:
+            rows = self._conn.execute("SELECT id, data FROM documents WHERE collection = ?", (collection,)).fetchall()
+        return [(doc_id, json.loads(data, object_hook=_decode)) for doc_id, data in rows]
+
+    @contextmanager
+    def atomic(self):
+        with self.lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self.lock:
+            self._conn.close()
+
+
+def create_store(backend: str, path: Optional[str] = None) -> LocalStore:
+    """`memory` o `sqlite` (con `path` opcional)."""
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(path or SQLITE_DB_FILE)
+    raise ValueError(f"Backend de base de datos desconocido: {backend}")